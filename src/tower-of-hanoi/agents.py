@@ -1,16 +1,46 @@
 """
 Main entry point for Tower of Hanoi Multi-Agent Experiment
 LangGraph Platform deployment
+
+Nothing is built at import: the workflow is compiled on the first
+get_workflow() call and the LLM clients on the first LLM call (memoized per
+process). Servers can call warm_up() before taking traffic.
 """
 
-from .workflow import create_comparison_workflow
+import os
+import threading
+
+_workflow = None
+_workflow_pid = None
+_workflow_lock = threading.Lock()
 
 # Export the main workflow for LangGraph Platform
 def get_workflow():
     """
     Returns the compiled workflow for LangGraph Platform deployment
+    (compiled once per process)
     """
-    return create_comparison_workflow()
+    global _workflow, _workflow_pid
+    if _workflow is None or _workflow_pid != os.getpid():
+        with _workflow_lock:
+            if _workflow is None or _workflow_pid != os.getpid():
+                from .workflow import create_comparison_workflow
+                _workflow = create_comparison_workflow()
+                _workflow_pid = os.getpid()
+    return _workflow
+
+def warm_up():
+    """Compile the parent and cell graphs and build the LLM clients now"""
+    from .config import warm_up_llms
+    from .workflow import _get_cell_workflow
+
+    workflow = get_workflow()
+    _get_cell_workflow()
+    warm_up_llms()
+    return workflow
 
-# For direct access to the workflow
-workflow = create_comparison_workflow()
\ No newline at end of file
+def __getattr__(name):
+    # For direct access to the workflow (agents.workflow), compiled on first access
+    if name == "workflow":
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
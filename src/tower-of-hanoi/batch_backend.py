@@ -0,0 +1,150 @@
+"""
+Batch submission backends for non-interactive prompts (single-agent sweeps).
+
+A backend takes a list of {"custom_id", "content"} requests (user message
+content: a string or Messages API content blocks) and returns the
+response texts keyed by custom_id once the whole batch has been processed.
+Entries missing from the result (errored or expired) are left to the caller.
+
+- AnthropicBatchBackend: Message Batches API (one job, polled until ended)
+- LocalFileBatchBackend: stand-in that writes requests/results as JSONL under
+  a directory and answers them with a local model in a worker thread
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+
+# Local batch jobs live here (override with HANOI_BATCH_DIR)
+BATCH_DIR = os.getenv(
+    "HANOI_BATCH_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tower-of-hanoi", "batches")
+)
+# Seconds run() waits for a batch before giving up (unset: no limit; Anthropic batches can take up to 24h)
+BATCH_TIMEOUT = float(os.environ["HANOI_BATCH_TIMEOUT"]) if os.getenv("HANOI_BATCH_TIMEOUT") else None
+
+class BatchError(RuntimeError):
+    """A batch job failed as a whole or did not finish in time"""
+
+class BatchBackend:
+    """Interface: submit() a batch, poll() until done, then results()"""
+
+    poll_interval = 30.0
+
+    def submit(self, requests):
+        """Start a batch of {"custom_id", "content"} requests and return its batch id"""
+        raise NotImplementedError
+
+    def poll(self, batch_id):
+        """True once every request of the batch has been processed (raises BatchError if the job failed)"""
+        raise NotImplementedError
+
+    def results(self, batch_id):
+        """{custom_id: response text} for the requests that succeeded"""
+        raise NotImplementedError
+
+    def run(self, requests, timeout=BATCH_TIMEOUT):
+        """Submit, wait for completion (at most timeout seconds, if set) and return (batch_id, results)"""
+        batch_id = self.submit(requests)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self.poll(batch_id):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise BatchError(f"Batch {batch_id} still not done after {timeout}s")
+            time.sleep(self.poll_interval)
+        return batch_id, self.results(batch_id)
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API with the generation settings of a chat model"""
+
+    def __init__(self, model, max_tokens, temperature, client=None):
+        import anthropic
+
+        self.client = client or anthropic.Anthropic()
+        self.params = {"model": model, "max_tokens": max_tokens, "temperature": temperature}
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=[
+            {
+                "custom_id": request["custom_id"],
+                "params": {**self.params, "messages": [{"role": "user", "content": request["content"]}]}
+            }
+            for request in requests
+        ])
+        return batch.id
+
+    def poll(self, batch_id):
+        return self.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id):
+        return {
+            entry.custom_id: "".join(block.text for block in entry.result.message.content if block.type == "text")
+            for entry in self.client.messages.batches.results(batch_id)
+            if entry.result.type == "succeeded"
+        }
+
+class LocalFileBatchBackend(BatchBackend):
+    """
+    File-based stand-in: <directory>/<batch_id>/requests.jsonl is answered
+    by llm.invoke on worker threads into results.jsonl, and a "done" marker
+    is written when the batch ends. Failed requests are simply left out; if
+    the job itself fails, an "errored" marker holds the error and poll()
+    raises it as a BatchError.
+    """
+
+    poll_interval = 0.1
+
+    def __init__(self, llm, directory=None, max_workers=8):
+        self.llm = llm
+        self.directory = directory or BATCH_DIR
+        self.max_workers = max_workers
+        self._errors = {}  # batch_id -> exception of a job that failed in this process
+
+    def _path(self, batch_id, name):
+        return os.path.join(self.directory, batch_id, name)
+
+    def submit(self, requests):
+        batch_id = f"local_{uuid.uuid4().hex}"
+        os.makedirs(os.path.join(self.directory, batch_id))
+        with open(self._path(batch_id, "requests.jsonl"), "w") as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        threading.Thread(target=self._process, args=(batch_id,), daemon=True).start()
+        return batch_id
+
+    def _answer(self, request):
+        try:
+            response = self.llm.invoke([HumanMessage(content=request["content"])])
+            return {"custom_id": request["custom_id"], "text": response.content}
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "error": str(e)}
+
+    def _process(self, batch_id):
+        try:
+            with open(self._path(batch_id, "requests.jsonl")) as f:
+                requests = [json.loads(line) for line in f]
+            with ThreadPoolExecutor(self.max_workers) as pool, \
+                    open(self._path(batch_id, "results.jsonl"), "w") as out:
+                for result in pool.map(self._answer, requests):
+                    out.write(json.dumps(result) + "\n")
+        except Exception as e:
+            self._errors[batch_id] = e
+            with open(self._path(batch_id, "errored"), "w") as f:
+                f.write(f"{type(e).__name__}: {e}")
+            return
+        open(self._path(batch_id, "done"), "w").close()
+
+    def poll(self, batch_id):
+        if os.path.exists(self._path(batch_id, "errored")):
+            with open(self._path(batch_id, "errored")) as f:
+                message = f.read()
+            raise BatchError(f"Batch {batch_id} failed: {message}") from self._errors.get(batch_id)
+        return os.path.exists(self._path(batch_id, "done"))
+
+    def results(self, batch_id):
+        with open(self._path(batch_id, "results.jsonl")) as f:
+            entries = [json.loads(line) for line in f]
+        return {entry["custom_id"]: entry["text"] for entry in entries if "text" in entry}
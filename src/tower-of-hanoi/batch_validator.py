@@ -0,0 +1,155 @@
+import numpy as np
+from .simulator import TowerOfHanoiSimulator
+
+# Error classes, in the order of the simulator's four validation layers
+ERROR_NONE = 0
+ERROR_PEG_BOUNDS = 1
+ERROR_EMPTY_SOURCE = 2
+ERROR_NOT_TOP = 3
+ERROR_SIZE_ORDER = 4
+ERROR_PARSE = 5
+
+ERROR_CLASS_NAMES = {
+    ERROR_NONE: "none",
+    ERROR_PEG_BOUNDS: "peg_bounds",
+    ERROR_EMPTY_SOURCE: "empty_source",
+    ERROR_NOT_TOP: "not_top",
+    ERROR_SIZE_ORDER: "size_order",
+    ERROR_PARSE: "parsing_error"
+}
+
+# Move rows marked with this value are treated as unparseable moves. The int64
+# minimum, not -1: parse_move accepts negative numbers, and a literal
+# [-1, -1, -1] must stay a peg-bounds error as in the scalar simulator
+PARSE_ERROR_SENTINEL = np.iinfo(np.int64).min
+
+# Pegs are stored as int64 bitmasks (bit d-1 set = disk d on the peg)
+MAX_BATCH_DISKS = 62
+
+
+def moves_to_array(solutions):
+    """
+    Pad a list of move sequences into a (runs x moves x 3) int64 array.
+    Move strings are parsed with TowerOfHanoiSimulator.parse_move; moves that
+    do not parse become PARSE_ERROR_SENTINEL rows.
+    Returns (moves, lengths).
+    """
+    parser = TowerOfHanoiSimulator(0)
+    lengths = np.array([len(solution) for solution in solutions], dtype=np.int64)
+    max_len = int(lengths.max()) if len(solutions) else 0
+    moves = np.zeros((len(solutions), max_len, 3), dtype=np.int64)
+
+    for r, solution in enumerate(solutions):
+        for i, move in enumerate(solution):
+            parsed = parser.parse_move(move) if isinstance(move, str) else move
+            try:
+                moves[r, i] = parsed
+            except (TypeError, ValueError):
+                moves[r, i] = PARSE_ERROR_SENTINEL
+
+    return moves, lengths
+
+
+def _top_disk(masks):
+    """Smallest disk on each peg bitmask (0 for an empty peg)"""
+    # frexp(2**k) has exponent k + 1, which is exactly disk k + 1; frexp(0) is 0
+    return np.frexp(masks & -masks)[1].astype(np.int64)
+
+
+def validate_batch(moves, num_disks, lengths=None):
+    """
+    Validate many move sequences at once, vectorized across runs.
+
+    moves: (runs x moves x 3) integer array of [disk_id, from_peg, to_peg]
+    num_disks: int or (runs,) array of disk counts (at most MAX_BATCH_DISKS)
+    lengths: optional (runs,) array of real sequence lengths; defaults to the
+             full padded width
+
+    Covers the paper's problem (3 pegs, all disks from peg 0 to peg 2).
+    Mirrors TowerOfHanoiSimulator.validate_complete_solution: unparseable
+    moves are recorded and skipped, validation stops at the first rule
+    violation. Returns a dict of per-run arrays: first_invalid_move (-1 if
+    none), error_class (of the first invalid move), valid_moves,
+    invalid_moves, final_pegs ((runs x 3) bitmasks, see decode_pegs) and
+    goal_achieved.
+    """
+    moves = np.asarray(moves, dtype=np.int64)
+    if moves.ndim != 3 or moves.shape[2] != 3:
+        raise ValueError(f"moves must have shape (runs, moves, 3), got {moves.shape}")
+
+    num_runs, max_len, _ = moves.shape
+    num_disks = np.broadcast_to(np.asarray(num_disks, dtype=np.int64), (num_runs,))
+    if num_runs and (num_disks.min() < 0 or num_disks.max() > MAX_BATCH_DISKS):
+        raise ValueError(f"validate_batch supports 0-{MAX_BATCH_DISKS} disks")
+    lengths = (np.full(num_runs, max_len, dtype=np.int64) if lengths is None
+               else np.asarray(lengths, dtype=np.int64))
+
+    full_masks = (np.int64(1) << num_disks) - 1
+    pegs = np.zeros((num_runs, 3), dtype=np.int64)
+    pegs[:, 0] = full_masks
+
+    first_invalid = np.full(num_runs, -1, dtype=np.int64)
+    error_class = np.full(num_runs, ERROR_NONE, dtype=np.int8)
+    valid_moves = np.zeros(num_runs, dtype=np.int64)
+    invalid_moves = np.zeros(num_runs, dtype=np.int64)
+    stopped = np.zeros(num_runs, dtype=bool)
+
+    for i in range(max_len):
+        # Only touch runs that still have moves left and have not stopped
+        runs = np.flatnonzero((i < lengths) & ~stopped)
+        if not len(runs):
+            break
+
+        disk_id, from_peg, to_peg = moves[runs, i].T
+        unparsed = ((disk_id == PARSE_ERROR_SENTINEL) &
+                    (from_peg == PARSE_ERROR_SENTINEL) &
+                    (to_peg == PARSE_ERROR_SENTINEL))
+
+        # Layer 1: peg boundary conditions
+        in_bounds = (0 <= from_peg) & (from_peg <= 2) & (0 <= to_peg) & (to_peg <= 2)
+        src = pegs[runs, np.clip(from_peg, 0, 2)]
+        dst = pegs[runs, np.clip(to_peg, 0, 2)]
+        src_top = _top_disk(src)
+        dst_top = _top_disk(dst)
+
+        # Layers 2-4; np.select reports the first failing layer
+        error = np.select(
+            [unparsed, ~in_bounds, src == 0, src_top != disk_id, (dst != 0) & (disk_id > dst_top)],
+            [ERROR_PARSE, ERROR_PEG_BOUNDS, ERROR_EMPTY_SOURCE, ERROR_NOT_TOP, ERROR_SIZE_ORDER],
+            ERROR_NONE
+        ).astype(np.int8)
+
+        # Record the first invalid move per run; rule violations stop the run
+        failed = error != ERROR_NONE
+        if failed.any():
+            failed_runs = runs[failed]
+            newly_failed = first_invalid[failed_runs] == -1
+            first_invalid[failed_runs[newly_failed]] = i
+            error_class[failed_runs[newly_failed]] = error[failed][newly_failed]
+            invalid_moves[failed_runs] += 1
+            stopped[failed_runs[~unparsed[failed]]] = True
+
+        # Apply the valid moves
+        applied = ~failed
+        rows = runs[applied]
+        bits = np.int64(1) << (disk_id[applied] - 1)
+        pegs[rows, from_peg[applied]] ^= bits
+        pegs[rows, to_peg[applied]] |= bits
+        valid_moves[rows] += 1
+
+    return {
+        "first_invalid_move": first_invalid,
+        "error_class": error_class,
+        "valid_moves": valid_moves,
+        "invalid_moves": invalid_moves,
+        "final_pegs": pegs,
+        "goal_achieved": pegs[:, 2] == full_masks
+    }
+
+
+def decode_pegs(peg_masks):
+    """Convert one run's (3,) peg bitmasks into simulator-style peg lists (bottom to top)"""
+    return [
+        [disk for disk in range(MAX_BATCH_DISKS, 0, -1) if int(mask) >> (disk - 1) & 1]
+        for mask in peg_masks
+    ]
@@ -0,0 +1,520 @@
+"""
+Development utility: performance benchmarks
+This file is not used in LangGraph Platform deployment
+"""
+
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .simulator import TowerOfHanoiSimulator
+from .batch_validator import moves_to_array, validate_batch
+from .prompts import prompt_text
+
+def _optimal_moves(num_disks, source=0, target=2, spare=1):
+    """Optimal 3-peg solution as move strings"""
+    if num_disks == 0:
+        return []
+    return (_optimal_moves(num_disks - 1, source, spare, target)
+            + [f"[{num_disks}, {source}, {target}]"]
+            + _optimal_moves(num_disks - 1, spare, target, source))
+
+def _random_corpus(num_runs, complexity_range, error_rate, seed):
+    """Optimal solutions with a random fraction corrupted at one position"""
+    rng = random.Random(seed)
+    solutions, disk_counts = [], []
+    for _ in range(num_runs):
+        num_disks = rng.randint(*complexity_range)
+        moves = _optimal_moves(num_disks)
+        if rng.random() < error_rate:
+            moves[rng.randrange(len(moves))] = f"[{rng.randint(1, num_disks)}, {rng.randint(0, 2)}, {rng.randint(0, 2)}]"
+        solutions.append(moves)
+        disk_counts.append(num_disks)
+    return solutions, disk_counts
+
+def benchmark_batch_validator(num_runs=10000, complexity_range=(3, 8), error_rate=0.5, seed=0):
+    """Time scalar validate_complete_solution vs vectorized validate_batch on one corpus"""
+    solutions, disk_counts = _random_corpus(num_runs, complexity_range, error_rate, seed)
+    
+    start = time.perf_counter()
+    scalar = [TowerOfHanoiSimulator(n).validate_complete_solution(s) for n, s in zip(disk_counts, solutions)]
+    scalar_seconds = time.perf_counter() - start
+    
+    moves, lengths = moves_to_array(solutions)
+    start = time.perf_counter()
+    batch = validate_batch(moves, disk_counts, lengths)
+    batch_seconds = time.perf_counter() - start
+    
+    mismatches = sum(
+        1 for i, analysis in enumerate(scalar)
+        if analysis["goal_achieved"] != bool(batch["goal_achieved"][i])
+        or (analysis["first_invalid_move"] if analysis["first_invalid_move"] is not None else -1)
+        != batch["first_invalid_move"][i]
+    )
+    
+    return {
+        "runs": num_runs,
+        "scalar_seconds": scalar_seconds,
+        "batch_seconds": batch_seconds,
+        "speedup": scalar_seconds / batch_seconds if batch_seconds else float("inf"),
+        "mismatches": mismatches
+    }
+
+@contextmanager
+def patched_llms(model):
+    """Temporarily route every agent module's LLM calls to model"""
+    from . import single_agent, hybrid_agent, multi_agent
+
+    saved = []
+    for module in (single_agent, hybrid_agent, multi_agent):
+        for name in ("creative_llm", "validation_llm"):
+            if hasattr(module, name):
+                saved.append((module, name, getattr(module, name)))
+                setattr(module, name, model)
+    try:
+        yield model
+    finally:
+        for module, name, original in saved:
+            setattr(module, name, original)
+
+def benchmark_async_validators(num_disks=3, latency=0.2, solver_type="multi"):
+    """
+    Per-iteration wall time of the solve loop under graph.ainvoke vs graph.invoke
+    with the mock model at a fixed latency. One multi-agent iteration makes four LLM
+    calls (solver, then three validators in parallel), so it should take about
+    2 x latency rather than 4 x latency.
+    """
+    from .mock_llm import MockChatModel
+    from .workflow import create_comparison_workflow
+
+    workflow = create_comparison_workflow()
+    inputs = {"complexity_start": num_disks, "complexity_end": num_disks, "solver_type": solver_type}
+    config = {"recursion_limit": 10000}
+    timings = {}
+
+    with patched_llms(MockChatModel(latency=latency)) as model:
+        for mode in ("async", "sync"):
+            calls = model.stats["calls"]
+            start = time.perf_counter()
+            if mode == "async":
+                result = asyncio.run(workflow.ainvoke(inputs, config))
+            else:
+                result = workflow.invoke(inputs, config)
+            seconds = time.perf_counter() - start
+            iterations = result["results"][0]["iterations"]
+            timings[mode] = {
+                "seconds": seconds,
+                "iterations": iterations,
+                "llm_calls": model.stats["calls"] - calls,
+                "seconds_per_iteration": seconds / iterations,
+                "solved": result["results"][0]["solved"]
+            }
+
+    calls_per_iteration = timings["async"]["llm_calls"] / timings["async"]["iterations"]
+    return {
+        "latency": latency,
+        "sequential_seconds_per_iteration": calls_per_iteration * latency,
+        **timings
+    }
+
+@contextmanager
+def fake_rate_limited_endpoint(requests_per_second=5, retry_after=1):
+    """
+    Local stand-in for the Anthropic Messages API that answers like
+    MockChatModel but returns 429 (with retry-after) once more than
+    requests_per_second requests arrive within one second. Reports usage as
+    if cache_control-marked prefixes were cached after their first request.
+    Yields (base URL, request counters).
+    """
+    from .mock_llm import MockChatModel
+
+    lock = threading.Lock()
+    recent = []
+    cached_prefixes = set()
+    counts = {"requests": 0, "rate_limited": 0}
+    mock = MockChatModel(latency=0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=()):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["content-length"])))
+            now = time.monotonic()
+            with lock:
+                counts["requests"] += 1
+                recent[:] = [t for t in recent if now - t < 1.0]
+                limited = len(recent) >= requests_per_second
+                if limited:
+                    counts["rate_limited"] += 1
+                else:
+                    recent.append(now)
+            if limited:
+                self._send(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}},
+                           [("retry-after", str(retry_after))])
+                return
+            content = request["messages"][-1]["content"]
+            prompt = prompt_text(content)
+            # Prefix caching: blocks up to the last cache_control marker are read from cache once seen
+            blocks = [] if isinstance(content, str) else content
+            marked = [i for i, block in enumerate(blocks) if block.get("cache_control")]
+            prefix = prompt_text(blocks[:marked[-1] + 1]) if marked else ""
+            with lock:
+                cache_hit = prefix in cached_prefixes
+                cached_prefixes.add(prefix)
+            self._send(200, {
+                "id": f"msg_{counts['requests']}", "type": "message", "role": "assistant",
+                "model": request["model"], "stop_reason": "end_turn", "stop_sequence": None,
+                "content": [{"type": "text", "text": mock.reply(prompt)[0]}],
+                "usage": {
+                    "input_tokens": (len(prompt) - len(prefix)) // 4,
+                    "cache_read_input_tokens": len(prefix) // 4 if cache_hit else 0,
+                    "cache_creation_input_tokens": 0 if cache_hit else len(prefix) // 4,
+                    "output_tokens": 20
+                }
+            })
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", counts
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def benchmark_rate_limited_calls(num_calls=40, client_threads=16, server_requests_per_second=5,
+                                 requests_per_minute=600, max_concurrency=8):
+    """
+    Fire num_calls concurrent validator prompts at the fake 429 endpoint through
+    an LLMScheduler. Every call must succeed (retried, not silently defaulted);
+    returns the endpoint counters and the scheduler metrics.
+    """
+    from langchain_anthropic import ChatAnthropic
+    from .llm_scheduler import LLMScheduler, ScheduledChatModel
+
+    scheduler = LLMScheduler(requests_per_minute=requests_per_minute, max_concurrency=max_concurrency,
+                             max_retries=10, base_delay=0.1)
+    prompt = "Check ONLY: Is exactly one disk being moved?\n\nPROPOSED MOVE: [1, 0, 2]\n"
+
+    with fake_rate_limited_endpoint(server_requests_per_second) as (url, counts):
+        llm = ScheduledChatModel(ChatAnthropic(model="claude-3-5-sonnet-20241022", api_key="fake",
+                                               base_url=url, max_retries=0, max_tokens=50), scheduler)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(client_threads) as pool:
+            responses = list(pool.map(lambda _: llm.invoke(prompt), range(num_calls)))
+        seconds = time.perf_counter() - start
+
+    return {
+        "calls": num_calls,
+        "succeeded": sum(1 for r in responses if json.loads(r.content).get("single_disk_valid")),
+        "seconds": seconds,
+        "endpoint": dict(counts),
+        "scheduler": scheduler.snapshot()
+    }
+
+def benchmark_streaming(num_disks=5, runs=3, latency=0.2, chunk_delay=0.002):
+    """
+    Single-agent sweep with and without stream_moves on the mock model, whose
+    answer is the optimal list followed by a long explanation: streaming
+    should stop at the closing bracket with the same results.
+    """
+    from .mock_llm import MockChatModel
+    from .workflow import create_comparison_workflow
+
+    workflow = create_comparison_workflow()
+    inputs = {"complexity_start": num_disks, "complexity_end": num_disks,
+              "solver_type": "single", "runs_per_complexity": runs}
+    timings = {}
+
+    with patched_llms(MockChatModel(latency=latency, chunk_chars=16, chunk_delay=chunk_delay,
+                                    explanation_sentences=40)):
+        for mode, streaming in (("full", False), ("streaming", True)):
+            start = time.perf_counter()
+            result = workflow.invoke({**inputs, "stream_moves": streaming})
+            stats = [r.get("streaming_stats") or {} for r in result["results"]]
+            timings[mode] = {
+                "seconds": time.perf_counter() - start,
+                "solved": [r["solved"] for r in result["results"]],
+                "avg_time_to_first_move": (sum(s["time_to_first_move"] for s in stats) / runs) if streaming else None,
+                "unused_output_budget": sum(s.get("unused_output_budget", 0) for s in stats),
+                "stop_reasons": [s.get("stop_reason") for s in stats]
+            }
+    return timings
+
+
+def _cell_inputs(inputs):
+    """Per-cell inputs of an experiment, as run_lane would build them"""
+    from .setup_nodes import setup_experiment_node
+    from .routing import experiment_cells
+
+    experiment = {**inputs, **setup_experiment_node(inputs)}
+    return [{**experiment, "current_complexity": complexity, "current_run": run, "results": []}
+            for complexity, run in experiment_cells(experiment)]
+
+def benchmark_graph_throughput(solver_types=("single", "hybrid", "multi"), complexity=(3, 5), runs=4,
+                               concurrency=(1, 2, 4, 8), latency="uniform:0.02:0.08",
+                               error_rate=0.1, validator_accuracy=0.95, seed=0):
+    """
+    Offline load test of the full graph on the mock provider (mock_llm.py):
+    - throughput: cells/s and LLM calls/s per solver type and max_concurrency
+    - checkpoint_overhead: every cell through the cell graph with a zero-latency
+      mock, compiled without vs with a MemorySaver checkpointer
+    Same seed, same answers, so solved rates are comparable across settings.
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+    from .mock_llm import MockChatModel
+    from .workflow import create_comparison_workflow, create_cell_workflow, CELL_RECURSION_LIMIT
+
+    workflow = create_comparison_workflow()
+    throughput = {}
+    for solver_type in solver_types:
+        inputs = {"complexity_start": complexity[0], "complexity_end": complexity[1],
+                  "solver_type": solver_type, "runs_per_complexity": runs}
+        throughput[solver_type] = {}
+        for lanes in concurrency:
+            model = MockChatModel(error_rate, validator_accuracy, latency, seed)
+            with patched_llms(model):
+                start = time.perf_counter()
+                result = workflow.invoke({**inputs, "max_concurrency": lanes}, {"recursion_limit": 10000})
+                seconds = time.perf_counter() - start
+            cells = len(result["results"])
+            throughput[solver_type][lanes] = {
+                "seconds": seconds,
+                "cells_per_second": cells / seconds,
+                "llm_calls_per_second": model.stats["calls"] / seconds,
+                "solved_rate": sum(r["solved"] for r in result["results"]) / cells,
+                "mock": dict(model.stats)
+            }
+
+    checkpoint_overhead = {}
+    cell_inputs = _cell_inputs({"complexity_start": complexity[0], "complexity_end": complexity[1],
+                                "solver_type": "multi", "runs_per_complexity": runs})
+    for name, checkpointer in (("none", False), ("memory", MemorySaver())):
+        cell_workflow = create_cell_workflow(checkpointer)
+        with patched_llms(MockChatModel(error_rate, validator_accuracy, "0", seed)):
+            start = time.perf_counter()
+            for index, cell_input in enumerate(cell_inputs):
+                cell_workflow.invoke(cell_input, {"recursion_limit": CELL_RECURSION_LIMIT,
+                                                  "configurable": {"thread_id": f"cell-{index}"}})
+            checkpoint_overhead[name] = time.perf_counter() - start
+    checkpoint_overhead["overhead"] = checkpoint_overhead["memory"] / checkpoint_overhead["none"] - 1
+
+    return {"throughput": throughput, "checkpoint_overhead": checkpoint_overhead}
+
+_STARTUP_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+agents = importlib.import_module(sys.argv[1] + ".agents")
+imported = time.perf_counter()
+agents.get_workflow()
+compiled = time.perf_counter()
+agents.warm_up()
+warm = time.perf_counter()
+print(json.dumps({"import_seconds": imported - start, "compile_seconds": compiled - imported,
+                  "warm_up_seconds": warm - compiled, "modules": len(sys.modules)}))
+"""
+
+def benchmark_startup(repeats=5, provider="mock"):
+    """
+    Cold start in fresh interpreters: importing agents (should build nothing),
+    then the first get_workflow() and warm_up() (LLM clients; the mock
+    provider by default, so no API key is needed). Medians over repeats.
+    """
+    package = __name__.rsplit(".", 1)[0]
+    env = {**os.environ, "HANOI_LLM_PROVIDER": provider, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, package], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+def benchmark_result_appends(num_runs=10000, window=1000, checkpointer=None):
+    """
+    Per-run cost of record_result over one long graph run: a loop graph that
+    records num_runs results, timed in windows of `window` runs. With the
+    results reducer the node returns one row, so the per-run time should stay
+    flat from the first window to the last; "concatenate" replays the old
+    behaviour (node copies the whole list and returns it) for comparison.
+    Pass a checkpointer (e.g. MemorySaver()) to include checkpoint writes.
+    """
+    from langgraph.graph import StateGraph, END
+    from langgraph.types import Overwrite
+    from .state import ExperimentState
+    from .utils import record_result_node
+
+    def concatenate_node(state):
+        return {"results": Overwrite(state.get("results", []) + record_result_node(state)["results"])}
+
+    report = {}
+    for mode, node in (("reducer", record_result_node), ("concatenate", concatenate_node)):
+        marks = []
+
+        def record(state, node=node, marks=marks):
+            if state["current_run"] % window == 0:
+                marks.append(time.perf_counter())
+            return {**node(state), "current_run": state["current_run"] + 1}
+
+        graph = StateGraph(ExperimentState)
+        graph.add_node("record_result", record)
+        graph.set_entry_point("record_result")
+        graph.add_conditional_edges("record_result",
+                                    lambda state: END if state["current_run"] > num_runs else "record_result")
+        compiled = graph.compile(checkpointer=checkpointer)
+
+        inputs = {"current_complexity": 3, "current_run": 0, "solver_type": "single", "results": [],
+                  "moves_made": [[1, 0, 2]] * 7, "solved": True}
+        config = {"recursion_limit": num_runs + 10, "configurable": {"thread_id": f"appends-{mode}"}}
+        start = time.perf_counter()
+        result = compiled.invoke(inputs, config)
+        windows = [(b - a) / window * 1e6 for a, b in zip(marks, marks[1:])]
+        report[mode] = {
+            "seconds": time.perf_counter() - start,
+            "results": len(result["results"]),
+            "first_window_us_per_run": windows[0],
+            "last_window_us_per_run": windows[-1],
+            "growth": windows[-1] / windows[0]
+        }
+    return report
+
+def _stable_details(detailed_results):
+    """detailed_results without the fields that differ between identical runs (store keys, wall-clock timings)"""
+    return [
+        {**{k: v for k, v in r.items() if k != "artifact_key"},
+         "solver_prompt_tokens": [{k: v for k, v in call.items() if k != "seconds"}
+                                  for call in r.get("solver_prompt_tokens") or []]}
+        for r in detailed_results
+    ]
+
+def benchmark_result_store(complexity=(3, 6), runs=5, solver_type="multi", backends=("inline", "sqlite", "jsonl")):
+    """
+    Checkpoint bytes and wall time of a mock-provider sweep with a MemorySaver
+    on the parent graph, per result store backend ("inline" keeps the
+    artifacts in state). detailed_results must come out identical.
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+    from . import result_store
+    from .mock_llm import MockChatModel
+    from .workflow import create_comparison_workflow
+
+    inputs = {"complexity_start": complexity[0], "complexity_end": complexity[1],
+              "solver_type": solver_type, "runs_per_complexity": runs}
+    report, details = {}, {}
+    saved_backend = result_store.RESULT_STORE
+    try:
+        for backend in backends:
+            result_store.RESULT_STORE = backend
+            saver = MemorySaver()
+            workflow = create_comparison_workflow(checkpointer=saver)
+            with patched_llms(MockChatModel(error_rate=0.1, validator_accuracy=0.95)):
+                start = time.perf_counter()
+                result = workflow.invoke(inputs, {"recursion_limit": 10000, "configurable": {"thread_id": backend}})
+                seconds = time.perf_counter() - start
+            details[backend] = _stable_details(result["final_report"]["detailed_results"])
+            report[backend] = {
+                "seconds": seconds,
+                "checkpoint_bytes": sum(len(blob) for _, blob in saver.blobs.values()),
+                "results_row_bytes": len(json.dumps(result["results"])) / len(result["results"])
+            }
+    finally:
+        result_store.RESULT_STORE = saved_backend
+    report["details_match"] = all(details[b] == details[backends[0]] for b in backends)
+    return report
+
+def _synthetic_results(num_results, seed=0):
+    """Compact result rows with random outcomes across the three solver types"""
+    rng = random.Random(seed)
+    results = []
+    for run in range(num_results):
+        solver_type = rng.choice(("single", "hybrid", "multi"))
+        results.append({
+            "complexity": rng.randint(3, 10), "run": run, "solver_type": solver_type,
+            "solved": rng.random() < 0.6, "moves_count": rng.randint(1, 1023), "iterations": rng.randint(1, 100),
+            "ai_validation_passed": None if solver_type == "single" else rng.random() < 0.7,
+            "ai_constraint_violations": [], "token_usage": {}
+        })
+    return results
+
+def benchmark_report(num_results=100000, seed=0):
+    """
+    Report generation over num_results synthetic rows: building the columnar
+    ResultsTable, the grouped aggregation behind every performance metric, and
+    the whole generate_report_node (which also walks the rows for the per-run
+    sections). Also writes and reloads the .npz export.
+    """
+    import tempfile
+    from .results_table import ResultsTable, performance_from_aggregates
+    from .utils import generate_report_node
+
+    results = _synthetic_results(num_results, seed)
+    timings = {"results": num_results}
+
+    start = time.perf_counter()
+    table = ResultsTable.from_results(results)
+    timings["table_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aggregates = table.aggregate()
+    for solver_type in ("single", "hybrid", "multi"):
+        performance_from_aggregates(aggregates.get(solver_type))
+    timings["aggregate_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_report_node({"complexity_start": 3, "complexity_end": 10, "results": results})
+    timings["report_seconds"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.npz")
+        table.save(path)
+        timings["export_bytes"] = os.path.getsize(path)
+        timings["export_roundtrip"] = len(ResultsTable.load(path)) == num_results
+    return timings
+
+def benchmark_history_policies(policies=(("full", None), ("last_k", 10), ("state_only", None)), solver_type="hybrid",
+                               complexity=(3, 7), runs=2, error_rate=0.1, validator_accuracy=0.95, seed=0):
+    """
+    A hybrid/multi sweep on the mock provider under each (history_policy,
+    history_window): solved rate, total solver input tokens and the report's
+    solver_prompts section (input tokens per call by complexity). The mock
+    answers from CURRENT STATE alone (its injected errors are seeded by the
+    prompt text, so solved rates differ only by noise); run the same sweep
+    on a real provider to compare accuracy and latency.
+    """
+    from .mock_llm import MockChatModel
+    from .workflow import create_comparison_workflow
+
+    workflow = create_comparison_workflow()
+    inputs = {"complexity_start": complexity[0], "complexity_end": complexity[1],
+              "solver_type": solver_type, "runs_per_complexity": runs}
+    report = {}
+    for policy, window in policies:
+        settings = {"history_policy": policy, **({"history_window": window} if window else {})}
+        with patched_llms(MockChatModel(error_rate, validator_accuracy, "0", seed)):
+            result = workflow.invoke({**inputs, **settings}, {"recursion_limit": 10000})
+        prompts = result["final_report"]["solver_prompts"]["by_complexity"]
+        name = f"{policy}:{window}" if window else policy
+        report[name] = {
+            "solved_rate": sum(r["solved"] for r in result["results"]) / len(result["results"]),
+            "solver_input_tokens": sum(c["avg_input_tokens"] * c["calls"] for c in prompts.values()),
+            "by_complexity": prompts
+        }
+    return report
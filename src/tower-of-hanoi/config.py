@@ -1,30 +1,94 @@
 import os
-from langchain_anthropic import ChatAnthropic
+import threading
+from .llm_cache import CachedChatModel
+from .llm_scheduler import ScheduledChatModel
 
-# Check for API key at startup
-if not os.getenv("ANTHROPIC_API_KEY"):
-    raise ValueError("Please set ANTHROPIC_API_KEY environment variable")
+# Model provider (HANOI_LLM_PROVIDER): "anthropic" or "mock" (offline, see mock_llm.py)
+LLM_PROVIDER = os.getenv("HANOI_LLM_PROVIDER", "anthropic")
 
-# Enable LangSmith tracing if available
-if os.getenv("LANGCHAIN_API_KEY"):
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_PROJECT"] = "tower-of-hanoi-solver-comparison"
+def _anthropic_llm(temperature, max_tokens):
+    # Calls go through the shared rate-limit-aware scheduler (llm_scheduler.py),
+    # which owns retries, so the client's own retries are disabled.
+    # Temperature-0 responses are cached (see llm_cache.py; HANOI_LLM_CACHE=off to disable)
+    from langchain_anthropic import ChatAnthropic
 
-# Initialize LLMs with different temperatures
-try:
-    # Creative LLM for move generation and problem solving
-    creative_llm = ChatAnthropic(
+    # Check for API key at startup
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise ValueError("Please set ANTHROPIC_API_KEY environment variable")
+    return CachedChatModel(ScheduledChatModel(ChatAnthropic(
         model="claude-3-5-sonnet-20241022",
-        temperature=0.7,  # Exploratory and creative
-        max_tokens=1000
-    )
-    
-    # Deterministic LLM for constraint validation
-    validation_llm = ChatAnthropic(
-        model="claude-3-5-sonnet-20241022", 
-        temperature=0,  # Consistent and reliable
-        max_tokens=500
-    )
-    
-except Exception as e:
-    raise ValueError(f"Failed to initialize LLMs: {str(e)}")
\ No newline at end of file
+        temperature=temperature,
+        max_tokens=max_tokens,
+        max_retries=0
+    )))
+
+def _mock_llm(temperature, max_tokens):
+    # No provider limits to respect and nothing worth caching: the mock is used
+    # unwrapped so benchmarks measure the graph itself
+    from .mock_llm import mock_llm_from_env
+    return mock_llm_from_env(temperature, max_tokens)
+
+# Provider name -> factory(temperature, max_tokens) returning a chat model
+LLM_PROVIDERS = {
+    "anthropic": _anthropic_llm,
+    "mock": _mock_llm
+}
+
+def create_llm(temperature, max_tokens, provider=None):
+    provider = provider or LLM_PROVIDER
+    if provider not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider {provider!r} (choose from {', '.join(LLM_PROVIDERS)})")
+    return LLM_PROVIDERS[provider](temperature, max_tokens)
+
+def enable_tracing():
+    """Enable LangSmith tracing if available (once, when the first client is built)"""
+    if os.getenv("LANGCHAIN_API_KEY"):
+        os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+        os.environ.setdefault("LANGCHAIN_PROJECT", "tower-of-hanoi-solver-comparison")
+
+class LazyLLM:
+    """
+    Stand-in for a chat model that builds it with create_llm() on first use
+    and then delegates every attribute to it. Memoized per process: a worker
+    forked before first use builds its own client.
+    """
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._llm = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._llm is None or self._pid != os.getpid():
+            with self._lock:
+                if self._llm is None or self._pid != os.getpid():
+                    enable_tracing()
+                    try:
+                        self._llm = create_llm(**self.settings)
+                    except Exception as e:
+                        raise ValueError(f"Failed to initialize LLMs: {str(e)}") from e
+                    self._pid = os.getpid()
+        return self._llm
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+# LLMs with different temperatures, created on first call (see LazyLLM)
+
+# Creative LLM for move generation and problem solving
+creative_llm = LazyLLM(
+    temperature=0.7,  # Exploratory and creative
+    max_tokens=1000
+)
+
+# Deterministic LLM for constraint validation
+validation_llm = LazyLLM(
+    temperature=0,  # Consistent and reliable
+    max_tokens=500
+)
+
+def warm_up_llms():
+    """Build both clients now (servers call this before taking traffic)"""
+    creative_llm.get()
+    validation_llm.get()
@@ -0,0 +1,96 @@
+import random
+from functools import lru_cache
+
+# cycle_policy values
+CYCLE_POLICY_OFF = "off"    # Only record cycle statistics
+CYCLE_POLICY_HINT = "hint"  # Tell the solver it is cycling
+CYCLE_POLICY_FAIL = "fail"  # Stop the run and go to the goal checker
+
+# Fixed seed so hashes are stable across processes and checkpoints
+_ZOBRIST_SEED = 0x70E4
+
+@lru_cache(maxsize=None)
+def zobrist_table(num_disks, num_pegs):
+    """Random 64-bit key per (disk, peg); table[disk][peg], disk index 0 unused"""
+    rng = random.Random(f"{_ZOBRIST_SEED}:{num_disks}:{num_pegs}")
+    return tuple(
+        tuple(rng.getrandbits(64) for _ in range(num_pegs))
+        for _ in range(num_disks + 1)
+    )
+
+def zobrist_hash(pegs):
+    """Full Zobrist hash of a peg configuration (XOR of each disk's (disk, peg) key)"""
+    table = zobrist_table(sum(len(peg) for peg in pegs), len(pegs))
+    state_hash = 0
+    for peg_index, peg in enumerate(pegs):
+        for disk in peg:
+            state_hash ^= table[disk][peg_index]
+    return state_hash
+
+def _empty_cycle_stats():
+    return {
+        "distinct_states": 1,
+        "repeated_visits": 0,
+        "max_state_visits": 1,
+        "hints_injected": 0,
+        "cycle_abort": False
+    }
+
+def initial_cycle_state(pegs):
+    """Cycle-tracking fields for a freshly set up problem"""
+    state_hash = zobrist_hash(pegs)
+    return {
+        "state_hash": state_hash,
+        "visited_states": {str(state_hash): 1},
+        "cycle_stats": _empty_cycle_stats(),
+        "cycle_hint": ""
+    }
+
+def record_state_visit(state, disk_id, from_peg, to_peg):
+    """
+    Incrementally rehash after an applied move and count the visit.
+    Returns (state update, abort) where abort is True when cycle_policy is
+    "fail" and the new state has been reached more than max_state_repeats times.
+    """
+    num_pegs = len(state["current_state"]["pegs"])
+    table = zobrist_table(state["current_complexity"], num_pegs)
+    state_hash = state.get("state_hash")
+    if state_hash is None:
+        state_hash = zobrist_hash(state["current_state"]["pegs"])
+    state_hash ^= table[disk_id][from_peg] ^ table[disk_id][to_peg]
+
+    visited = dict(state.get("visited_states") or {})
+    key = str(state_hash)
+    visits = visited.get(key, 0) + 1
+    visited[key] = visits
+
+    stats = dict(state.get("cycle_stats") or _empty_cycle_stats())
+    if visits == 1:
+        stats["distinct_states"] += 1
+    else:
+        stats["repeated_visits"] += 1
+    stats["max_state_visits"] = max(stats["max_state_visits"], visits)
+
+    policy = state.get("cycle_policy", CYCLE_POLICY_OFF)
+    cycling = visits > state.get("max_state_repeats", 2)
+    hint = ""
+    abort = False
+    if cycling and policy == CYCLE_POLICY_HINT:
+        hint = (f"You are cycling: the current state has now been reached {visits} times. "
+                f"Choose a move that leads to a state you have not visited yet.")
+        stats["hints_injected"] += 1
+    elif cycling and policy == CYCLE_POLICY_FAIL:
+        stats["cycle_abort"] = True
+        abort = True
+
+    return {
+        "state_hash": state_hash,
+        "visited_states": visited,
+        "cycle_stats": stats,
+        "cycle_hint": hint
+    }, abort
+
+def with_cycle_hint(prompt, state):
+    """Append the pending cycle hint (if any) to a solver prompt"""
+    hint = state.get("cycle_hint", "")
+    return f"{prompt}\nWARNING: {hint}\n" if hint else prompt
@@ -0,0 +1,124 @@
+"""
+Durable log of completed cells, for resuming an interrupted sweep.
+
+Sweeps started with an experiment_id write each (complexity, run,
+solver_type) cell's result row here as soon as the cell finishes. Starting
+the same experiment_id again loads those rows back in setup_experiment, runs
+only the missing cells and merges both in collect_results, so the report is
+the one an uninterrupted run would have produced. The rows are the ones
+kept in graph state: with a result store, compact rows whose artifacts stay
+in the store (keep HANOI_RESULT_STORE on a durable backend for resumed
+detailed_results).
+
+Rows are logged with a fingerprint of the inputs that shape a cell (see
+CELL_CONFIG_DEFAULTS): restarting an experiment_id with a different
+configuration raises instead of merging incompatible rows.
+
+The log is a SQLite file shared across processes
+(~/.cache/tower-of-hanoi/experiments.sqlite, HANOI_EXPERIMENT_LOG_PATH to
+override).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from .result_store import RESULT_STORE_DIR
+from .cycle_detection import CYCLE_POLICY_OFF
+from .prevalidation import PREVALIDATION_OFF
+from .prompts import DEFAULT_HISTORY_WINDOW
+
+EXPERIMENT_LOG_PATH = os.getenv("HANOI_EXPERIMENT_LOG_PATH",
+                                os.path.join(RESULT_STORE_DIR, "experiments.sqlite"))
+
+# Experiment inputs that change what a cell does, with the defaults the nodes apply
+CELL_CONFIG_DEFAULTS = {
+    "num_pegs": 3,
+    "initial_pegs": None,
+    "goal_pegs": None,
+    "random_start": False,
+    "random_goal": False,
+    "seed": 0,
+    "cycle_policy": CYCLE_POLICY_OFF,
+    "max_state_repeats": 2,
+    "prevalidation_mode": PREVALIDATION_OFF,
+    "stream_moves": False,
+    "stop_at_invalid_move": False,
+    "history_policy": "full",
+    "history_window": DEFAULT_HISTORY_WINDOW
+}
+
+def config_fingerprint(state):
+    """Hash of the state's cell configuration (unset inputs count as their defaults)"""
+    config = {key: state.get(key, default) for key, default in CELL_CONFIG_DEFAULTS.items()}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+class ConfigMismatchError(ValueError):
+    """An experiment_id was restarted with a different cell configuration"""
+
+class ExperimentLog:
+    """
+    Thread-safe SQLite table of JSON-encoded result rows keyed by
+    (experiment_id, solver_type, complexity, run), each with the
+    config_fingerprint of the sweep that produced it
+    """
+
+    def __init__(self, path=None):
+        self.path = path or EXPERIMENT_LOG_PATH
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cells (experiment_id TEXT NOT NULL, solver_type TEXT NOT NULL, "
+                "complexity INTEGER NOT NULL, run INTEGER NOT NULL, config TEXT NOT NULL, result TEXT NOT NULL, "
+                "PRIMARY KEY (experiment_id, solver_type, complexity, run))"
+            )
+        return self._db
+
+    def put(self, experiment_id, config, results):
+        """Record the result rows of finished cells (one transaction)"""
+        with self._lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO cells (experiment_id, solver_type, complexity, run, config, result) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(experiment_id, result["solver_type"], result["complexity"], result["run"], config,
+                  json.dumps(result))
+                 for result in results]
+            )
+            db.commit()
+
+    def completed(self, experiment_id, solver_type, config):
+        """
+        Result rows of the experiment's completed cells for solver_type, in
+        (complexity, run) order. Raises ConfigMismatchError if any was
+        logged under another config fingerprint.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT config, result FROM cells WHERE experiment_id = ? AND solver_type = ? "
+                "ORDER BY complexity, run",
+                (experiment_id, solver_type)
+            ).fetchall()
+        if any(logged != config for logged, _ in rows):
+            raise ConfigMismatchError(
+                f"Experiment {experiment_id!r} ({solver_type}) was logged with a different configuration; "
+                "use a new experiment_id or the original inputs"
+            )
+        return [json.loads(result) for _, result in rows]
+
+_experiment_log = None
+
+def get_experiment_log():
+    """Process-wide ExperimentLog"""
+    global _experiment_log
+    if _experiment_log is None:
+        _experiment_log = ExperimentLog()
+    return _experiment_log
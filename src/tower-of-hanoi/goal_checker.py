@@ -1,4 +1,6 @@
-from .simulator import TowerOfHanoiSimulator
+from .simulator import CompactTowerOfHanoiSimulator
+from .oracle import progress_metrics
+from .state_index import index_for_problem, distance_trace
 
 def goal_checker_node(state):
     """
@@ -13,8 +15,13 @@ def goal_checker_node(state):
     
     num_disks = state["current_complexity"]
     
-    # Initialize simulator
-    simulator = TowerOfHanoiSimulator(num_disks)
+    # Initialize simulator for this problem's pegs and start/goal configuration
+    simulator = CompactTowerOfHanoiSimulator(
+        num_disks,
+        num_pegs=state.get("num_pegs", 3),
+        initial_pegs=state.get("initial_state", {}).get("pegs"),
+        goal_pegs=state.get("goal_state", {}).get("pegs")
+    )
     
     # All approaches now use the same structure
     moves_sequence = state.get("moves_made", [])
@@ -23,7 +30,8 @@ def goal_checker_node(state):
     if moves_sequence:
         analysis = simulator.validate_complete_solution(moves_sequence)
     else:
-        # No moves to validate
+        # No moves to validate (a single-agent answer without a parseable move list is an extraction failure)
+        extraction_error = state.get("extraction_error")
         analysis = {
             "total_moves": 0,
             "valid_moves": 0,
@@ -31,10 +39,29 @@ def goal_checker_node(state):
             "first_invalid_move": None,
             "final_state": simulator.pegs,  # Initial state
             "goal_achieved": False,
+            "move_deltas": [],
             "move_details": [],
-            "error_summary": ["No moves provided"]
+            "state_snapshots": [{"move_index": -1, "state": simulator.pegs}],
+            "error_summary": [f"Move extraction failed: {extraction_error}" if extraction_error else "No moves provided"],
+            "extraction_failed": bool(extraction_error)
         }
     
+    # Distance-to-goal metrics from the closed-form oracle (cheap even at n=20)
+    analysis.update(progress_metrics(
+        analysis["final_state"], analysis["valid_moves"],
+        simulator.initial_pegs, simulator.goal_pegs
+    ))
+    
+    # Per-move "did this move get closer?" analytics when a precomputed state index exists
+    state_index = index_for_problem(num_disks, simulator.goal_pegs)
+    if state_index is not None:
+        trace = distance_trace(simulator.initial_pegs, analysis["move_deltas"], state_index)
+        steps = [after - before for before, after in zip(trace, trace[1:])]
+        analysis["distance_trace"] = trace
+        analysis["moves_closer"] = sum(1 for step in steps if step < 0)
+        analysis["moves_farther"] = sum(1 for step in steps if step > 0)
+        analysis["moves_same_distance"] = sum(1 for step in steps if step == 0)
+    
     # Determine success/failure using the same criteria for all approaches
     solved = analysis["goal_achieved"]
     failed = not solved
@@ -65,13 +92,15 @@ def goal_checker_node(state):
             failure_details["iterations_used"] = state.get("iteration_count", 0)
             failure_details["max_iterations"] = state.get("max_moves", 50)
             failure_details["timeout"] = state.get("iteration_count", 0) >= state.get("max_moves", 50)
+            failure_details["cycle_stats"] = state.get("cycle_stats", {})
         
         # Add specific error details for the first failure
+        # (move_details only holds the moves that were not valid)
         if analysis["first_invalid_move"] is not None:
-            move_details = analysis["move_details"]
-            if analysis["first_invalid_move"] < len(move_details):
-                first_error = move_details[analysis["first_invalid_move"]]
-                failure_details["first_error_details"] = first_error
+            for detail in analysis["move_details"]:
+                if detail["move_index"] == analysis["first_invalid_move"]:
+                    failure_details["first_error_details"] = detail
+                    break
     
     return {
         "solved": solved,
@@ -1,44 +1,26 @@
 import json
+import time
 from langsmith import traceable
 from .config import creative_llm, validation_llm
+from .utils import describe_goal
+from .prevalidation import record_validator_agreement
+from .cycle_detection import record_state_visit, with_cycle_hint
+from .state_index import index_for_problem
+from .prompts import token_usage, move_history, solver_prompt_record
 
-@traceable(name="hybrid_agent.solver")
-def hybrid_agent_solver_node(state):
-    """
-    Hybrid approach: Generate strategic next move
-    Handles both normal move generation and regeneration after validation failures
-    """
-    
-    # Check if this is a regeneration request
+def _solver_prompt(state):
+    """Regeneration prompt after a failed validation, otherwise the next-move prompt"""
     if state.get("regeneration_needed", False):
         # Use the prepared regeneration prompt
-        prompt = state.get("regeneration_prompt", "")
-        
-        response = creative_llm.invoke(prompt)
-        
-        try:
-            result = json.loads(response.content.strip())
-            proposed_move = result.get("proposed_move", "[1, 0, 2]")
-        except:
-            proposed_move = "[1, 0, 2]"
-        
-        # Clear regeneration context for next iteration
-        return {
-            "proposed_move": proposed_move,
-            "regeneration_needed": False,
-            "failed_move": None,
-            "validation_errors": [],
-            "regeneration_prompt": ""
-        }
+        return with_cycle_hint(state.get("regeneration_prompt", ""), state)
     
-    else:
-        # Normal move generation
-        prompt = f"""
+    # Normal move generation
+    prompt = f"""
         Generate strategic next move for {state["current_complexity"]}-disk Tower of Hanoi:
 
         CURRENT STATE: {state["current_state"]}
-        GOAL: Move all disks to peg 2
-        MOVES SO FAR: {state.get("moves_made", [])}
+        GOAL: {describe_goal(state["goal_state"]["pegs"])}
+        MOVES SO FAR: {move_history(state)}
         ITERATION: {state.get("iteration_count", 0)}
 
         Focus on strategy and game progression. Validation will happen separately.
@@ -49,25 +31,52 @@ def hybrid_agent_solver_node(state):
             "strategy": "reasoning"
         }}
         """
-        
-        response = creative_llm.invoke(prompt)
-        
-        try:
-            result = json.loads(response.content.strip())
-            proposed_move = result.get("proposed_move", "[1, 0, 2]")
-        except:
-            proposed_move = "[1, 0, 2]"
-        
-        return {"proposed_move": proposed_move}
+    return with_cycle_hint(prompt, state)
 
-@traceable(name="hybrid_agent.validator")
-def hybrid_agent_validator_node(state):
+def _solver_update(state, response, prompt_record):
+    usage = token_usage("hybrid_agent_solver", response)
+    try:
+        result = json.loads(response.content.strip())
+        proposed_move = result.get("proposed_move", "[1, 0, 2]")
+    except:
+        proposed_move = "[1, 0, 2]"
+    
+    if state.get("regeneration_needed", False):
+        # Clear regeneration context for next iteration
+        return {
+            "proposed_move": proposed_move,
+            "regeneration_needed": False,
+            "failed_move": None,
+            "validation_errors": [],
+            "regeneration_prompt": "",
+            "token_usage": usage,
+            "solver_prompt_tokens": prompt_record
+        }
+    return {"proposed_move": proposed_move, "token_usage": usage, "solver_prompt_tokens": prompt_record}
+
+@traceable(name="hybrid_agent.solver")
+def hybrid_agent_solver_node(state):
     """
-    Single validator checking all constraints
-    Returns validation result without fixing anything
+    Hybrid approach: Generate strategic next move
+    Handles both normal move generation and regeneration after validation failures
     """
-    
-    prompt = f"""
+    prompt = _solver_prompt(state)
+    start = time.perf_counter()
+    response = creative_llm.invoke(prompt)
+    seconds = time.perf_counter() - start
+    return _solver_update(state, response, solver_prompt_record(state, prompt, response, seconds))
+
+@traceable(name="hybrid_agent.solver")
+async def ahybrid_agent_solver_node(state):
+    """Async hybrid_agent_solver_node"""
+    prompt = _solver_prompt(state)
+    start = time.perf_counter()
+    response = await creative_llm.ainvoke(prompt)
+    seconds = time.perf_counter() - start
+    return _solver_update(state, response, solver_prompt_record(state, prompt, response, seconds))
+
+def _validator_prompt(state):
+    return f"""
     Validate this Tower of Hanoi move against ALL constraints:
 
     PROPOSED MOVE: {state.get("proposed_move", "")}
@@ -85,9 +94,8 @@ def hybrid_agent_validator_node(state):
         "explanation": "brief explanation of validation result"
     }}
     """
-    
-    response = validation_llm.invoke(prompt)
-    
+
+def _validator_update(response):
     try:
         result = json.loads(response.content.strip())
         valid = result.get("valid", False)
@@ -98,9 +106,25 @@ def hybrid_agent_validator_node(state):
     
     return {
         "overall_valid": valid,
-        "constraint_violations": violations
+        "constraint_violations": violations,
+        "token_usage": token_usage("hybrid_agent_validator", response)
     }
 
+@traceable(name="hybrid_agent.validator")
+def hybrid_agent_validator_node(state):
+    """
+    Single validator checking all constraints
+    Returns validation result without fixing anything
+    """
+    response = validation_llm.invoke(_validator_prompt(state))
+    return _validator_update(response)
+
+@traceable(name="hybrid_agent.validator")
+async def ahybrid_agent_validator_node(state):
+    """Async hybrid_agent_validator_node"""
+    response = await validation_llm.ainvoke(_validator_prompt(state))
+    return _validator_update(response)
+
 def hybrid_agent_apply_move_node(state):
     """
     Apply move node handles ALL logic:
@@ -115,16 +139,20 @@ def hybrid_agent_apply_move_node(state):
     iteration_count = state.get("iteration_count", 0)
     max_moves = state.get("max_moves", 50)
     
+    # AI-vs-simulator agreement (only when prevalidation ran the simulator)
+    agreement = record_validator_agreement(state, validation_passed)
+    
     if validation_passed:
         # Validation passed - apply the move
         move_str = state.get("proposed_move", "[1,0,2]")
+        tracking_update, cycle_abort = {}, False
         
         try:
             move = json.loads(move_str)
             disk_id, from_peg, to_peg = move[0], move[1], move[2]
             
             # Apply move to update current state
-            if (from_peg < 3 and to_peg < 3 and 
+            if (from_peg < len(current_pegs) and to_peg < len(current_pegs) and 
                 len(current_pegs[from_peg]) > 0 and
                 current_pegs[from_peg][-1] == disk_id):
                 
@@ -134,6 +162,14 @@ def hybrid_agent_apply_move_node(state):
                 
                 new_state = {"pegs": new_pegs}
                 new_moves = moves_made + [move_str]
+                
+                # Zobrist-hash the new state and count repeat visits
+                tracking_update, cycle_abort = record_state_visit(state, disk_id, from_peg, to_peg)
+                
+                # Live distance to goal from the precomputed state index (if built)
+                state_index = index_for_problem(state["current_complexity"], goal_pegs)
+                if state_index is not None:
+                    tracking_update["distance_to_goal"] = state_index.distance(state_index.encode(new_pegs))
             else:
                 # Move cannot be applied - keep current state
                 new_state = state["current_state"]
@@ -145,16 +181,18 @@ def hybrid_agent_apply_move_node(state):
             new_moves = moves_made
         
         # Check if puzzle is completed
-        solved = new_state["pegs"][2] == goal_pegs[2]
+        solved = new_state["pegs"] == goal_pegs
         failed = iteration_count + 1 >= max_moves and not solved
         
         result = {
             "current_state": new_state,
             "moves_made": new_moves,
-            "iteration_count": iteration_count + 1
+            "iteration_count": iteration_count + 1,
+            **agreement,
+            **tracking_update
         }
         
-        if solved or failed:
+        if solved or failed or cycle_abort:
             result["route_to"] = "goal_checker"
         else:
             result["route_to"] = "continue_solving"
@@ -166,11 +204,14 @@ def hybrid_agent_apply_move_node(state):
         failed_move = state.get("proposed_move", "")
         violations = state.get("constraint_violations", [])
         
+        out_of_moves = iteration_count + 1 >= max_moves
+        
         return {
-            "current_state": current_pegs,  # No state change
-            "moves_made": moves_made,       # No new moves
+            "current_state": state["current_state"],  # No state change
+            "moves_made": moves_made,                 # No new moves
             "iteration_count": iteration_count + 1,
-            "route_to": "regenerate_solver",
+            "route_to": "goal_checker" if out_of_moves else "regenerate_solver",
+            **agreement,
             
             # Regeneration context for solver
             "regeneration_needed": True,
@@ -183,7 +224,7 @@ Your previous move {failed_move} was INVALID.
 AI Validator found these violations: {', '.join(violations)}
 
 Current state: {state["current_state"]}
-Moves so far: {moves_made}
+Moves so far: {move_history(state, moves_made)}
 
 Generate a DIFFERENT valid move that avoids the previous error.
 Focus on the constraint violations and choose a completely different approach.
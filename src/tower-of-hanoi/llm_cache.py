@@ -0,0 +1,251 @@
+"""
+Response cache for deterministic LLM calls.
+
+Two tiers: an in-memory LRU per process and an on-disk SQLite table shared
+across processes and sweeps, evicted least-recently-used once it exceeds a
+byte budget. Keys are (model, temperature, max_tokens, whitespace-normalized
+prompt). By default only temperature-0 models are cached, so the creative
+solver keeps sampling fresh responses.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.messages import AIMessage, AIMessageChunk
+from .prompts import prompt_text
+
+# HANOI_LLM_CACHE: "auto" (temperature 0 only), "on" (all models) or "off"
+CACHE_MODE = os.getenv("HANOI_LLM_CACHE", "auto")
+CACHE_PATH = os.getenv(
+    "HANOI_LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "tower-of-hanoi", "llm_cache.sqlite")
+)
+CACHE_MAX_BYTES = int(os.getenv("HANOI_LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_MEMORY_ENTRIES = int(os.getenv("HANOI_LLM_CACHE_MEMORY_ENTRIES", 2048))
+# Puts between re-reads of the table size (other processes write to it too)
+CACHE_SIZE_RESYNC_PUTS = 256
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so indentation-only differences share a cache entry"""
+    return " ".join(prompt_text(prompt).split())
+
+class ResponseCache:
+    """
+    Thread-safe two-tier (LRU + SQLite) store of response texts. The table
+    size is tracked as a running total, re-read from the table every
+    CACHE_SIZE_RESYNC_PUTS puts to pick up other processes' writes
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, memory_entries=CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._total_bytes = None
+        self._puts_since_resync = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    def _connection(self):
+        # A forked worker opens its own connection (SQLite connections do not survive fork)
+        if self._db is None or self._pid != os.getpid():
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._pid = os.getpid()
+            self._total_bytes = None
+        return self._db
+
+    def _table_bytes(self, db):
+        self._total_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._puts_since_resync = 0
+        return self._total_bytes
+
+    @staticmethod
+    def make_key(model, temperature, max_tokens, prompt):
+        raw = f"{model}\x00{temperature}\x00{max_tokens}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, response):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+            db = self._connection()
+            row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.stats["disk_hits"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key, response):
+        with self._lock:
+            self._remember(key, response)
+            db = self._connection()
+            size = len(response.encode("utf-8"))
+            replaced = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            if self._total_bytes is None or self._puts_since_resync >= CACHE_SIZE_RESYNC_PUTS:
+                self._table_bytes(db)
+            else:
+                self._total_bytes += size - (replaced[0] if replaced else 0)
+                self._puts_since_resync += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict(db)
+            db.commit()
+
+    def count(self, stat):
+        """Increment one of the stats counters"""
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _evict(self, db):
+        """Drop least-recently-used rows until the table fits in max_bytes"""
+        total = self._total_bytes
+        while total > self.max_bytes:
+            oldest = db.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 64").fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._memory.pop(key, None)
+                self.stats["evictions"] += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._total_bytes = total
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+_response_cache = None
+_response_cache_pid = None
+
+def get_response_cache():
+    """Process-wide shared cache (a forked worker gets its own)"""
+    global _response_cache, _response_cache_pid
+    if _response_cache is None or _response_cache_pid != os.getpid():
+        _response_cache = ResponseCache()
+        _response_cache_pid = os.getpid()
+    return _response_cache
+
+def cache_stats_since(baseline):
+    """Cache counters accumulated since a snapshot() baseline, with the hit rate"""
+    current = get_response_cache().snapshot()
+    delta = {key: value - (baseline or {}).get(key, 0) for key, value in current.items()}
+    lookups = delta["memory_hits"] + delta["disk_hits"] + delta["misses"]
+    delta["hit_rate"] = (delta["memory_hits"] + delta["disk_hits"]) / lookups if lookups else None
+    return delta
+
+class CachedChatModel:
+    """
+    Wraps a chat model's invoke/ainvoke/stream/astream with the response cache.
+    Streams are only stored when consumed to the end.
+    Anything else is delegated to the wrapped model.
+    """
+
+    def __init__(self, llm, enabled=None, cache=None):
+        self.llm = llm
+        self.cache = cache or get_response_cache()
+        temperature = getattr(llm, "temperature", None)
+        if enabled is None:
+            enabled = CACHE_MODE == "on" or (CACHE_MODE == "auto" and temperature == 0)
+        self.enabled = enabled
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _key(self, prompt):
+        model = getattr(self.llm, "model", None) or getattr(self.llm, "model_name", type(self.llm).__name__)
+        return self.cache.make_key(model, getattr(self.llm, "temperature", None),
+                                   getattr(self.llm, "max_tokens", None), prompt)
+
+    def invoke(self, prompt, *args, **kwargs):
+        if not self.enabled:
+            self.cache.count("bypassed")
+            return self.llm.invoke(prompt, *args, **kwargs)
+
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = self.llm.invoke(prompt, *args, **kwargs)
+        if isinstance(response.content, str):
+            self.cache.put(key, response.content)
+        return response
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        if not self.enabled:
+            self.cache.count("bypassed")
+            return await self.llm.ainvoke(prompt, *args, **kwargs)
+
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return AIMessage(content=cached)
+        response = await self.llm.ainvoke(prompt, *args, **kwargs)
+        if isinstance(response.content, str):
+            self.cache.put(key, response.content)
+        return response
+
+    def stream(self, prompt, *args, **kwargs):
+        if not self.enabled:
+            self.cache.count("bypassed")
+            yield from self.llm.stream(prompt, *args, **kwargs)
+            return
+
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield AIMessageChunk(content=cached)
+            return
+        parts = []
+        for chunk in self.llm.stream(prompt, *args, **kwargs):
+            parts.append(prompt_text(chunk.content))
+            yield chunk
+        self.cache.put(key, "".join(parts))
+
+    async def astream(self, prompt, *args, **kwargs):
+        if not self.enabled:
+            self.cache.count("bypassed")
+            async for chunk in self.llm.astream(prompt, *args, **kwargs):
+                yield chunk
+            return
+
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield AIMessageChunk(content=cached)
+            return
+        parts = []
+        async for chunk in self.llm.astream(prompt, *args, **kwargs):
+            parts.append(prompt_text(chunk.content))
+            yield chunk
+        self.cache.put(key, "".join(parts))
@@ -0,0 +1,364 @@
+"""
+Rate-limit-aware scheduler shared by every LLM call in the process.
+
+Each call waits for a concurrency slot and for request and token budget
+(token buckets refilled per minute; a reservation may overdraw the bucket, the
+caller then waits until it is paid back). A call reserves its estimated input
+plus max_tokens of output, and the difference to the tokens its response
+reports is settled afterwards. Rate-limit responses (429, and 529
+overloaded) are retried with full-jitter exponential backoff, honouring
+retry-after. The concurrency limit adapts AIMD-style: +1/limit per success,
+halved on every rate-limit response. Anything else, or running out of
+retries, raises instead of being papered over by the callers.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from .prompts import estimate_tokens
+
+REQUESTS_PER_MINUTE = float(os.getenv("HANOI_REQUESTS_PER_MINUTE", 50))
+TOKENS_PER_MINUTE = float(os.getenv("HANOI_TOKENS_PER_MINUTE", 40000))
+MAX_LLM_CONCURRENCY = int(os.getenv("HANOI_MAX_LLM_CONCURRENCY", 8))
+MAX_RETRIES = int(os.getenv("HANOI_LLM_MAX_RETRIES", 6))
+
+RATE_LIMIT_STATUS_CODES = (429, 529)
+
+class LLMCallError(RuntimeError):
+    """An LLM call failed for good (rate limited past max_retries)"""
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute. It holds at most
+    burst_seconds worth of refill, so a full bucket cannot fire a whole
+    minute's budget at once (providers replenish continuously too).
+    """
+
+    def __init__(self, rate_per_minute, burst_seconds=1.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take amount now (possibly overdrawing) and return the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            return -self.level / self.rate if self.level < 0 else 0.0
+
+    def refund(self, amount):
+        """Give back amount of an earlier reservation (negative: charge it without waiting)"""
+        with self._lock:
+            self.level = min(self.capacity, self.level + amount)
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+def is_rate_limit_error(error):
+    return getattr(error, "status_code", None) in RATE_LIMIT_STATUS_CODES
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class LLMScheduler:
+    """Process-wide admission control for LLM calls (see module docstring)"""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrency=MAX_LLM_CONCURRENCY, max_retries=MAX_RETRIES,
+                 base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self._slots = threading.Condition()
+        # Futures of async callers waiting for a slot, as (event loop, future)
+        self._async_waiters = []
+        self.stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failed_calls": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "min_concurrency_limit": max_concurrency
+        }
+
+    # Concurrency slots (AIMD limit)
+
+    def _try_acquire_slot(self):
+        if self.in_flight < max(1, int(self.concurrency_limit)):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _release_slot(self, rate_limited):
+        with self._slots:
+            self.in_flight -= 1
+            if rate_limited:
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                self.stats["min_concurrency_limit"] = min(
+                    self.stats["min_concurrency_limit"], int(self.concurrency_limit))
+            else:
+                self.concurrency_limit = min(self.max_concurrency,
+                                             self.concurrency_limit + 1 / self.concurrency_limit)
+            self._slots.notify_all()
+            for loop, waiter in self._async_waiters:
+                loop.call_soon_threadsafe(_wake, waiter)
+            self._async_waiters.clear()
+
+    async def _aacquire_slot(self):
+        """Wait for a slot without blocking the event loop (woken by _release_slot, from any thread)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._slots:
+                if self._try_acquire_slot():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._slots:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _backoff(self, attempt, error):
+        """Full-jitter exponential backoff, at least retry-after when the server sent one"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, _retry_after(error) or 0.0)
+
+    def _record_wait(self, seconds):
+        with self._slots:
+            self.stats["queue_wait_seconds"] += seconds
+            self.stats["max_queue_wait_seconds"] = max(self.stats["max_queue_wait_seconds"], seconds)
+
+    def _count(self, key):
+        with self._slots:
+            self.stats[key] += 1
+
+    def _give_up(self, error):
+        self._count("failed_calls")
+        return LLMCallError(f"LLM call still rate limited after {self.max_retries} retries: {error}")
+
+    def _admit(self, prompt, max_tokens):
+        """
+        Block until a concurrency slot and request/token budget are available;
+        returns the tokens reserved (input estimate + max_tokens)
+        """
+        start = time.monotonic()
+        with self._slots:
+            while not self._try_acquire_slot():
+                self._slots.wait()
+        reserved = estimate_tokens(prompt) + max_tokens
+        time.sleep(max(self.requests.reserve(1), self.tokens.reserve(reserved)))
+        self._record_wait(time.monotonic() - start)
+        self._count("attempts")
+        return reserved
+
+    async def _aadmit(self, prompt, max_tokens):
+        start = time.monotonic()
+        await self._aacquire_slot()
+        reserved = estimate_tokens(prompt) + max_tokens
+        try:
+            await asyncio.sleep(max(self.requests.reserve(1), self.tokens.reserve(reserved)))
+        except BaseException:
+            # Cancelled while waiting for budget: give the slot back
+            self._release_slot(False)
+            raise
+        self._record_wait(time.monotonic() - start)
+        self._count("attempts")
+        return reserved
+
+    def _settle(self, reserved, max_tokens, response, streamed=False):
+        """
+        Settle a token reservation against the tokens the response reports.
+        No response (the call failed): nothing was generated. No usage
+        reported: the reservation stands. A stream stopped early may report
+        no output tokens yet, so its text is estimated instead
+        """
+        if response is None:
+            used = reserved - max_tokens
+        elif not getattr(response, "usage_metadata", None):
+            used = reserved
+        else:
+            usage = response.usage_metadata
+            output_tokens = usage.get("output_tokens") or 0
+            if streamed:
+                output_tokens = max(output_tokens, estimate_tokens(response.content))
+            used = (usage.get("input_tokens") or 0) + output_tokens
+        self.tokens.refund(reserved - used)
+
+    def call(self, invoke, prompt, max_tokens=0):
+        """Run invoke(prompt) under the limits, retrying rate-limit errors"""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            reserved = self._admit(prompt, max_tokens)
+            rate_limited, response = False, None
+            try:
+                response = invoke(prompt)
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                rate_limited, error = True, e
+            finally:
+                # Also on cancellation (BaseException): a leaked slot would block later calls
+                self._release_slot(rate_limited)
+                self._settle(reserved, max_tokens, response)
+            self._count("rate_limited")
+            if attempt == self.max_retries:
+                raise self._give_up(error) from error
+            self._count("retries")
+            time.sleep(self._backoff(attempt, error))
+
+    async def acall(self, ainvoke, prompt, max_tokens=0):
+        """Async call(); waits without blocking the event loop"""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            reserved = await self._aadmit(prompt, max_tokens)
+            rate_limited, response = False, None
+            try:
+                response = await ainvoke(prompt)
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                rate_limited, error = True, e
+            finally:
+                # Also on cancellation (BaseException): a leaked slot would block later calls
+                self._release_slot(rate_limited)
+                self._settle(reserved, max_tokens, response)
+            self._count("rate_limited")
+            if attempt == self.max_retries:
+                raise self._give_up(error) from error
+            self._count("retries")
+            await asyncio.sleep(self._backoff(attempt, error))
+
+    def stream(self, open_stream, prompt, max_tokens=0):
+        """
+        Yield the chunks of open_stream(prompt) while holding a slot (released
+        when the consumer stops early too). Rate-limit errors are retried only
+        before the first chunk arrived.
+        """
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            reserved = self._admit(prompt, max_tokens)
+            rate_limited, message = False, None
+            try:
+                for chunk in open_stream(prompt):
+                    message = chunk if message is None else message + chunk
+                    yield chunk
+                return
+            except Exception as e:
+                if message is not None or not is_rate_limit_error(e):
+                    raise
+                rate_limited, error = True, e
+            finally:
+                self._release_slot(rate_limited)
+                self._settle(reserved, max_tokens, message, streamed=True)
+            self._count("rate_limited")
+            if attempt == self.max_retries:
+                raise self._give_up(error) from error
+            self._count("retries")
+            time.sleep(self._backoff(attempt, error))
+
+    async def astream(self, open_stream, prompt, max_tokens=0):
+        """Async stream()"""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            reserved = await self._aadmit(prompt, max_tokens)
+            rate_limited, message = False, None
+            try:
+                async for chunk in open_stream(prompt):
+                    message = chunk if message is None else message + chunk
+                    yield chunk
+                return
+            except Exception as e:
+                if message is not None or not is_rate_limit_error(e):
+                    raise
+                rate_limited, error = True, e
+            finally:
+                self._release_slot(rate_limited)
+                self._settle(reserved, max_tokens, message, streamed=True)
+            self._count("rate_limited")
+            if attempt == self.max_retries:
+                raise self._give_up(error) from error
+            self._count("retries")
+            await asyncio.sleep(self._backoff(attempt, error))
+
+    def snapshot(self):
+        with self._slots:
+            return {**self.stats, "concurrency_limit": self.concurrency_limit}
+
+_llm_scheduler = None
+_llm_scheduler_pid = None
+
+def get_llm_scheduler():
+    """
+    Process-wide shared scheduler (one set of provider limits per API key).
+    A forked worker gets its own: locks held at fork time never release there
+    """
+    global _llm_scheduler, _llm_scheduler_pid
+    if _llm_scheduler is None or _llm_scheduler_pid != os.getpid():
+        _llm_scheduler = LLMScheduler()
+        _llm_scheduler_pid = os.getpid()
+    return _llm_scheduler
+
+def scheduler_stats_since(baseline):
+    """Scheduler counters accumulated since a snapshot() baseline"""
+    current = get_llm_scheduler().snapshot()
+    baseline = baseline or {}
+    delta = {
+        key: current[key] - baseline.get(key, 0)
+        for key in ("calls", "attempts", "retries", "rate_limited", "failed_calls", "queue_wait_seconds")
+    }
+    delta["avg_queue_wait_seconds"] = delta["queue_wait_seconds"] / delta["attempts"] if delta["attempts"] else 0.0
+    delta["max_queue_wait_seconds"] = current["max_queue_wait_seconds"]
+    delta["min_concurrency_limit"] = current["min_concurrency_limit"]
+    delta["concurrency_limit"] = current["concurrency_limit"]
+    return delta
+
+class ScheduledChatModel:
+    """
+    Routes a chat model's invoke/ainvoke/stream/astream through the scheduler.
+    Anything else is delegated to the wrapped model.
+    """
+
+    def __init__(self, llm, scheduler=None):
+        self.llm = llm
+        self.scheduler = scheduler or get_llm_scheduler()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _max_tokens(self):
+        return getattr(self.llm, "max_tokens", None) or 0
+
+    def invoke(self, prompt, *args, **kwargs):
+        return self.scheduler.call(lambda p: self.llm.invoke(p, *args, **kwargs), prompt, self._max_tokens())
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return await self.scheduler.acall(lambda p: self.llm.ainvoke(p, *args, **kwargs), prompt,
+                                          self._max_tokens())
+
+    def stream(self, prompt, *args, **kwargs):
+        return self.scheduler.stream(lambda p: self.llm.stream(p, *args, **kwargs), prompt, self._max_tokens())
+
+    def astream(self, prompt, *args, **kwargs):
+        return self.scheduler.astream(lambda p: self.llm.astream(p, *args, **kwargs), prompt, self._max_tokens())
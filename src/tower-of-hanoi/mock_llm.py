@@ -0,0 +1,306 @@
+"""
+Offline mock chat model for load-testing the full graph without network access.
+
+MockChatModel answers every prompt the agents send from the puzzle state in
+the prompt itself:
+- solver prompts (paper, next-move and regeneration): the optimal move(s),
+  each replaced by a random wrong move with probability error_rate
+- validator prompts (hybrid rules and the three multi-agent specialists): the
+  correct verdict, flipped with probability 1 - validator_accuracy
+
+Optimal play comes from the 3-peg oracle (goal stacked on one peg); other
+variants get the first legal move instead. Every call sleeps a latency drawn
+from a LatencyDistribution, plus chunk_delay per chunk_chars of the reply
+(its generation time; streams deliver those chunks as they are generated). Randomness is seeded per (seed, prompt, n-th time
+the prompt was seen), so a sequential sweep replays identically (with
+parallel lanes, cells sending the same prompt may swap answers).
+
+Select it for creative_llm/validation_llm with HANOI_LLM_PROVIDER=mock (see
+config.py) or pass an instance to benchmarks.patched_llms.
+"""
+
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from langchain_core.messages import AIMessage, AIMessageChunk
+from .oracle import optimal_next_move, stacked_peg
+from .prompts import prompt_text, estimate_tokens
+
+# Defaults for the mock provider
+MOCK_ERROR_RATE = float(os.getenv("HANOI_MOCK_ERROR_RATE", 0.0))
+MOCK_VALIDATOR_ACCURACY = float(os.getenv("HANOI_MOCK_VALIDATOR_ACCURACY", 1.0))
+MOCK_LATENCY = os.getenv("HANOI_MOCK_LATENCY", "0")
+MOCK_SEED = int(os.getenv("HANOI_MOCK_SEED", 0))
+
+PAPER_PATTERN = re.compile(r"I have a puzzle with (\d+) disks")
+CONFIGURATION_PATTERN = re.compile(r"(Initial|Goal) configuration:\n((?:• Peg \d+: .*\n?)+)")
+STATE_PATTERN = re.compile(r"(?:CURRENT STATE|Current state): (\{.*?\})\n")
+MOVE_PATTERN = re.compile(r"PROPOSED MOVE: (.*?)\n")
+GOAL_PEG_PATTERN = re.compile(r"GOAL: Move all disks to peg (\d+)")
+GOAL_PEGS_PATTERN = re.compile(r"GOAL: Reach peg configuration (\[.*\]) \(")
+INT_PATTERN = re.compile(r"\d+")
+
+class LatencyDistribution:
+    """
+    Per-call latency in seconds from a spec string:
+    "0.2" (fixed), "uniform:0.1:0.3", "normal:mean:std" (clipped at 0),
+    "lognormal:median:sigma" or "exponential:mean"
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, spec="0"):
+        parts = str(spec).split(":")
+        if parts[0] not in self.KINDS:
+            parts = ["fixed"] + parts
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}[self.kind]
+        if len(self.params) != expected:
+            raise ValueError(f"Latency spec {spec!r}: {self.kind} takes {expected} parameter(s)")
+        self.spec = spec
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(p[0], p[1]))
+        if self.kind == "lognormal":
+            return p[0] * rng.lognormvariate(0.0, p[1])
+        return rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+
+# ast.literal_eval is not thread-safe on CPython 3.11 (parallel validators share the mock)
+_literal_eval_lock = threading.Lock()
+
+def _literal(text):
+    with _literal_eval_lock:
+        return ast.literal_eval(text)
+
+def parse_configuration(text, num_disks):
+    """Pegs from a describe_configuration() listing ("N (bottom), ... 2, 1 (top)" is the full stack)"""
+    pegs = []
+    for line in text.strip().splitlines():
+        description = line.split(":", 1)[1]
+        if "..." in description:
+            pegs.append(list(range(num_disks, 0, -1)))
+        else:
+            pegs.append([int(disk) for disk in INT_PATTERN.findall(description)])
+    return pegs
+
+def _top(peg):
+    return peg[-1] if peg else None
+
+def move_violations(pegs, move):
+    """Rules (hybrid validator wording) broken by move on pegs; move is None when it did not parse"""
+    if move is None:
+        return ["Only one disk can be moved at a time"]
+    disk, from_peg, to_peg = move
+    if not (0 <= from_peg < len(pegs) and 0 <= to_peg < len(pegs)) or from_peg == to_peg:
+        return ["Only the top disk from any stack can be moved"]
+    violations = []
+    if _top(pegs[from_peg]) != disk:
+        violations.append("Only the top disk from any stack can be moved")
+    if pegs[to_peg] and pegs[to_peg][-1] < disk:
+        violations.append("A larger disk may never be placed on top of a smaller disk")
+    return violations
+
+def legal_moves(pegs):
+    return [
+        (peg[-1], from_peg, to_peg)
+        for from_peg, peg in enumerate(pegs) if peg
+        for to_peg, target in enumerate(pegs)
+        if to_peg != from_peg and (not target or target[-1] > peg[-1])
+    ]
+
+def best_move(pegs, goal_pegs):
+    """Optimal 3-peg move towards goal_pegs, else the first legal move; None once solved"""
+    if pegs == goal_pegs:
+        return None
+    goal_peg = stacked_peg(goal_pegs)
+    if len(pegs) == 3 and goal_peg is not None:
+        return optimal_next_move(pegs, goal_peg)
+    moves = legal_moves(pegs)
+    return moves[0] if moves else None
+
+def _parse_move(text):
+    try:
+        move = json.loads(text.strip().strip("'\""))
+    except ValueError:
+        return None
+    if isinstance(move, list) and len(move) == 3 and all(isinstance(v, int) for v in move):
+        return tuple(move)
+    return None
+
+class MockChatModel:
+    """Deterministic offline chat model (see module docstring)"""
+
+    model = "mock"
+
+    # Appended explanation_sentences times to paper replies (the text a streamed run can skip)
+    EXPLANATION = " Each move keeps smaller disks above larger ones."
+
+    def __init__(self, error_rate=MOCK_ERROR_RATE, validator_accuracy=MOCK_VALIDATOR_ACCURACY,
+                 latency=MOCK_LATENCY, seed=MOCK_SEED, temperature=0.0, max_tokens=1000,
+                 chunk_chars=None, chunk_delay=0.0, explanation_sentences=0):
+        self.error_rate = error_rate
+        self.validator_accuracy = validator_accuracy
+        self.latency = latency if isinstance(latency, LatencyDistribution) else LatencyDistribution(latency)
+        self.seed = seed
+        self.chunk_chars = chunk_chars  # None: the whole reply is one chunk
+        self.chunk_delay = chunk_delay
+        self.explanation_sentences = explanation_sentences
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self._seen = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "solver_calls": 0, "injected_errors": 0,
+                      "validator_calls": 0, "flipped_verdicts": 0, "latency_seconds": 0.0}
+
+    def _rng(self, prompt):
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        with self._lock:
+            occurrence = self._seen.get(digest, 0)
+            self._seen[digest] = occurrence + 1
+            self.stats["calls"] += 1
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _maybe_wrong(self, move, pegs, rng):
+        """move, or with probability error_rate a random different (disk, from, to)"""
+        if rng.random() >= self.error_rate:
+            return move
+        num_disks = sum(len(peg) for peg in pegs)
+        candidates = [(disk, a, b) for disk in range(1, num_disks + 1)
+                      for a in range(len(pegs)) for b in range(len(pegs)) if a != b and (disk, a, b) != move]
+        self._count("injected_errors")
+        return rng.choice(candidates)
+
+    def _paper_reply(self, prompt, num_disks, rng):
+        configurations = {kind: parse_configuration(text, num_disks)
+                          for kind, text in CONFIGURATION_PATTERN.findall(prompt)}
+        pegs, goal = configurations["Initial"], configurations["Goal"]
+        moves = []
+        # The optimal path from the initial state; injected errors are emitted but not applied
+        for _ in range(2 ** num_disks * len(pegs)):
+            move = best_move(pegs, goal)
+            if move is None:
+                break
+            moves.append(list(self._maybe_wrong(move, pegs, rng)))
+            disk, from_peg, to_peg = move
+            pegs[from_peg].pop()
+            pegs[to_peg].append(disk)
+        explanation = self.EXPLANATION * self.explanation_sentences
+        return f"Solving the puzzle move by move.\nmoves = {json.dumps(moves)}{explanation}"
+
+    def _solver_reply(self, prompt, pegs, rng):
+        goal_peg = GOAL_PEG_PATTERN.search(prompt)
+        goal_pegs = GOAL_PEGS_PATTERN.search(prompt)
+        if goal_pegs:
+            goal = _literal(goal_pegs.group(1))
+        else:
+            # Regeneration prompts carry no goal line; the paper's goal is all disks on the last peg
+            goal_index = int(goal_peg.group(1)) if goal_peg else len(pegs) - 1
+            goal = [[] for _ in pegs]
+            goal[goal_index] = sorted((disk for peg in pegs for disk in peg), reverse=True)
+        move = best_move(pegs, goal) or (1, 0, len(pegs) - 1)
+        return json.dumps({"proposed_move": json.dumps(list(self._maybe_wrong(move, pegs, rng))),
+                           "strategy": "mock"})
+
+    def _verdict(self, correct, rng):
+        self._count("validator_calls")
+        if rng.random() < self.validator_accuracy:
+            return correct
+        self._count("flipped_verdicts")
+        return not correct
+
+    def _validator_reply(self, prompt, pegs, rng):
+        move_text = MOVE_PATTERN.search(prompt)
+        move = _parse_move(move_text.group(1)) if move_text else None
+        if "Is exactly one disk being moved?" in prompt:
+            return json.dumps({"single_disk_valid": self._verdict(move is not None, rng)})
+        violations = move_violations(pegs, move) if pegs is not None else []
+        if "Is the moved disk on top of its source stack?" in prompt:
+            return json.dumps({"top_disk_valid": self._verdict(
+                "Only the top disk from any stack can be moved" not in violations, rng)})
+        if "Does this move maintain size ordering?" in prompt:
+            return json.dumps({"size_order_valid": self._verdict(
+                "A larger disk may never be placed on top of a smaller disk" not in violations, rng)})
+        valid = self._verdict(not violations, rng)
+        return json.dumps({"valid": valid, "violations": violations if not valid else [],
+                           "explanation": "mock"})
+
+    def reply(self, prompt):
+        """(response text, latency seconds) for a prompt"""
+        text = prompt_text(prompt)
+        rng = self._rng(text)
+        latency = self.latency.sample(rng)
+        self._count("latency_seconds", latency)
+
+        paper = PAPER_PATTERN.search(text)
+        if paper:
+            self._count("solver_calls")
+            return self._paper_reply(text, int(paper.group(1)), rng), latency
+        state = STATE_PATTERN.search(text)
+        pegs = _literal(state.group(1))["pegs"] if state else None
+        if "proposed_move" in text and "strategy" in text and pegs is not None:
+            self._count("solver_calls")
+            return self._solver_reply(text, pegs, rng), latency
+        return self._validator_reply(text, pegs, rng), latency
+
+    def _message(self, prompt, text, cls=AIMessage):
+        return cls(content=text, usage_metadata={
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": len(text) // 4 + 1,
+            "total_tokens": estimate_tokens(prompt) + len(text) // 4 + 1
+        })
+
+    def _chunks(self, text):
+        size = self.chunk_chars or max(1, len(text))
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def _chunk_messages(self, prompt, text):
+        """AIMessageChunks of the reply; the usage arrives with the last one, as at the end of a stream"""
+        chunks = self._chunks(text)
+        return [AIMessageChunk(content=chunk) for chunk in chunks[:-1]] + \
+            [self._message(prompt, text, cls=AIMessageChunk).model_copy(update={"content": chunks[-1]})]
+
+    def invoke(self, prompt, *args, **kwargs):
+        text, latency = self.reply(prompt)
+        time.sleep(latency + self.chunk_delay * len(self._chunks(text)))
+        return self._message(prompt, text)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        text, latency = self.reply(prompt)
+        await asyncio.sleep(latency + self.chunk_delay * len(self._chunks(text)))
+        return self._message(prompt, text)
+
+    def stream(self, prompt, *args, **kwargs):
+        """The reply's chunks after the latency, chunk_delay apart"""
+        text, latency = self.reply(prompt)
+        time.sleep(latency)
+        for chunk in self._chunk_messages(prompt, text):
+            time.sleep(self.chunk_delay)
+            yield chunk
+
+    async def astream(self, prompt, *args, **kwargs):
+        text, latency = self.reply(prompt)
+        await asyncio.sleep(latency)
+        for chunk in self._chunk_messages(prompt, text):
+            await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+def mock_llm_from_env(temperature, max_tokens):
+    """MockChatModel with the HANOI_MOCK_* settings (used by config.py)"""
+    return MockChatModel(temperature=temperature, max_tokens=max_tokens)
@@ -1,44 +1,26 @@
 import json
+import time
 from langsmith import traceable
 from .config import creative_llm, validation_llm
+from .utils import describe_goal
+from .prevalidation import record_validator_agreement
+from .cycle_detection import record_state_visit, with_cycle_hint
+from .state_index import index_for_problem
+from .prompts import token_usage, move_history, solver_prompt_record
 
-@traceable(name="multi_agent.solver")
-def multi_agent_solver_node(state):
-    """
-    Multi-agent: Strategic move generation
-    Handles both normal move generation and regeneration after validation failures
-    """
-    
-    # Check if this is a regeneration request
+def _solver_prompt(state):
+    """Regeneration prompt after a failed validation, otherwise the next-move prompt"""
     if state.get("regeneration_needed", False):
         # Use the prepared regeneration prompt
-        prompt = state.get("regeneration_prompt", "")
-        
-        response = creative_llm.invoke(prompt)
-        
-        try:
-            result = json.loads(response.content.strip())
-            proposed_move = result.get("proposed_move", "[1, 0, 2]")
-        except:
-            proposed_move = "[1, 0, 2]"
-        
-        # Clear regeneration context for next iteration
-        return {
-            "proposed_move": proposed_move,
-            "regeneration_needed": False,
-            "failed_move": None,
-            "validation_breakdown": {},
-            "regeneration_prompt": ""
-        }
+        return with_cycle_hint(state.get("regeneration_prompt", ""), state)
     
-    else:
-        # Normal move generation
-        prompt = f"""
+    # Normal move generation
+    prompt = f"""
         Generate strategic next move for {state["current_complexity"]}-disk Tower of Hanoi:
 
         CURRENT STATE: {state["current_state"]}
-        GOAL: Move all disks to peg 2
-        MOVES SO FAR: {state.get("moves_made", [])}
+        GOAL: {describe_goal(state["goal_state"]["pegs"])}
+        MOVES SO FAR: {move_history(state)}
         ITERATION: {state.get("iteration_count", 0)}
 
         Focus ONLY on strategy. Constraint specialists will handle validation.
@@ -49,44 +31,83 @@ def multi_agent_solver_node(state):
             "strategy": "reasoning"
         }}
         """
-        
-        response = creative_llm.invoke(prompt)
-        
-        try:
-            result = json.loads(response.content.strip())
-            proposed_move = result.get("proposed_move", "[1, 0, 2]")
-        except:
-            proposed_move = "[1, 0, 2]"
-        
-        return {"proposed_move": proposed_move}
+    return with_cycle_hint(prompt, state)
 
-@traceable(name="multi_agent.validator.disk_count")
-def multi_agent_disk_count_validator_node(state):
-    """Multi-agent: Disk count constraint specialist"""
+def _solver_update(state, response, prompt_record):
+    usage = token_usage("multi_agent_solver", response)
+    try:
+        result = json.loads(response.content.strip())
+        proposed_move = result.get("proposed_move", "[1, 0, 2]")
+    except:
+        proposed_move = "[1, 0, 2]"
     
-    prompt = f"""
+    if state.get("regeneration_needed", False):
+        # Clear regeneration context for next iteration
+        return {
+            "proposed_move": proposed_move,
+            "regeneration_needed": False,
+            "failed_move": None,
+            "validation_breakdown": {},
+            "regeneration_prompt": "",
+            "token_usage": usage,
+            "solver_prompt_tokens": prompt_record
+        }
+    return {"proposed_move": proposed_move, "token_usage": usage, "solver_prompt_tokens": prompt_record}
+
+@traceable(name="multi_agent.solver")
+def multi_agent_solver_node(state):
+    """
+    Multi-agent: Strategic move generation
+    Handles both normal move generation and regeneration after validation failures
+    """
+    prompt = _solver_prompt(state)
+    start = time.perf_counter()
+    response = creative_llm.invoke(prompt)
+    seconds = time.perf_counter() - start
+    return _solver_update(state, response, solver_prompt_record(state, prompt, response, seconds))
+
+@traceable(name="multi_agent.solver")
+async def amulti_agent_solver_node(state):
+    """Async multi_agent_solver_node"""
+    prompt = _solver_prompt(state)
+    start = time.perf_counter()
+    response = await creative_llm.ainvoke(prompt)
+    seconds = time.perf_counter() - start
+    return _solver_update(state, response, solver_prompt_record(state, prompt, response, seconds))
+
+def _parse_verdict(response, key):
+    """Boolean verdict from a specialist's JSON response (False if unparseable)"""
+    try:
+        result = json.loads(response.content.strip())
+        return result.get(key, False)
+    except:
+        return False
+
+def _disk_count_prompt(state):
+    return f"""
     Check ONLY: Is exactly one disk being moved?
 
     PROPOSED MOVE: {state.get("proposed_move", "")}
 
     Return JSON: {{"single_disk_valid": true/false}}
     """
-    
-    response = validation_llm.invoke(prompt)
-    
-    try:
-        result = json.loads(response.content.strip())
-        valid = result.get("single_disk_valid", False)
-    except:
-        valid = False
-    
-    return {"single_disk_valid": valid}
 
-@traceable(name="multi_agent.validator.position")
-def multi_agent_position_validator_node(state):
-    """Multi-agent: Position constraint specialist"""
-    
-    prompt = f"""
+@traceable(name="multi_agent.validator.disk_count")
+def multi_agent_disk_count_validator_node(state):
+    """Multi-agent: Disk count constraint specialist"""
+    response = validation_llm.invoke(_disk_count_prompt(state))
+    return {"single_disk_valid": _parse_verdict(response, "single_disk_valid"),
+            "token_usage": token_usage("multi_agent_disk_count_validator", response)}
+
+@traceable(name="multi_agent.validator.disk_count")
+async def amulti_agent_disk_count_validator_node(state):
+    """Async multi_agent_disk_count_validator_node"""
+    response = await validation_llm.ainvoke(_disk_count_prompt(state))
+    return {"single_disk_valid": _parse_verdict(response, "single_disk_valid"),
+            "token_usage": token_usage("multi_agent_disk_count_validator", response)}
+
+def _position_prompt(state):
+    return f"""
     Check ONLY: Is the moved disk on top of its source stack?
 
     PROPOSED MOVE: {state.get("proposed_move", "")}
@@ -94,22 +115,23 @@ def multi_agent_position_validator_node(state):
 
     Return JSON: {{"top_disk_valid": true/false}}
     """
-    
-    response = validation_llm.invoke(prompt)
-    
-    try:
-        result = json.loads(response.content.strip())
-        valid = result.get("top_disk_valid", False)
-    except:
-        valid = False
-    
-    return {"top_disk_valid": valid}
 
-@traceable(name="multi_agent.validator.size_order")
-def multi_agent_size_order_validator_node(state):
-    """Multi-agent: Size ordering constraint specialist"""
-    
-    prompt = f"""
+@traceable(name="multi_agent.validator.position")
+def multi_agent_position_validator_node(state):
+    """Multi-agent: Position constraint specialist"""
+    response = validation_llm.invoke(_position_prompt(state))
+    return {"top_disk_valid": _parse_verdict(response, "top_disk_valid"),
+            "token_usage": token_usage("multi_agent_position_validator", response)}
+
+@traceable(name="multi_agent.validator.position")
+async def amulti_agent_position_validator_node(state):
+    """Async multi_agent_position_validator_node"""
+    response = await validation_llm.ainvoke(_position_prompt(state))
+    return {"top_disk_valid": _parse_verdict(response, "top_disk_valid"),
+            "token_usage": token_usage("multi_agent_position_validator", response)}
+
+def _size_order_prompt(state):
+    return f"""
     Check ONLY: Does this move maintain size ordering?
 
     PROPOSED MOVE: {state.get("proposed_move", "")}
@@ -117,16 +139,20 @@ def multi_agent_size_order_validator_node(state):
 
     Return JSON: {{"size_order_valid": true/false}}
     """
-    
-    response = validation_llm.invoke(prompt)
-    
-    try:
-        result = json.loads(response.content.strip())
-        valid = result.get("size_order_valid", False)
-    except:
-        valid = False
-    
-    return {"size_order_valid": valid}
+
+@traceable(name="multi_agent.validator.size_order")
+def multi_agent_size_order_validator_node(state):
+    """Multi-agent: Size ordering constraint specialist"""
+    response = validation_llm.invoke(_size_order_prompt(state))
+    return {"size_order_valid": _parse_verdict(response, "size_order_valid"),
+            "token_usage": token_usage("multi_agent_size_order_validator", response)}
+
+@traceable(name="multi_agent.validator.size_order")
+async def amulti_agent_size_order_validator_node(state):
+    """Async multi_agent_size_order_validator_node"""
+    response = await validation_llm.ainvoke(_size_order_prompt(state))
+    return {"size_order_valid": _parse_verdict(response, "size_order_valid"),
+            "token_usage": token_usage("multi_agent_size_order_validator", response)}
 
 def multi_agent_validation_resolver_node(state):
     """Resolver that aggregates all parallel validation results"""
@@ -171,16 +197,20 @@ def multi_agent_apply_move_node(state):
     iteration_count = state.get("iteration_count", 0)
     max_moves = state.get("max_moves", 50)
     
+    # AI-vs-simulator agreement (only when prevalidation ran the simulator)
+    agreement = record_validator_agreement(state, all_valid)
+    
     if all_valid:
         # All validation passed - apply the move
         move_str = state.get("proposed_move", "[1,0,2]")
+        tracking_update, cycle_abort = {}, False
         
         try:
             move = json.loads(move_str)
             disk_id, from_peg, to_peg = move[0], move[1], move[2]
             
             # Apply move to update current state
-            if (from_peg < 3 and to_peg < 3 and 
+            if (from_peg < len(current_pegs) and to_peg < len(current_pegs) and 
                 len(current_pegs[from_peg]) > 0 and
                 current_pegs[from_peg][-1] == disk_id):
                 
@@ -190,6 +220,14 @@ def multi_agent_apply_move_node(state):
                 
                 new_state = {"pegs": new_pegs}
                 new_moves = moves_made + [move_str]
+                
+                # Zobrist-hash the new state and count repeat visits
+                tracking_update, cycle_abort = record_state_visit(state, disk_id, from_peg, to_peg)
+                
+                # Live distance to goal from the precomputed state index (if built)
+                state_index = index_for_problem(state["current_complexity"], goal_pegs)
+                if state_index is not None:
+                    tracking_update["distance_to_goal"] = state_index.distance(state_index.encode(new_pegs))
             else:
                 # Move cannot be applied - keep current state
                 new_state = state["current_state"]
@@ -201,16 +239,18 @@ def multi_agent_apply_move_node(state):
             new_moves = moves_made
         
         # Check if puzzle is completed
-        solved = new_state["pegs"][2] == goal_pegs[2]
+        solved = new_state["pegs"] == goal_pegs
         failed = iteration_count + 1 >= max_moves and not solved
         
         result = {
             "current_state": new_state,
             "moves_made": new_moves,
-            "iteration_count": iteration_count + 1
+            "iteration_count": iteration_count + 1,
+            **agreement,
+            **tracking_update
         }
         
-        if solved or failed:
+        if solved or failed or cycle_abort:
             result["route_to"] = "goal_checker"
         else:
             result["route_to"] = "continue_solving"
@@ -232,11 +272,14 @@ def multi_agent_apply_move_node(state):
         
         violation_details = ", ".join(failed_validators)
         
+        out_of_moves = iteration_count + 1 >= max_moves
+        
         return {
-            "current_state": current_pegs,  # No state change
-            "moves_made": moves_made,       # No new moves
+            "current_state": state["current_state"],  # No state change
+            "moves_made": moves_made,                 # No new moves
             "iteration_count": iteration_count + 1,
-            "route_to": "regenerate_solver",
+            "route_to": "goal_checker" if out_of_moves else "regenerate_solver",
+            **agreement,
             
             # Regeneration context for solver
             "regeneration_needed": True,
@@ -258,7 +301,7 @@ Detailed validation results:
 - Size order validator: {"✅ PASSED" if size_order_valid else "❌ FAILED"}
 
 Current state: {state["current_state"]}
-Moves so far: {moves_made}
+Moves so far: {move_history(state, moves_made)}
 
 Generate a DIFFERENT valid move that satisfies ALL three constraints.
 Pay special attention to the failed constraint(s) above.
@@ -0,0 +1,156 @@
+"""
+Optimal-move oracle and optimal move counts.
+
+3 pegs: closed form on simulator-style peg lists (bottom to top). Walking the
+disks from largest to smallest, each disk has a required peg: the goal peg
+for the largest disk and, once a disk is misplaced, the third peg (neither
+its position nor its target) for the next one down. Every misplaced disk k
+costs 2^(k-1) moves, and the smallest misplaced disk in that chain is the
+optimal next move. O(n), no search.
+
+k pegs: Frame-Stewart move counts between full stacks, memoized in a
+persistent JSON table so large problem sweeps only compute each entry once.
+"""
+
+import json
+import os
+
+# Persistent Frame-Stewart table location (override with HANOI_OPTIMAL_TABLE_PATH)
+OPTIMAL_TABLE_PATH = os.getenv(
+    "HANOI_OPTIMAL_TABLE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "tower-of-hanoi", "frame_stewart.json")
+)
+
+# {num_pegs: [moves for 0 disks, 1 disk, ...]}, loaded lazily from OPTIMAL_TABLE_PATH
+_frame_stewart_table = None
+
+def disk_positions(pegs):
+    """Map simulator pegs to positions[disk] = peg (index 0 unused)"""
+    num_disks = sum(len(peg) for peg in pegs)
+    positions = [0] * (num_disks + 1)
+    for peg_index, peg in enumerate(pegs):
+        for disk in peg:
+            positions[disk] = peg_index
+    return positions
+
+def stacked_peg(pegs):
+    """Index of the peg holding every disk, or None if disks are spread out"""
+    occupied = [peg_index for peg_index, peg in enumerate(pegs) if peg]
+    return occupied[0] if len(occupied) == 1 else None
+
+def _walk_to_goal(positions, goal_peg):
+    """Return (distance, next_move) for the optimal 3-peg path from positions to all disks on goal_peg"""
+    distance = 0
+    next_move = None
+    target = goal_peg
+    for disk in range(len(positions) - 1, 0, -1):
+        peg = positions[disk]
+        if peg != target:
+            distance += 1 << (disk - 1)
+            next_move = (disk, peg, target)
+            target = 3 - peg - target
+    return distance, next_move
+
+def distance_to_goal(pegs, goal_peg=2):
+    """Exact optimal number of moves from a legal 3-peg state to all disks on goal_peg"""
+    return _walk_to_goal(disk_positions(pegs), goal_peg)[0]
+
+def optimal_next_move(pegs, goal_peg=2):
+    """Optimal next 3-peg (disk_id, from_peg, to_peg), or None if already solved"""
+    return _walk_to_goal(disk_positions(pegs), goal_peg)[1]
+
+def _load_frame_stewart_table():
+    global _frame_stewart_table
+    if _frame_stewart_table is None:
+        try:
+            with open(OPTIMAL_TABLE_PATH) as f:
+                _frame_stewart_table = {int(pegs): row for pegs, row in json.load(f).items()}
+        except (OSError, ValueError):
+            _frame_stewart_table = {}
+    return _frame_stewart_table
+
+def _save_frame_stewart_table(table):
+    """Best-effort atomic write; a read-only cache directory only costs recomputation"""
+    try:
+        os.makedirs(os.path.dirname(OPTIMAL_TABLE_PATH), exist_ok=True)
+        tmp_path = f"{OPTIMAL_TABLE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(table, f)
+        os.replace(tmp_path, OPTIMAL_TABLE_PATH)
+    except OSError:
+        pass
+
+def frame_stewart_moves(num_disks, num_pegs=3):
+    """
+    Frame-Stewart move count for moving num_disks between two full stacks on
+    num_pegs pegs (optimal for 3 and 4 pegs). Memoized in the persistent table.
+    """
+    if num_pegs < 3:
+        raise ValueError(f"Frame-Stewart needs at least 3 pegs, got {num_pegs}")
+
+    table = _load_frame_stewart_table()
+    if num_pegs in table and num_disks < len(table[num_pegs]):
+        return table[num_pegs][num_disks]
+
+    # Extend every row from 3 pegs up to num_pegs to cover num_disks
+    for pegs in range(3, num_pegs + 1):
+        row = table.setdefault(pegs, [0])
+        for disks in range(len(row), num_disks + 1):
+            if pegs == 3:
+                row.append((1 << disks) - 1)
+            else:
+                smaller = table[pegs - 1]
+                row.append(min(2 * row[top] + smaller[disks - top] for top in range(disks)))
+
+    _save_frame_stewart_table(table)
+    return table[num_pegs][num_disks]
+
+def optimal_move_count(initial_pegs, goal_pegs):
+    """
+    Optimal number of moves between two configurations when cheaply known:
+    any 3-peg start to a stacked goal (closed form) or full stack to full
+    stack on k pegs (Frame-Stewart). None otherwise.
+    """
+    if initial_pegs == goal_pegs:
+        return 0
+    goal_peg = stacked_peg(goal_pegs)
+    if goal_peg is None:
+        return None
+    if len(goal_pegs) == 3:
+        return distance_to_goal(initial_pegs, goal_peg)
+    if stacked_peg(initial_pegs) is not None:
+        return frame_stewart_moves(sum(len(peg) for peg in goal_pegs), len(goal_pegs))
+    return None
+
+def progress_metrics(pegs, valid_moves, initial_pegs, goal_pegs):
+    """
+    Progress of a (partial) solution that reached pegs after valid_moves moves:
+    - progress_toward_goal: share of the optimal solution already covered
+      (1 = solved; negative if the moves led further away than the start)
+    - excess_moves_over_optimal: moves made plus optimal remaining, minus optimal
+    Exact for 3 pegs with a stacked goal; for other variants only reported
+    once the goal is reached (None otherwise).
+    """
+    optimal_moves = optimal_move_count(initial_pegs, goal_pegs)
+    goal_peg = stacked_peg(goal_pegs)
+
+    if len(pegs) == 3 and goal_peg is not None:
+        remaining, next_move = _walk_to_goal(disk_positions(pegs), goal_peg)
+    elif pegs == goal_pegs:
+        remaining, next_move = 0, None
+    else:
+        remaining, next_move = None, None
+
+    if optimal_moves is None or remaining is None:
+        progress = excess = None
+    else:
+        progress = (optimal_moves - remaining) / optimal_moves if optimal_moves else 1.0
+        excess = valid_moves + remaining - optimal_moves
+
+    return {
+        "optimal_moves": optimal_moves,
+        "distance_to_goal": remaining,
+        "optimal_next_move": list(next_move) if next_move else None,
+        "progress_toward_goal": progress,
+        "excess_moves_over_optimal": excess
+    }
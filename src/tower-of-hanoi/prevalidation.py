@@ -0,0 +1,96 @@
+from .simulator import TowerOfHanoiSimulator
+
+# prevalidation_mode values
+PREVALIDATION_OFF = "off"        # LLM validators only (paper setup)
+PREVALIDATION_GATE = "gate"      # Skip LLM validators for moves the simulator rejects
+PREVALIDATION_SHADOW = "shadow"  # Always run both and record agreement
+
+def _empty_stats():
+    return {
+        "moves_checked": 0,
+        "simulator_rejected": 0,
+        "llm_validations_skipped": 0,
+        "ai_compared": 0,
+        "ai_agreements": 0,
+        "ai_false_accepts": 0,   # AI said valid, simulator said invalid
+        "ai_false_rejects": 0    # AI said invalid, simulator said valid
+    }
+
+def _violated_constraint(pegs, move):
+    """Which multi-agent constraint a simulator-rejected move breaks"""
+    if move is None:
+        return "single_disk"
+    disk_id, from_peg, to_peg = move
+    if not (0 <= from_peg < len(pegs) and 0 <= to_peg < len(pegs)):
+        return "single_disk"
+    if not pegs[from_peg] or pegs[from_peg][-1] != disk_id:
+        return "top_disk"
+    return "size_order"
+
+def prevalidate_move_node(state):
+    """
+    Deterministic simulator check of the proposed move before the LLM validators.
+
+    In "gate" mode, unparseable or illegal moves skip the LLM validators
+    (see prevalidation_routing) and are rejected with the simulator's reason.
+    In "shadow" mode the LLM validators always run and apply_move records
+    whether they agreed with the simulator.
+    """
+    mode = state.get("prevalidation_mode", PREVALIDATION_OFF)
+    if mode == PREVALIDATION_OFF:
+        return {"simulator_valid": None, "llm_validation_skipped": False}
+
+    pegs = state["current_state"]["pegs"]
+    move = None
+    try:
+        # Raises ValueError when current_state is itself illegal: in shadow mode (or
+        # with prevalidation off earlier) a move the LLM validators approved was applied
+        simulator = TowerOfHanoiSimulator(state["current_complexity"], len(pegs), initial_pegs=pegs)
+        move = simulator.parse_move(state.get("proposed_move", ""))
+        is_valid, message = simulator.validate_move(*move) if move else (False, "Could not parse move format")
+    except TypeError:
+        move, is_valid, message = None, False, "Could not parse move format"
+    except ValueError as e:
+        move, is_valid, message = None, False, f"Current state is illegal: {e}"
+
+    stats = dict(state.get("prevalidation_stats") or _empty_stats())
+    stats["moves_checked"] += 1
+    result = {"simulator_valid": is_valid, "simulator_message": message, "llm_validation_skipped": False}
+
+    if not is_valid:
+        stats["simulator_rejected"] += 1
+        if mode == PREVALIDATION_GATE:
+            # Reject without LLM calls, in the shape the apply_move nodes expect
+            violated = _violated_constraint(pegs, move)
+            stats["llm_validations_skipped"] += 1
+            result.update({
+                "llm_validation_skipped": True,
+                "overall_valid": False,
+                "constraint_violations": [f"simulator: {message}"],
+                "single_disk_valid": violated != "single_disk",
+                "top_disk_valid": violated != "top_disk",
+                "size_order_valid": violated != "size_order"
+            })
+
+    result["prevalidation_stats"] = stats
+    return result
+
+def record_validator_agreement(state, ai_valid):
+    """
+    State update comparing the LLM validators' verdict with the simulator's,
+    for apply_move nodes. Empty when the simulator did not run or the LLM
+    validators were skipped.
+    """
+    simulator_valid = state.get("simulator_valid")
+    if simulator_valid is None or state.get("llm_validation_skipped", False):
+        return {}
+
+    stats = dict(state.get("prevalidation_stats") or _empty_stats())
+    stats["ai_compared"] += 1
+    if ai_valid == simulator_valid:
+        stats["ai_agreements"] += 1
+    elif ai_valid:
+        stats["ai_false_accepts"] += 1
+    else:
+        stats["ai_false_rejects"] += 1
+    return {"prevalidation_stats": stats}
@@ -0,0 +1,109 @@
+"""
+Prompt construction with provider-side prefix caching.
+
+Static instructions (the paper system prompt) go first in a content block
+marked with Anthropic's cache_control, the per-call text follows in a second
+block. The provider does not cache prefixes shorter than the model's minimum
+cacheable length, so those are sent as one plain text prompt instead.
+"""
+
+from langchain_core.messages import HumanMessage
+
+# Move history in the hybrid/multi solver and regeneration prompts (history_policy):
+# "full" (every move), "last_k" (the last history_window moves) or
+# "state_only" (move count and last move; CURRENT STATE carries the rest)
+HISTORY_POLICIES = ("full", "last_k", "state_only")
+DEFAULT_HISTORY_WINDOW = 10
+
+# Minimum cacheable prefix (Claude Sonnet); shorter cache_control blocks are not cached
+CACHE_MIN_TOKENS = 1024
+
+def cached_prompt(prefix, suffix):
+    """One user message: static prefix + variable suffix, the prefix cache-marked when cacheable"""
+    return [HumanMessage(content=prompt_blocks(prefix, suffix))]
+
+def prompt_blocks(prefix, suffix):
+    """
+    Messages API content of cached_prompt (e.g. for batch requests): the
+    plain text when the prefix is below CACHE_MIN_TOKENS, otherwise a
+    cache-marked prefix block and a suffix block
+    """
+    if estimate_tokens(prefix) < CACHE_MIN_TOKENS:
+        return prefix + suffix
+    return [
+        {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": suffix}
+    ]
+
+def prompt_text(prompt):
+    """Plain text of a prompt given as a string, content blocks or a list of messages"""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, dict):
+        return prompt.get("text", "")
+    if hasattr(prompt, "content"):
+        return prompt_text(prompt.content)
+    return "".join(prompt_text(part) for part in prompt)
+
+def estimate_tokens(prompt):
+    """Rough input token count (~4 characters per token)"""
+    return len(prompt_text(prompt)) // 4 + 1
+
+def move_history(state, moves_made=None):
+    """
+    The MOVES SO FAR text under the state's history_policy (a bounded
+    policy keeps solver prompts from growing with every move made)
+    """
+    moves = state.get("moves_made", []) if moves_made is None else moves_made
+    policy = state.get("history_policy", "full")
+    if policy not in HISTORY_POLICIES:
+        raise ValueError(f"Unknown history_policy {policy!r} (choose from {', '.join(HISTORY_POLICIES)})")
+    window = state.get("history_window", DEFAULT_HISTORY_WINDOW) if policy == "last_k" else 0
+    if policy == "full" or len(moves) <= window:
+        return str(moves)
+    if policy == "last_k":
+        return f"{len(moves)} moves, the last {window}: {moves[-window:]}"
+    return f"{len(moves)} moves, the last one {moves[-1]} (CURRENT STATE reflects all of them)"
+
+def solver_prompt_record(state, prompt, response, seconds):
+    """
+    [entry] for solver_prompt_tokens: one solver call's iteration, input
+    tokens (estimated when the response reports no usage) and latency
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    return [{
+        "iteration": state.get("iteration_count", 0),
+        "regeneration": state.get("regeneration_needed", False),
+        "input_tokens": usage.get("input_tokens") or estimate_tokens(prompt),
+        "seconds": seconds
+    }]
+
+def token_usage(node, response):
+    """
+    {node: usage} for one LLM response, splitting input tokens into cache
+    reads, cache writes and uncached tokens (zeros when the provider or the
+    response cache reported no usage)
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cache_read = details.get("cache_read") or 0
+    cache_write = sum(details.get(key) or 0 for key in
+                      ("cache_creation", "ephemeral_5m_input_tokens", "ephemeral_1h_input_tokens"))
+    return {node: {
+        "calls": 1,
+        "input_tokens": input_tokens,
+        "cached_input_tokens": cache_read,
+        "cache_write_input_tokens": cache_write,
+        "uncached_input_tokens": input_tokens - cache_read - cache_write,
+        "output_tokens": usage.get("output_tokens", 0) or 0
+    }}
+
+def add_token_usage(left, right):
+    """State reducer: sum per-node token counters (parallel validators update it in one step)"""
+    merged = {node: dict(counters) for node, counters in (left or {}).items()}
+    for node, counters in (right or {}).items():
+        totals = merged.setdefault(node, {})
+        for key, value in counters.items():
+            totals[key] = totals.get(key, 0) + value
+    return merged
@@ -0,0 +1,145 @@
+"""
+Optional external store for the heavy per-run artifacts of a result.
+
+With a store selected, record_result keeps a compact summary row in graph
+state (what the report aggregates) plus an artifact_key; the move sequence,
+the goal checker's solution_analysis (with per-move details),
+failure_details, the per-call solver prompt tokens and the raw single-agent
+response are written to the store instead, so they are not carried through
+and checkpointed at every super-step. generate_report fetches them back, in
+one lookup, for detailed_results; state["results"] itself holds the compact
+rows.
+
+Backends (HANOI_RESULT_STORE):
+- "inline" (default): no store, artifacts stay in the result rows
+- "sqlite": one row per run in a SQLite file shared across processes
+- "jsonl": one line per run in an append-only JSONL file
+
+Store files are never pruned: every run adds to them until they are deleted.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+RESULT_STORE = os.getenv("HANOI_RESULT_STORE", "inline")
+RESULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tower-of-hanoi")
+# Defaults to results.sqlite / results.jsonl in RESULT_STORE_DIR
+RESULT_STORE_PATH = os.getenv("HANOI_RESULT_STORE_PATH")
+
+# Result fields moved to the store
+ARTIFACT_FIELDS = ("moves_sequence", "solution_analysis", "failure_details", "paper_style_response",
+                   "solver_prompt_tokens")
+
+class ResultStore:
+    """Interface: put() one run's artifacts under a key, get_many() them back"""
+
+    def put(self, key, artifacts):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """{key: artifacts} for the keys that are present"""
+        raise NotImplementedError
+
+class SQLiteResultStore(ResultStore):
+    """Thread-safe SQLite table of JSON-encoded artifacts"""
+
+    def __init__(self, path=None):
+        self.path = path or RESULT_STORE_PATH or os.path.join(RESULT_STORE_DIR, "results.sqlite")
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS artifacts (key TEXT PRIMARY KEY, artifacts TEXT NOT NULL)")
+        return self._db
+
+    def put(self, key, artifacts):
+        with self._lock:
+            db = self._connection()
+            db.execute("INSERT OR REPLACE INTO artifacts (key, artifacts) VALUES (?, ?)", (key, json.dumps(artifacts)))
+            db.commit()
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            db = self._connection()
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = db.execute(
+                    f"SELECT key, artifacts FROM artifacts WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, json.loads(artifacts)) for key, artifacts in rows)
+        return found
+
+class JSONLResultStore(ResultStore):
+    """Append-only JSONL file of {"key", "artifacts"} lines; lookups scan the file once"""
+
+    def __init__(self, path=None):
+        self.path = path or RESULT_STORE_PATH or os.path.join(RESULT_STORE_DIR, "results.jsonl")
+        self._lock = threading.Lock()
+
+    def put(self, key, artifacts):
+        line = json.dumps({"key": key, "artifacts": artifacts}) + "\n"
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def get_many(self, keys):
+        wanted = set(keys)
+        found = {}
+        if not wanted or not os.path.exists(self.path):
+            return found
+        with self._lock, open(self.path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["key"] in wanted:
+                    found[entry["key"]] = entry["artifacts"]
+        return found
+
+RESULT_STORES = {
+    "sqlite": SQLiteResultStore,
+    "jsonl": JSONLResultStore
+}
+
+_result_stores = {}
+
+def get_result_store(name=None):
+    """Process-wide store of a backend (default: HANOI_RESULT_STORE), None for inline"""
+    name = name or RESULT_STORE
+    if name == "inline":
+        return None
+    if name not in _result_stores:
+        if name not in RESULT_STORES:
+            raise ValueError(f"Unknown result store {name!r} (choose from inline, {', '.join(RESULT_STORES)})")
+        _result_stores[name] = RESULT_STORES[name]()
+    return _result_stores[name]
+
+def store_artifacts(result, store=None):
+    """Compact copy of result: artifact fields written to the store, replaced by artifact_key"""
+    store = store or get_result_store()
+    if store is None:
+        return result
+    key = uuid.uuid4().hex
+    store.put(key, {field: result[field] for field in ARTIFACT_FIELDS if field in result})
+    compact = {field: value for field, value in result.items() if field not in ARTIFACT_FIELDS}
+    compact["artifact_key"] = key
+    return compact
+
+def load_artifacts(results, store=None):
+    """Result rows with their stored artifacts merged back (rows without a key are returned as is)"""
+    keys = [result["artifact_key"] for result in results if result.get("artifact_key")]
+    store = store or get_result_store()
+    if not keys or store is None:
+        return results
+    artifacts = store.get_many(keys)
+    return [{**result, **artifacts.get(result.get("artifact_key"), {})} for result in results]
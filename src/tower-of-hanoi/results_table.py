@@ -0,0 +1,165 @@
+import operator
+import numpy as np
+
+SOLVER_TYPES = ("single", "hybrid", "multi")
+
+# ai_validation_passed is stored as int8: 1 / 0, AI_UNKNOWN for None (single agent, no validator)
+AI_UNKNOWN = -1
+
+# Per-(solver, complexity) counters every report metric is derived from
+AGGREGATE_FIELDS = ("runs", "solved", "moves_when_solved", "iterations", "iterations_when_solved",
+                    "ai_compared", "ai_agreements")
+
+def _ai_code(value):
+    """Stored int8 value of result.get("ai_validation_passed") (0/1 read back from JSON or SQLite count as bools)"""
+    return AI_UNKNOWN if value is None else int(bool(value))
+
+class ResultsTable:
+    """
+    Columnar view of result rows: one numpy array per column (complexity,
+    run, solver_type as an index into SOLVER_TYPES, solved, moves_count,
+    iterations, ai_validation_passed). aggregate() groups every counter by
+    (solver, complexity) in one bincount pass per column; save()/load()
+    round-trip the columns through a compressed .npz file for notebooks.
+    """
+
+    COLUMNS = ("complexity", "run", "solver_type", "solved", "moves_count", "iterations", "ai_validation_passed")
+
+    def __init__(self, complexity, run, solver_type, solved, moves_count, iterations, ai_validation_passed):
+        self.complexity = np.asarray(complexity, dtype=np.int32)
+        self.run = np.asarray(run, dtype=np.int32)
+        self.solver_type = np.asarray(solver_type, dtype=np.int8)
+        self.solved = np.asarray(solved, dtype=bool)
+        self.moves_count = np.asarray(moves_count, dtype=np.int64)
+        self.iterations = np.asarray(iterations, dtype=np.int64)
+        self.ai_validation_passed = np.asarray(ai_validation_passed, dtype=np.int8)
+
+    @classmethod
+    def from_results(cls, results):
+        """Build the columns from result dicts (one C-level itemgetter scan per column)"""
+        count = len(results)
+
+        def column(key, dtype, convert=None):
+            values = map(operator.itemgetter(key), results)
+            return np.fromiter(map(convert, values) if convert else values, dtype, count)
+
+        solver_codes = {name: code for code, name in enumerate(SOLVER_TYPES)}
+        return cls(
+            column("complexity", np.int32),
+            column("run", np.int32),
+            column("solver_type", np.int8, solver_codes.__getitem__),
+            column("solved", bool),
+            column("moves_count", np.int64),
+            column("iterations", np.int64),
+            np.fromiter(map(_ai_code, map(operator.methodcaller("get", "ai_validation_passed"), results)), np.int8, count)
+        )
+
+    def __len__(self):
+        return len(self.complexity)
+
+    def count(self, solver_type):
+        return int(np.count_nonzero(self.solver_type == SOLVER_TYPES.index(solver_type)))
+
+    def aggregate(self):
+        """{solver_type: {complexity: {counter: value}}} with the AGGREGATE_FIELDS counters"""
+        if not len(self):
+            return {}
+        num_complexities = int(self.complexity.max()) + 1
+        groups = self.solver_type.astype(np.int64) * num_complexities + self.complexity
+        size = len(SOLVER_TYPES) * num_complexities
+        ai_compared = self.ai_validation_passed != AI_UNKNOWN
+        columns = {
+            "runs": np.bincount(groups, minlength=size),
+            "solved": np.bincount(groups, weights=self.solved, minlength=size),
+            "moves_when_solved": np.bincount(groups, weights=self.moves_count * self.solved, minlength=size),
+            "iterations": np.bincount(groups, weights=self.iterations, minlength=size),
+            "iterations_when_solved": np.bincount(groups, weights=self.iterations * self.solved, minlength=size),
+            "ai_compared": np.bincount(groups, weights=ai_compared, minlength=size),
+            "ai_agreements": np.bincount(groups, weights=ai_compared & (self.ai_validation_passed == self.solved),
+                                         minlength=size)
+        }
+        aggregates = {}
+        for group in np.flatnonzero(columns["runs"]):
+            solver, complexity = divmod(int(group), num_complexities)
+            aggregates.setdefault(SOLVER_TYPES[solver], {})[complexity] = {
+                field: int(columns[field][group]) for field in AGGREGATE_FIELDS
+            }
+        return aggregates
+
+    def save(self, path):
+        """Write the columns to a compressed .npz file (solver_type stays coded; see SOLVER_TYPES)"""
+        np.savez_compressed(path, solver_types=np.array(SOLVER_TYPES),
+                            **{column: getattr(self, column) for column in self.COLUMNS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*(data[column] for column in cls.COLUMNS))
+
+def performance_from_aggregates(groups):
+    """
+    One solver's report block (totals, averages and success_by_complexity)
+    from its {complexity: counters} aggregates
+    """
+    if not groups:
+        return {
+            "total_runs": 0,
+            "solved_count": 0,
+            "overall_success_rate": 0,
+            "avg_moves": 0,
+            "avg_iterations": 0,
+            "success_by_complexity": {}
+        }
+
+    totals = {field: sum(counters[field] for counters in groups.values()) for field in AGGREGATE_FIELDS}
+    success_by_complexity = {}
+    for complexity in sorted(groups):
+        counters = groups[complexity]
+        solved = counters["solved"]
+        success_by_complexity[complexity] = {
+            "total_runs": counters["runs"],
+            "solved_runs": solved,
+            "success_rate": solved / counters["runs"],
+            "avg_moves_when_solved": counters["moves_when_solved"] / solved if solved else 0,
+            "avg_iterations_when_solved": counters["iterations_when_solved"] / solved if solved else 0
+        }
+
+    return {
+        "total_runs": totals["runs"],
+        "solved_count": totals["solved"],
+        "overall_success_rate": totals["solved"] / totals["runs"],
+        "avg_moves": totals["moves_when_solved"] / totals["solved"] if totals["solved"] else 0,
+        "avg_iterations": totals["iterations"] / totals["runs"],
+        "success_by_complexity": success_by_complexity
+    }
+
+def ai_accuracy_from_aggregates(groups):
+    """Share of runs whose AI verdict matched the simulator's, None if no run had one"""
+    compared = sum(counters["ai_compared"] for counters in (groups or {}).values())
+    agreements = sum(counters["ai_agreements"] for counters in (groups or {}).values())
+    return agreements / compared if compared else None
+
+def row_aggregates(result):
+    """One result row's AGGREGATE_FIELDS counters, shaped like ResultsTable.aggregate()"""
+    solved = bool(result["solved"])
+    ai = result.get("ai_validation_passed")
+    return {result["solver_type"]: {result["complexity"]: {
+        "runs": 1,
+        "solved": int(solved),
+        "moves_when_solved": result["moves_count"] if solved else 0,
+        "iterations": result["iterations"],
+        "iterations_when_solved": result["iterations"] if solved else 0,
+        "ai_compared": int(ai is not None),
+        "ai_agreements": int(ai is not None and bool(ai) == solved)
+    }}}
+
+def merge_aggregates(left, right):
+    """State reducer: add per-(solver, complexity) counters (cost independent of the number of runs)"""
+    merged = {solver: {complexity: dict(counters) for complexity, counters in groups.items()}
+              for solver, groups in (left or {}).items()}
+    for solver, groups in (right or {}).items():
+        for complexity, counters in groups.items():
+            totals = merged.setdefault(solver, {}).setdefault(complexity, dict.fromkeys(AGGREGATE_FIELDS, 0))
+            for field, value in counters.items():
+                totals[field] += value
+    return merged
@@ -1,7 +1,25 @@
+from langgraph.types import Send
+
 def solver_routing(state):
     """Route to appropriate solver approach"""
     return state.get("solver_type", "single")
 
+def hybrid_agent_prevalidation_routing(state):
+    """Skip the AI validator when the simulator gate already rejected the move"""
+    if state.get("llm_validation_skipped", False):
+        return "hybrid_agent_apply_move"
+    return "hybrid_agent_validator"
+
+def multi_agent_prevalidation_routing(state):
+    """Fan out to all three AI validators unless the simulator gate already rejected the move"""
+    if state.get("llm_validation_skipped", False):
+        return "multi_agent_validation_resolver"
+    return [
+        "multi_agent_disk_count_validator",
+        "multi_agent_position_validator",
+        "multi_agent_size_order_validator"
+    ]
+
 def hybrid_agent_validation_routing(state):
     """Route from validator always to apply_move (apply_move handles validation results)"""
     return "apply_move"
@@ -30,4 +48,31 @@ def continue_solving_routing(state):
         return "multi_agent_solver"
 
 def experiment_routing(state):
-    return "complete" if state.get("experiment_complete", False) else "continue"
\ No newline at end of file
+    return "complete" if state.get("experiment_complete", False) else "continue"
+
+def experiment_cells(state):
+    """Every (complexity, run) cell of the experiment still to run (not resumed), in report order"""
+    completed = {tuple(cell) for cell in state.get("completed_cells") or []}
+    return [
+        [complexity, run]
+        for complexity in range(state["complexity_start"], state["complexity_end"] + 1)
+        for run in range(1, state.get("runs_per_complexity", 1) + 1)
+        if (complexity, run) not in completed
+    ]
+
+def cell_fanout_routing(state):
+    """
+    Map step: deal the cells round-robin into max_concurrency lanes (so each
+    lane gets a mix of complexities) and Send every lane to run_lane
+    """
+    cells = experiment_cells(state)
+    lanes = max(1, min(state.get("max_concurrency", 1), len(cells)))
+    experiment = {key: value for key, value in state.items()
+                  if key not in ("results", "cell_results", "running_aggregates", "completed_cells")}
+    return [Send("run_lane", {**experiment, "lane_cells": cells[lane::lanes]}) for lane in range(lanes)]
+
+def batch_submission_routing(state):
+    """Single-agent sweeps in batch_mode submit every prompt as one batch job before fanning out"""
+    if state.get("batch_mode", False) and state.get("solver_type", "single") == "single":
+        return "single_agent_batch"
+    return cell_fanout_routing(state)
\ No newline at end of file
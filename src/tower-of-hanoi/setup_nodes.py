@@ -1,33 +1,100 @@
+import random
+from functools import reduce
+from langgraph.types import Overwrite
+from .simulator import stacked_pegs, validate_configuration
+from .oracle import optimal_move_count, frame_stewart_moves
+from .cycle_detection import initial_cycle_state
+from .llm_cache import get_response_cache
+from .llm_scheduler import get_llm_scheduler
+from .experiment_log import get_experiment_log, config_fingerprint
+from .results_table import row_aggregates, merge_aggregates
+from .routing import experiment_cells
+
 def setup_experiment_node(state):
     """Initialize the complexity range experiment with multiple runs support"""
     start = state.get("complexity_start", 3)
     end = state.get("complexity_end", 3)
     runs_per_complexity = state.get("runs_per_complexity", 1)
     
-    return {
+    update = {
         "current_complexity": start,
         "current_run": 1,
         "runs_per_complexity": runs_per_complexity,
         "results": [],
-        "experiment_complete": False
+        "experiment_complete": False,
+        "llm_cache_baseline": get_response_cache().snapshot(),
+        "llm_scheduler_baseline": get_llm_scheduler().snapshot()
     }
+    
+    # Resuming: cells this experiment_id already completed are merged as lane output and not run again
+    resumed = []
+    if state.get("experiment_id"):
+        cells = {tuple(cell) for cell in experiment_cells({**state, **update, "completed_cells": []})}
+        logged = get_experiment_log().completed(state["experiment_id"], state.get("solver_type", "single"),
+                                                config_fingerprint(state))
+        resumed = [result for result in logged if (result["complexity"], result["run"]) in cells]
+    update["completed_cells"] = [[result["complexity"], result["run"]] for result in resumed]
+    # Replace rather than add: a restart on the same thread starts over from the log
+    update["cell_results"] = Overwrite(resumed)
+    update["running_aggregates"] = Overwrite(reduce(merge_aggregates, map(row_aggregates, resumed), {}))
+    
+    return update
+
+def random_configuration(num_disks, num_pegs, rng):
+    """Random legal configuration: each disk on a random peg, stacks ordered by size"""
+    pegs = [[] for _ in range(num_pegs)]
+    for disk in range(num_disks, 0, -1):
+        pegs[rng.randrange(num_pegs)].append(disk)
+    return pegs
 
 def setup_problem_node(state):
-    """Setup Tower of Hanoi problem for current complexity level and run"""
+    """
+    Setup Tower of Hanoi problem for current complexity level and run.
+    
+    Defaults to the paper's 3-peg problem (peg 0 -> last peg). Optional inputs:
+    num_pegs, explicit initial_pegs/goal_pegs, or random_start/random_goal
+    (reproducible per complexity and run via seed).
+    """
     num_disks = state["current_complexity"]
     current_run = state.get("current_run", 1)
+    num_pegs = state.get("num_pegs", 3)
+    rng = random.Random(f"{state.get('seed', 0)}:{num_disks}:{current_run}")
+    
+    if state.get("initial_pegs"):
+        initial_pegs = [list(peg) for peg in state["initial_pegs"]]
+    elif state.get("random_start", False):
+        initial_pegs = random_configuration(num_disks, num_pegs, rng)
+    else:
+        initial_pegs = stacked_pegs(num_disks, num_pegs, 0)
+    
+    if state.get("goal_pegs"):
+        goal_pegs = [list(peg) for peg in state["goal_pegs"]]
+    elif state.get("random_goal", False):
+        goal_pegs = random_configuration(num_disks, num_pegs, rng)
+    else:
+        goal_pegs = stacked_pegs(num_disks, num_pegs, num_pegs - 1)
+    
+    validate_configuration(initial_pegs, num_disks, num_pegs)
+    validate_configuration(goal_pegs, num_disks, num_pegs)
     
-    initial_pegs = [list(range(num_disks, 0, -1)), [], []]
-    goal_pegs = [[], [], list(range(num_disks, 0, -1))]
+    # Budget iterations off the optimal solution length (Frame-Stewart when no exact count is cheap)
+    optimal_moves = optimal_move_count(initial_pegs, goal_pegs)
+    budget_moves = optimal_moves if optimal_moves is not None else frame_stewart_moves(num_disks, num_pegs)
     
     return {
-        "current_state": {"pegs": initial_pegs},
+        "num_pegs": num_pegs,
+        "initial_state": {"pegs": initial_pegs},
+        "current_state": {"pegs": [peg[:] for peg in initial_pegs]},
         "goal_state": {"pegs": goal_pegs},
+        "optimal_moves": optimal_moves,
         "moves_made": [],
-        "max_moves": min(2 ** num_disks * 2, 100),  # Cap at 100 iterations
+        "max_moves": min((budget_moves + 1) * 2, 100),  # Cap at 100 iterations
         "solved": False,
         "failed": False,
         "iteration_count": 0,
+        "regeneration_needed": False,
+        "prevalidation_stats": {},
+        **initial_cycle_state(initial_pegs),
         "solution_analysis": {},
         "failure_details": {}
     }
\ No newline at end of file
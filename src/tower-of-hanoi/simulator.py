@@ -1,38 +1,171 @@
-import json
+import re
+from array import array
+from bisect import bisect_right
+
+# Single move: optional brackets around three integers separated by commas and/or whitespace
+_MOVE_PATTERN = re.compile(r"\s*[\[\](){}]*\s*(-?\d+)\s*[,\s]\s*(-?\d+)\s*[,\s]\s*(-?\d+)\s*[\[\](){}]*\s*")
+# One [disk_id, from_peg, to_peg] entry inside a move list
+_TRIPLE_PATTERN = re.compile(r"\[\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)\s*\]")
+_WHITESPACE_PATTERN = re.compile(r"\s*")
+
+
+class MoveParseError(ValueError):
+    """Raised by parse_move_list with the character offset where parsing failed"""
+    
+    def __init__(self, message, position):
+        super().__init__(f"{message} at position {position}")
+        self.position = position
+
+
+def parse_move_list(text, start=0):
+    """
+    Single-pass parse of a move list like "[[1, 0, 2], [2, 0, 1]]" starting at
+    text[start]. Returns (moves, end) where moves is a list of
+    (disk_id, from_peg, to_peg) int tuples and end is the offset just past the
+    closing bracket. Raises MoveParseError pointing at the offending character.
+    """
+    pos = _WHITESPACE_PATTERN.match(text, start).end()
+    if not text.startswith("[", pos):
+        raise MoveParseError("Expected '[' to open move list", pos)
+    pos += 1
+    
+    moves = []
+    while True:
+        pos = _WHITESPACE_PATTERN.match(text, pos).end()
+        if text.startswith("]", pos):
+            return moves, pos + 1
+        
+        triple = _TRIPLE_PATTERN.match(text, pos)
+        if not triple:
+            raise MoveParseError("Expected move [disk_id, from_peg, to_peg]", pos)
+        moves.append((int(triple.group(1)), int(triple.group(2)), int(triple.group(3))))
+        
+        pos = _WHITESPACE_PATTERN.match(text, triple.end()).end()
+        if text.startswith(",", pos):
+            pos += 1
+        elif not text.startswith("]", pos):
+            raise MoveParseError("Expected ',' or ']' after move", pos)
+
+
+class MoveListStream:
+    """
+    Incremental counterpart of parse_move_list for streamed text: feed() the
+    chunks as they arrive and get back the events completed so far:
+    ("open", None) when a list starts after an opener match, ("move", move)
+    per (disk_id, from_peg, to_peg) triple, ("close", moves) at the list's
+    closing bracket and ("abandon", position) when the list is malformed.
+    """
+    
+    def __init__(self, opener):
+        self.opener = opener
+        self.text = ""
+        self.pos = 0
+        self.moves = None  # Moves of the open list (None outside a list)
+    
+    def feed(self, chunk):
+        self.text += chunk
+        text = self.text
+        events = []
+        while True:
+            if self.moves is None:
+                match = self.opener.search(text, self.pos)
+                if match is None:
+                    # Keep a tail in case an opener is split across chunks
+                    self.pos = max(self.pos, len(text) - 32)
+                    return events
+                start = _WHITESPACE_PATTERN.match(text, match.end()).end()
+                if start == len(text):
+                    self.pos = match.start()
+                    return events
+                self.pos = match.end()
+                if text[start] == "[":
+                    self.moves = []
+                    self.pos = start + 1
+                    events.append(("open", None))
+                continue
+            
+            pos = _WHITESPACE_PATTERN.match(text, self.pos).end()
+            if pos == len(text):
+                return events
+            triple = _TRIPLE_PATTERN.match(text, pos)
+            if text[pos] == "]":
+                events.append(("close", self.moves))
+                self.moves = None
+                self.pos = pos + 1
+            elif text[pos] == ",":
+                self.pos = pos + 1
+            elif triple:
+                move = (int(triple.group(1)), int(triple.group(2)), int(triple.group(3)))
+                self.moves.append(move)
+                events.append(("move", move))
+                self.pos = triple.end()
+            elif "]" in text[pos:]:
+                # The triple would be complete by now, so it is malformed
+                events.append(("abandon", pos))
+                self.moves = None
+                self.pos = pos
+            else:
+                return events
+
+def stacked_pegs(num_disks, num_pegs=3, peg=0):
+    """Peg lists (bottom to top) with all disks stacked on one peg"""
+    pegs = [[] for _ in range(num_pegs)]
+    pegs[peg] = list(range(num_disks, 0, -1))
+    return pegs
+
+
+def validate_configuration(pegs, num_disks, num_pegs):
+    """Raise ValueError unless pegs is a legal arrangement of disks 1..num_disks on num_pegs pegs"""
+    if len(pegs) != num_pegs:
+        raise ValueError(f"Expected {num_pegs} pegs, got {len(pegs)}")
+    if sorted(disk for peg in pegs for disk in peg) != list(range(1, num_disks + 1)):
+        raise ValueError(f"Pegs must hold disks 1-{num_disks} exactly once: {pegs}")
+    for peg in pegs:
+        if any(lower < upper for lower, upper in zip(peg, peg[1:])):
+            raise ValueError(f"Larger disk placed on smaller disk in {peg}")
+
 
 class TowerOfHanoiSimulator:
     """
     Deterministic Tower of Hanoi simulator for rigorous solution validation.
     Implements the four-layer validation described in the paper.
+    
+    Defaults to the paper's setup (3 pegs, all disks from peg 0 to the last
+    peg); num_pegs, initial_pegs and goal_pegs allow k-peg variants and
+    arbitrary legal start/goal configurations.
     """
     
-    def __init__(self, num_disks):
+    # Full-state snapshot every N moves in validate_complete_solution
+    SNAPSHOT_INTERVAL = 256
+    
+    def __init__(self, num_disks, num_pegs=3, initial_pegs=None, goal_pegs=None):
         self.num_disks = num_disks
+        self.num_pegs = num_pegs
+        self.initial_pegs = [list(peg) for peg in initial_pegs] if initial_pegs else stacked_pegs(num_disks, num_pegs, 0)
+        self.goal_pegs = [list(peg) for peg in goal_pegs] if goal_pegs else stacked_pegs(num_disks, num_pegs, num_pegs - 1)
+        validate_configuration(self.initial_pegs, num_disks, num_pegs)
+        validate_configuration(self.goal_pegs, num_disks, num_pegs)
         self.reset()
     
     def reset(self):
-        """Reset to initial state: all disks on peg 0"""
-        self.pegs = [
-            list(range(self.num_disks, 0, -1)),  # Peg 0: largest to smallest
-            [],  # Peg 1: empty
-            []   # Peg 2: empty
-        ]
+        """Reset to initial state (default: all disks on peg 0)"""
+        self.pegs = [peg[:] for peg in self.initial_pegs]
         self.move_count = 0
         
     def get_goal_state(self):
-        """Return the goal state: all disks on peg 2"""
-        return [[], [], list(range(self.num_disks, 0, -1))]
+        """Return the goal state (default: all disks on the last peg)"""
+        return [peg[:] for peg in self.goal_pegs]
     
     def validate_move(self, disk_id, from_peg, to_peg):
         """
         Four-layer validation as described in the paper:
-        1. Peg boundary conditions (0-2)
+        1. Peg boundary conditions (0 to num_pegs - 1)
         2. Source peg contains disks
         3. Specified disk is topmost
         4. Size ordering constraint
         """
         # Layer 1: Check peg boundary conditions
-        if not (0 <= from_peg <= 2 and 0 <= to_peg <= 2):
+        if not (0 <= from_peg < self.num_pegs and 0 <= to_peg < self.num_pegs):
             return False, f"Invalid peg indices: from_peg={from_peg}, to_peg={to_peg}"
         
         # Layer 2: Verify source peg contains disks
@@ -67,13 +200,19 @@ class TowerOfHanoiSimulator:
     
     def is_solved(self):
         """Check if puzzle is in goal state"""
-        goal = self.get_goal_state()
-        return self.pegs == goal
+        return self.pegs == self.goal_pegs
     
     def validate_complete_solution(self, solution):
         """
         Validate complete solution and provide detailed analysis.
         Returns comprehensive feedback about where and why solution fails.
+        
+        Per-move history is delta-encoded: move_deltas[i] is the applied
+        [disk_id, from_peg, to_peg] (None if move i was not applied) and
+        move_details only holds entries for moves that were not valid.
+        Full states are kept in state_snapshots (initial state plus one every
+        SNAPSHOT_INTERVAL moves); use state_at(analysis, i) to reconstruct the
+        state after any move.
         """
         self.reset()
         
@@ -84,15 +223,21 @@ class TowerOfHanoiSimulator:
             "first_invalid_move": None,
             "final_state": None,
             "goal_achieved": False,
+            "move_deltas": [],
             "move_details": [],
+            "state_snapshots": [{"move_index": -1, "state": [peg[:] for peg in self.pegs]}],
             "error_summary": []
         }
         
         for i, move_str in enumerate(solution):
+            if i and i % self.SNAPSHOT_INTERVAL == 0:
+                analysis["state_snapshots"].append({"move_index": i - 1, "state": [peg[:] for peg in self.pegs]})
+            
             try:
                 # Parse move - expect format like "[1, 0, 2]" or "1,0,2"
                 move = self.parse_move(move_str)
                 if not move:
+                    analysis["move_deltas"].append(None)
                     analysis["move_details"].append({
                         "move_index": i,
                         "move_string": move_str,
@@ -109,20 +254,18 @@ class TowerOfHanoiSimulator:
                 # Validate and execute move
                 is_valid, message = self.execute_move(disk_id, from_peg, to_peg)
                 
-                move_detail = {
-                    "move_index": i,
-                    "move_string": move_str,
-                    "parsed_move": move,
-                    "status": "valid" if is_valid else "invalid",
-                    "message": message,
-                    "state_after": [peg[:] for peg in self.pegs]  # Deep copy
-                }
-                
-                analysis["move_details"].append(move_detail)
-                
                 if is_valid:
+                    analysis["move_deltas"].append([disk_id, from_peg, to_peg])
                     analysis["valid_moves"] += 1
                 else:
+                    analysis["move_deltas"].append(None)
+                    analysis["move_details"].append({
+                        "move_index": i,
+                        "move_string": move_str,
+                        "parsed_move": list(move),
+                        "status": "invalid",
+                        "message": message
+                    })
                     analysis["invalid_moves"] += 1
                     analysis["error_summary"].append(f"Move {i}: {message}")
                     if analysis["first_invalid_move"] is None:
@@ -130,6 +273,7 @@ class TowerOfHanoiSimulator:
                     break  # Stop at first invalid move
                     
             except Exception as e:
+                analysis["move_deltas"].append(None)
                 analysis["move_details"].append({
                     "move_index": i,
                     "move_string": move_str,
@@ -147,31 +291,209 @@ class TowerOfHanoiSimulator:
         
         return analysis
     
-    def parse_move(self, move_str):
-        """Parse move string into (disk_id, from_peg, to_peg) tuple"""
+    def validate_move_stream(self, moves):
+        """
+        Incrementally validate moves from any iterable (e.g. streamed LLM output).
+        Yields one verdict dict per move and stops at the first invalid move or
+        as soon as the goal is reached, so the caller can abandon the producer.
+        Moves may be strings (parsed with parse_move) or (disk, from, to) sequences.
+        """
+        self.reset()
+        for i, move in enumerate(moves):
+            verdict = self._stream_step(i, move)
+            yield verdict
+            if verdict["status"] != "valid" or verdict["goal_achieved"]:
+                return
+    
+    async def avalidate_move_stream(self, moves):
+        """Async counterpart of validate_move_stream for async iterables"""
+        self.reset()
+        i = 0
+        async for move in moves:
+            verdict = self._stream_step(i, move)
+            yield verdict
+            if verdict["status"] != "valid" or verdict["goal_achieved"]:
+                return
+            i += 1
+    
+    def _stream_step(self, move_index, move):
+        """Validate and apply a single streamed move, returning its verdict"""
+        verdict = {
+            "move_index": move_index,
+            "move_string": move,
+            "parsed_move": None,
+            "status": "parsing_error",
+            "message": "Could not parse move format",
+            "goal_achieved": False
+        }
         try:
-            # Remove whitespace and brackets
-            clean_str = move_str.strip().strip('[](){}')
-            
-            # Try to parse as JSON first
-            try:
-                move = json.loads(f"[{clean_str}]")
-                if len(move) == 3:
-                    return tuple(move)
-            except:
-                pass
-            
-            # Try comma-separated parsing
-            parts = [x.strip() for x in clean_str.split(',')]
-            if len(parts) == 3:
-                return tuple(int(x) for x in parts)
-            
-            # Try space-separated parsing
-            parts = clean_str.split()
-            if len(parts) == 3:
-                return tuple(int(x) for x in parts)
-                
-        except Exception:
-            pass
+            parsed = self.parse_move(move) if isinstance(move, str) else tuple(move)
+            if not parsed or len(parsed) != 3:
+                return verdict
+            verdict["parsed_move"] = list(parsed)
+            is_valid, message = self.execute_move(*parsed)
+            verdict["status"] = "valid" if is_valid else "invalid"
+            verdict["message"] = message
+            verdict["goal_achieved"] = is_valid and self.is_solved()
+        except Exception as e:
+            verdict["status"] = "error"
+            verdict["message"] = str(e)
+        return verdict
+    
+    def parse_move(self, move):
+        """
+        Parse move string into (disk_id, from_peg, to_peg) tuple.
+        Already-parsed (disk_id, from_peg, to_peg) sequences are passed through.
+        """
+        if not isinstance(move, str):
+            return tuple(move) if isinstance(move, (list, tuple)) and len(move) == 3 else None
         
-        return None
\ No newline at end of file
+        match = _MOVE_PATTERN.fullmatch(move)
+        if not match:
+            return None
+        return int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+def state_at(analysis, move_index):
+    """
+    Reconstruct the peg state after move_index (-1 for the initial state)
+    from a validate_complete_solution analysis, replaying move deltas from
+    the nearest preceding snapshot.
+    """
+    snapshots = analysis["state_snapshots"]
+    if move_index < -1:
+        raise IndexError(f"move_index must be >= -1, got {move_index}")
+    
+    snapshot_indices = [snapshot["move_index"] for snapshot in snapshots]
+    snapshot = snapshots[bisect_right(snapshot_indices, move_index) - 1]
+    pegs = [list(peg) for peg in snapshot["state"]]
+    
+    for delta in analysis["move_deltas"][snapshot["move_index"] + 1:move_index + 1]:
+        if delta is not None:
+            disk_id, from_peg, to_peg = delta
+            pegs[from_peg].pop()
+            pegs[to_peg].append(disk_id)
+    
+    return pegs
+
+
+class CompactTowerOfHanoiSimulator:
+    """
+    Array-backed drop-in replacement for TowerOfHanoiSimulator.
+    
+    Peg stacks live in one fixed bytearray (num_pegs x num_disks) with a
+    height per peg, and disk positions in an array('B'), so validate_move,
+    execute_move and is_solved are O(1) and memory does not grow with the
+    move history. Supports up to 255 disks and 255 pegs.
+    """
+    
+    __slots__ = ("num_disks", "num_pegs", "initial_pegs", "goal_pegs", "move_count",
+                 "_stacks", "_heights", "_positions", "_goal_positions", "_misplaced")
+    
+    SNAPSHOT_INTERVAL = TowerOfHanoiSimulator.SNAPSHOT_INTERVAL
+    
+    def __init__(self, num_disks, num_pegs=3, initial_pegs=None, goal_pegs=None):
+        if not 0 <= num_disks <= 255 or not 1 <= num_pegs <= 255:
+            raise ValueError(f"CompactTowerOfHanoiSimulator supports 0-255 disks and 1-255 pegs, "
+                             f"got {num_disks} disks and {num_pegs} pegs")
+        self.num_disks = num_disks
+        self.num_pegs = num_pegs
+        self.initial_pegs = [list(peg) for peg in initial_pegs] if initial_pegs else stacked_pegs(num_disks, num_pegs, 0)
+        self.goal_pegs = [list(peg) for peg in goal_pegs] if goal_pegs else stacked_pegs(num_disks, num_pegs, num_pegs - 1)
+        validate_configuration(self.initial_pegs, num_disks, num_pegs)
+        validate_configuration(self.goal_pegs, num_disks, num_pegs)
+        
+        self._stacks = bytearray(num_pegs * num_disks)
+        self._heights = array('B', [0] * num_pegs)
+        self._positions = array('B', [0] * (num_disks + 1))  # Index 0 unused
+        self._goal_positions = array('B', [0] * (num_disks + 1))
+        for peg_index, peg in enumerate(self.goal_pegs):
+            for disk in peg:
+                self._goal_positions[disk] = peg_index
+        self.reset()
+    
+    def reset(self):
+        """Reset to initial state (default: all disks on peg 0)"""
+        n = self.num_disks
+        self._stacks[:] = bytes(len(self._stacks))
+        self._misplaced = 0
+        for peg_index, peg in enumerate(self.initial_pegs):
+            self._stacks[peg_index * n:peg_index * n + len(peg)] = bytes(peg)
+            self._heights[peg_index] = len(peg)
+            for disk in peg:
+                self._positions[disk] = peg_index
+                self._misplaced += peg_index != self._goal_positions[disk]
+        self.move_count = 0
+    
+    @property
+    def pegs(self):
+        """Materialize the peg lists (bottom to top), same shape as TowerOfHanoiSimulator.pegs"""
+        n = self.num_disks
+        return [
+            list(self._stacks[peg * n:peg * n + self._heights[peg]])
+            for peg in range(self.num_pegs)
+        ]
+    
+    def get_goal_state(self):
+        """Return the goal state (default: all disks on the last peg)"""
+        return [peg[:] for peg in self.goal_pegs]
+    
+    def disk_position(self, disk_id):
+        """Return the peg currently holding disk_id"""
+        return self._positions[disk_id]
+    
+    def _top(self, peg):
+        """Top disk of peg, or 0 if the peg is empty"""
+        height = self._heights[peg]
+        return self._stacks[peg * self.num_disks + height - 1] if height else 0
+    
+    def validate_move(self, disk_id, from_peg, to_peg):
+        """Same four-layer validation (and messages) as TowerOfHanoiSimulator.validate_move, in O(1)"""
+        # Layer 1: Check peg boundary conditions
+        if not (0 <= from_peg < self.num_pegs and 0 <= to_peg < self.num_pegs):
+            return False, f"Invalid peg indices: from_peg={from_peg}, to_peg={to_peg}"
+        
+        # Layer 2: Verify source peg contains disks
+        top_disk = self._top(from_peg)
+        if not top_disk:
+            return False, f"Source peg {from_peg} is empty"
+        
+        # Layer 3: Confirm specified disk is topmost
+        if top_disk != disk_id:
+            return False, f"Disk {disk_id} is not on top of peg {from_peg}. Top disk is {top_disk}"
+        
+        # Layer 4: Enforce size ordering constraint
+        target_top = self._top(to_peg)
+        if target_top and disk_id > target_top:
+            return False, f"Cannot place larger disk {disk_id} on smaller disk {target_top}"
+        
+        return True, "Valid move"
+    
+    def execute_move(self, disk_id, from_peg, to_peg):
+        """Execute a validated move"""
+        is_valid, error_msg = self.validate_move(disk_id, from_peg, to_peg)
+        if not is_valid:
+            return False, error_msg
+        
+        # Execute the move
+        n = self.num_disks
+        self._heights[from_peg] -= 1
+        disk = self._stacks[from_peg * n + self._heights[from_peg]]
+        self._stacks[to_peg * n + self._heights[to_peg]] = disk
+        self._heights[to_peg] += 1
+        goal_peg = self._goal_positions[disk]
+        self._misplaced += (to_peg != goal_peg) - (from_peg != goal_peg)
+        self._positions[disk] = to_peg
+        self.move_count += 1
+        
+        return True, "Move executed successfully"
+    
+    def is_solved(self):
+        """Check if puzzle is in goal state (stacks are always legal, so disk positions suffice)"""
+        return self._misplaced == 0
+    
+    # Whole-solution validation and parsing only use the public API above
+    validate_complete_solution = TowerOfHanoiSimulator.validate_complete_solution
+    parse_move = TowerOfHanoiSimulator.parse_move
+    validate_move_stream = TowerOfHanoiSimulator.validate_move_stream
+    avalidate_move_stream = TowerOfHanoiSimulator.avalidate_move_stream
+    _stream_step = TowerOfHanoiSimulator._stream_step
\ No newline at end of file
@@ -1,18 +1,35 @@
-import json
 import re
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.messages import AIMessage
 from langsmith import traceable
 from .config import creative_llm
+from .simulator import parse_move_list, MoveParseError, MoveListStream, TowerOfHanoiSimulator, stacked_pegs
+from .setup_nodes import setup_problem_node
+from .routing import experiment_cells
+from .batch_backend import AnthropicBatchBackend, LocalFileBatchBackend
+from .prompts import cached_prompt, prompt_text, token_usage, estimate_tokens
 
-@traceable(name="single_agent.solver")
-def single_agent_solver_node(state):
+# Start of a "moves = [...]" answer block
+MOVES_ASSIGNMENT_PATTERN = re.compile(r'moves\s*=\s*')
+
+def _problem_pegs(state):
+    """(initial pegs, goal pegs) of the current problem; the paper's when setup_problem has not run"""
+    num_disks = state["current_complexity"]
+    num_pegs = state.get("num_pegs", 3)
+    initial_pegs = (state.get("initial_state") or {}).get("pegs") or stacked_pegs(num_disks, num_pegs, 0)
+    goal_pegs = (state.get("goal_state") or {}).get("pegs") or stacked_pegs(num_disks, num_pegs, num_pegs - 1)
+    return initial_pegs, goal_pegs
+
+def _paper_prompt(state):
     """
-    Single agent handling ALL constraints + move generation
-    (Replicating the paper's exact monolithic approach)
-    
-    Generates complete solution, then converts to unified structure
+    Paper system prompt + user prompt for the current problem. The system
+    prompt is the cached prefix; the combined text is unchanged.
     """
-    
     num_disks = state["current_complexity"]
+    num_pegs = state.get("num_pegs", 3)
+    initial_pegs, goal_pegs = _problem_pegs(state)
     
     # System prompt - exact copy from paper
     system_prompt = """You are a helpful assistant. Solve this puzzle for me.
@@ -30,17 +47,25 @@ Requirements:
 • Ensure your final answer includes the complete list of moves in the format:
 moves = [[disk_id, from_peg, to_peg], ...]"""
 
+    # Variants (k pegs, other start/goal) only swap the two setup sentences
+    is_paper_problem = (num_pegs == 3 and initial_pegs == stacked_pegs(num_disks, 3, 0)
+                        and goal_pegs == stacked_pegs(num_disks, 3, 2))
+    if not is_paper_problem:
+        system_prompt = system_prompt.replace(
+            "There are three pegs and n disks of different sizes stacked on the first peg.",
+            f"There are {num_pegs} pegs and n disks of different sizes."
+        ).replace(
+            "The goal is to move the entire stack to the third peg.",
+            "The goal is to reach the goal configuration given below."
+        )
+
     # User prompt - exact copy from paper with substituted variables
     user_prompt = f"""I have a puzzle with {num_disks} disks of different sizes with
 Initial configuration:
-• Peg 0: {num_disks} (bottom), ... 2, 1 (top)
-• Peg 1: (empty)
-• Peg 2: (empty)
+{describe_configuration(initial_pegs, num_disks)}
 
 Goal configuration:
-• Peg 0: (empty)
-• Peg 1: (empty)
-• Peg 2: {num_disks} (bottom), ... 2, 1 (top)
+{describe_configuration(goal_pegs, num_disks)}
 
 Rules:
 • Only one disk can be moved at a time.
@@ -50,31 +75,12 @@ Rules:
 Find the sequence of moves to transform the initial configuration into the goal configuration."""
 
     # Combine system and user prompts
-    full_prompt = f"{system_prompt}\n\n{user_prompt}"
-    
-    response = creative_llm.invoke(full_prompt)
-    
-    try:
-        # Extract complete move sequence from paper-style response
-        response_text = response.content.strip()
-        
-        # Look for moves = [...] pattern in response
-        moves_pattern = r'moves\s*=\s*(\[.*?\])'
-        match = re.search(moves_pattern, response_text, re.DOTALL)
-        
-        if match:
-            moves_str = match.group(1)
-            moves_list = json.loads(moves_str)
-            # Convert to unified string format (same as hybrid/multi)
-            # PRESERVE THE COMPLETE SEQUENCE - even if it has mistakes
-            moves_made = [str(move) for move in moves_list]
-        else:
-            # Fallback if pattern not found
-            moves_made = ["[1, 0, 2]"]  # Minimal fallback
-            
-    except Exception:
-        # Fallback for any parsing errors
-        moves_made = ["[1, 0, 2]"]  # Minimal fallback
+    return cached_prompt(f"{system_prompt}\n\n", user_prompt)
+
+def _solution_update(state, response):
+    # Extract complete move sequence from paper-style response
+    response_text = response.content.strip()
+    moves_made, extraction_error = extract_moves(response_text)
     
     # DON'T run simulator here - just preserve what agent produced
     # The goal_checker will do the validation and show where mistakes occur
@@ -89,5 +95,234 @@ Find the sequence of moves to transform the initial configuration into the goal
         "iteration_count": 1,                       # ✅ Single iteration
         # Keep original data for debugging/analysis
         "paper_style_response": response_text,
-        "complete_solution": True
-    }
\ No newline at end of file
+        "complete_solution": True,
+        "extraction_error": extraction_error,
+        "token_usage": token_usage("single_agent_solver", response)
+    }
+
+@traceable(name="single_agent.solver")
+def single_agent_solver_node(state):
+    """
+    Single agent handling ALL constraints + move generation
+    (Replicating the paper's exact monolithic approach)
+    
+    Generates complete solution, then converts to unified structure
+    (or streams it, see MoveStreamMonitor, when stream_moves is set)
+    """
+    response = _batched_response(state)
+    if response is None and state.get("stream_moves", False):
+        monitor = MoveStreamMonitor(state)
+        stream = creative_llm.stream(_paper_prompt(state))
+        for chunk in stream:
+            if monitor.on_chunk(chunk):
+                break
+        stream.close()  # Stops generation when we broke out early
+        return monitor.update(state)
+    
+    response = response or creative_llm.invoke(_paper_prompt(state))
+    return _solution_update(state, response)
+
+@traceable(name="single_agent.solver")
+async def asingle_agent_solver_node(state):
+    """Async single_agent_solver_node"""
+    response = _batched_response(state)
+    if response is None and state.get("stream_moves", False):
+        monitor = MoveStreamMonitor(state)
+        stream = creative_llm.astream(_paper_prompt(state))
+        async for chunk in stream:
+            if monitor.on_chunk(chunk):
+                break
+        await stream.aclose()
+        return monitor.update(state)
+    
+    response = response or await creative_llm.ainvoke(_paper_prompt(state))
+    return _solution_update(state, response)
+
+class MoveStreamMonitor:
+    """
+    Consumes a streamed paper-style response, parsing and simulating the
+    moves of every "moves = [...]" list as they arrive. on_chunk() returns
+    True (stop generating) once a list closes that reaches the goal - the
+    final answer - or, with stop_at_invalid_move, at an invalid move in the
+    response's first list (the moves up to and including it become the
+    run's moves). Later lists only stop at the goal: a second list means the
+    response is exploring, and a draft cannot be told from the final answer
+    until it closes.
+    """
+    
+    def __init__(self, state):
+        initial_pegs, goal_pegs = _problem_pegs(state)
+        self.simulator = TowerOfHanoiSimulator(state["current_complexity"], len(initial_pegs),
+                                               initial_pegs, goal_pegs)
+        self.stop_at_invalid_move = state.get("stop_at_invalid_move", False)
+        self.parser = MoveListStream(MOVES_ASSIGNMENT_PATTERN)
+        self.message = None
+        self.lists = 0
+        self.list_valid = True
+        self.partial_moves = None
+        self.stop_reason = "end_of_stream"
+        self.start = time.perf_counter()
+        self.time_to_first_token = None
+        self.time_to_first_move = None
+    
+    def on_chunk(self, chunk):
+        self.message = chunk if self.message is None else self.message + chunk
+        text = prompt_text(chunk.content)
+        if text and self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.start
+        
+        for event, payload in self.parser.feed(text):
+            if event == "open":
+                self.simulator.reset()
+                self.lists += 1
+                self.list_valid = True
+            elif event == "move":
+                if self.time_to_first_move is None:
+                    self.time_to_first_move = time.perf_counter() - self.start
+                if self.list_valid and not self.simulator.execute_move(*payload)[0]:
+                    self.list_valid = False
+                    if self.stop_at_invalid_move and self.lists == 1:
+                        self.stop_reason = "invalid_move"
+                        self.partial_moves = list(self.parser.moves)
+                        return True
+            elif event == "close" and self.list_valid and self.simulator.is_solved():
+                self.stop_reason = "goal_reached"
+                return True
+        return False
+    
+    def update(self, state):
+        """_solution_update for the streamed text, plus streaming_stats"""
+        usage = getattr(self.message, "usage_metadata", None)
+        update = _solution_update(state, AIMessage(content=self.parser.text, usage_metadata=usage))
+        if self.partial_moves is not None:
+            update["moves_made"] = [list(move) for move in self.partial_moves]
+            update["extraction_error"] = None
+        
+        stopped_early = self.stop_reason != "end_of_stream"
+        # Usage only reports the final output count when the stream ran to the end
+        output_tokens = estimate_tokens(self.parser.text) if stopped_early or not usage else usage.get("output_tokens", 0)
+        max_tokens = getattr(creative_llm, "max_tokens", None) or 0
+        update["streaming_stats"] = {
+            "stop_reason": self.stop_reason,
+            "time_to_first_token": self.time_to_first_token,
+            "time_to_first_move": self.time_to_first_move,
+            "seconds": time.perf_counter() - self.start,
+            "output_tokens": output_tokens,
+            # max_tokens left when stopped early: an upper bound on the output the stop avoided
+            "unused_output_budget": max(0, max_tokens - output_tokens) if stopped_early else 0
+        }
+        return update
+
+def batch_custom_id(complexity, run):
+    return f"cell-{complexity}-{run}"
+
+# Results of finished batch jobs by (backend, batch_id). Only batch_stats (with the
+# batch_id) travels in graph state; the responses are looked up here, fetched
+# from the backend when missing. Each cell takes its response out, and only the
+# BATCH_RESULTS_KEPT most recently used batches are kept (a cell that finds
+# its batch gone fetches it again)
+BATCH_RESULTS_KEPT = 4
+_batch_results = OrderedDict()
+_batch_results_lock = threading.Lock()
+
+def _take_batch_result(batch_stats, custom_id):
+    """Remove and return custom_id's response text from its batch (None if the entry failed)"""
+    key = (batch_stats["backend"], batch_stats["batch_id"])
+    with _batch_results_lock:
+        if key not in _batch_results:
+            _remember_batch_results(key, get_batch_backend(key[0]).results(key[1]))
+        _batch_results.move_to_end(key)
+        responses = _batch_results[key]
+        text = responses.pop(custom_id, None)
+        if not responses:
+            del _batch_results[key]
+        return text
+
+def _remember_batch_results(key, responses):
+    """Store a batch's responses, dropping the least recently used batches; call with the lock held"""
+    _batch_results[key] = dict(responses)
+    while len(_batch_results) > BATCH_RESULTS_KEPT:
+        _batch_results.popitem(last=False)
+
+def _batched_response(state):
+    """This cell's response from single_agent_batch_node, or None (not batched or the entry failed)"""
+    batch_stats = state.get("batch_stats")
+    if not batch_stats or not batch_stats.get("batch_id"):
+        return None
+    custom_id = batch_custom_id(state["current_complexity"], state.get("current_run", 1))
+    text = _take_batch_result(batch_stats, custom_id)
+    return AIMessage(content=text) if text is not None else None
+
+def get_batch_backend(name):
+    """"local" answers with creative_llm through LocalFileBatchBackend; anything else uses the Batches API"""
+    if name == "local":
+        return LocalFileBatchBackend(creative_llm)
+    return AnthropicBatchBackend(creative_llm.model, creative_llm.max_tokens, creative_llm.temperature)
+
+def single_agent_batch_node(state):
+    """
+    Batch mode for single-agent sweeps: build the paper prompt of every
+    (complexity, run) cell, submit them as one batch job and wait for it.
+    single_agent_solver_node then looks up its cell's response by the
+    batch_id in batch_stats (cells whose batch entry failed fall back to a
+    live call).
+    """
+    requests = []
+    for complexity, run in experiment_cells(state):
+        cell = {**state, "current_complexity": complexity, "current_run": run}
+        cell.update(setup_problem_node(cell))
+        requests.append({"custom_id": batch_custom_id(complexity, run), "content": _paper_prompt(cell)[0].content})
+    
+    backend_name = state.get("batch_backend", "anthropic")
+    start = time.perf_counter()
+    # Nothing to submit when a resumed experiment has every cell already
+    batch_id, responses = get_batch_backend(backend_name).run(requests) if requests else (None, {})
+    with _batch_results_lock:
+        _remember_batch_results((backend_name, batch_id), responses)
+    
+    return {
+        "batch_stats": {
+            "backend": backend_name,
+            "batch_id": batch_id,
+            "requests": len(requests),
+            "succeeded": len(responses),
+            "live_fallbacks": len(requests) - len(responses),
+            "seconds": time.perf_counter() - start
+        }
+    }
+
+def describe_configuration(pegs, num_disks):
+    """Paper-style peg listing, e.g. "• Peg 0: 3 (bottom), ... 2, 1 (top)" """
+    lines = []
+    for peg_index, peg in enumerate(pegs):
+        if not peg:
+            description = "(empty)"
+        elif len(peg) == num_disks:
+            description = f"{num_disks} (bottom), ... 2, 1 (top)"
+        elif len(peg) == 1:
+            description = str(peg[0])
+        else:
+            description = ", ".join([f"{peg[0]} (bottom)"] + [str(disk) for disk in peg[1:-1]] + [f"{peg[-1]} (top)"])
+        lines.append(f"• Peg {peg_index}: {description}")
+    return "\n".join(lines)
+
+def extract_moves(response_text):
+    """
+    Extract the final "moves = [...]" list from a paper-style response as
+    [disk_id, from_peg, to_peg] int lists, parsed in one pass (no
+    json/str round trip). Later blocks win since the final answer comes last.
+    Returns (moves, extraction_error); moves is empty when no block parses.
+    """
+    extraction_error = None
+    
+    for match in reversed(list(MOVES_ASSIGNMENT_PATTERN.finditer(response_text))):
+        try:
+            moves, _ = parse_move_list(response_text, match.end())
+        except MoveParseError as e:
+            # Report the error from the last (final answer) block
+            extraction_error = extraction_error or str(e)
+            continue
+        # PRESERVE THE COMPLETE SEQUENCE - even if it has mistakes
+        return [list(move) for move in moves], None
+    
+    return [], extraction_error or "No 'moves = [...]' block found"
@@ -1,4 +1,7 @@
-from typing import TypedDict, List
+import operator
+from typing import Annotated, TypedDict, List, Union
+from .prompts import add_token_usage
+from .results_table import merge_aggregates
 
 class ExperimentState(TypedDict):
     # Experiment configuration
@@ -7,18 +10,54 @@ class ExperimentState(TypedDict):
     runs_per_complexity: int  # NEW: Number of runs per complexity level
     current_complexity: int
     current_run: int          # NEW: Current run number (1, 2, 3, ...)
+    max_concurrency: int      # Cells solved in parallel (default: 1)
+    batch_mode: bool          # Single agent: submit all prompts as one batch job
+    batch_backend: str        # "anthropic" (Message Batches API) or "local"
+    batch_stats: dict         # Batch job (backend, batch_id, counts); cells fetch their response by batch_id
+    lane_cells: List[List[int]]  # [complexity, run] cells of one parallel lane
+    experiment_id: str        # Resume key: completed cells are logged and skipped on restart
+    completed_cells: List[List[int]]  # [complexity, run] cells resumed from the experiment log
+    
+    # Problem variant configuration (defaults: 3 pegs, peg 0 -> last peg)
+    num_pegs: int
+    initial_pegs: List[List[int]]  # Optional explicit start configuration
+    goal_pegs: List[List[int]]     # Optional explicit goal configuration
+    random_start: bool
+    random_goal: bool
+    seed: int
     
     # Current problem state
+    initial_state: dict
     current_state: dict
     goal_state: dict
+    optimal_moves: int  # None when no exact optimum is cheaply known
     solver_type: str  # "single", "hybrid", "multi"
     
     # Solving state (for iterative approaches)
-    moves_made: List[str]
+    moves_made: List[Union[str, List[int]]]  # Move strings or [disk_id, from_peg, to_peg]
     max_moves: int
     solved: bool
     failed: bool
     iteration_count: int
+    route_to: str  # apply_move decision: "continue_solving", "regenerate_solver" or "goal_checker"
+    
+    # Regeneration context after a failed validation (hybrid/multi)
+    regeneration_needed: bool
+    regeneration_prompt: str
+    failed_move: str
+    validation_errors: List[str]
+    validation_breakdown: dict
+    
+    # Repeated-state detection (Zobrist hashing of applied moves)
+    cycle_policy: str       # "off", "hint" or "fail"
+    max_state_repeats: int  # Visits to one state before the policy triggers
+    state_hash: int
+    visited_states: dict    # str(state_hash) -> visit count
+    cycle_stats: dict
+    cycle_hint: str
+    
+    # Live optimal distance to goal after each applied move (only with a state index)
+    distance_to_goal: int
     
     # Validation state (for hybrid/multi step-by-step validation)
     proposed_move: str
@@ -27,10 +66,39 @@ class ExperimentState(TypedDict):
     size_order_valid: bool
     overall_valid: bool
     constraint_violations: List[str]
+    validation_summary: dict       # Multi-agent per-validator results
+    
+    # Deterministic pre-validation ("off", "gate" or "shadow")
+    prevalidation_mode: str
+    simulator_valid: bool          # None when prevalidation is off
+    simulator_message: str
+    llm_validation_skipped: bool
+    prevalidation_stats: dict      # Per-run counters incl. AI-vs-simulator agreement
     
     # Results tracking
-    results: List[dict]
+    results: Annotated[List[dict], operator.add]  # record_result appends one row per run
+    cell_results: Annotated[List[dict], operator.add]  # Lane outputs, merged by collect_results
+    running_aggregates: Annotated[dict, merge_aggregates]  # Per-(solver, complexity) counters, updated per run
     experiment_complete: bool
+    final_report: dict
+    llm_cache_baseline: dict       # Response cache counters at experiment start
+    llm_scheduler_baseline: dict   # LLM scheduler counters at experiment start
+    
+    # Single agent move extraction (None when the moves block parsed cleanly)
+    extraction_error: str
+    
+    # Single agent streaming: stop at the goal-reaching list (or first invalid move)
+    stream_moves: bool
+    stop_at_invalid_move: bool
+    streaming_stats: dict
+    
+    # Input tokens per LLM node: cached prefix reads/writes vs uncached
+    token_usage: Annotated[dict, add_token_usage]
+    
+    # Hybrid/multi solver prompts: move history policy ("full", "last_k", "state_only"; see prompts.py)
+    history_policy: str
+    history_window: int  # Moves kept by "last_k" (default: 10)
+    solver_prompt_tokens: Annotated[List[dict], operator.add]  # Per solver call: iteration, input tokens, seconds
     
     # Detailed analysis from goal checker
     solution_analysis: dict
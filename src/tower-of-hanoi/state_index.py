@@ -0,0 +1,131 @@
+"""
+Precomputed state-space index for the 3-peg problem with small n.
+
+Every legal state is addressed by its base-3 encoding (digit d-1 = peg of
+disk d). For each state the index file stores the optimal distance to the
+goal (uint16) and the optimal next move (one byte: disk << 4 | from << 2 | to,
+0 when solved). Files are memory-mapped read-only, so every worker shares the
+page cache and a lookup is a single memoryview access.
+"""
+
+import mmap
+import os
+
+# Index files live here (override with HANOI_STATE_INDEX_DIR)
+STATE_INDEX_DIR = os.getenv(
+    "HANOI_STATE_INDEX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tower-of-hanoi", "state_index")
+)
+
+MAX_INDEXED_DISKS = 13
+_MAGIC = b"HNOI"
+_HEADER_SIZE = 16  # magic, version, num_disks, goal_peg, padding
+
+def index_path(num_disks, goal_peg=2, directory=None):
+    return os.path.join(directory or STATE_INDEX_DIR, f"hanoi_n{num_disks}_goal{goal_peg}.idx")
+
+def build_state_index(num_disks, goal_peg=2, directory=None):
+    """
+    Build the index file for num_disks (<= MAX_INDEXED_DISKS) and return its path.
+    Distances equal BFS distances to the goal; they are computed for all 3^n
+    states at once with the vectorized closed form from oracle.py.
+    """
+    import numpy as np
+
+    if not 0 <= num_disks <= MAX_INDEXED_DISKS:
+        raise ValueError(f"State index supports 0-{MAX_INDEXED_DISKS} disks, got {num_disks}")
+
+    states = np.arange(3 ** num_disks, dtype=np.int64)
+    distance = np.zeros(len(states), dtype=np.int64)
+    next_move = np.zeros(len(states), dtype=np.uint8)
+    target = np.full(len(states), goal_peg, dtype=np.int64)
+
+    for disk in range(num_disks, 0, -1):
+        peg = states // 3 ** (disk - 1) % 3
+        misplaced = peg != target
+        distance[misplaced] += 1 << (disk - 1)
+        next_move[misplaced] = ((disk << 4) | (peg[misplaced] << 2) | target[misplaced]).astype(np.uint8)
+        target = np.where(misplaced, 3 - peg - target, target)
+
+    path = index_path(num_disks, goal_peg, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC + bytes([1, num_disks, goal_peg]) + bytes(_HEADER_SIZE - len(_MAGIC) - 3))
+        f.write(distance.astype(np.uint16).tobytes())
+        f.write(next_move.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+def build_state_indexes(max_disks=MAX_INDEXED_DISKS, goal_peg=2, directory=None):
+    """Build index files for 1..max_disks disks"""
+    return [build_state_index(n, goal_peg, directory) for n in range(1, max_disks + 1)]
+
+class StateSpaceIndex:
+    """Read-only, memory-mapped view of one index file"""
+
+    __slots__ = ("num_disks", "goal_peg", "_mmap", "_distances", "_moves", "_powers")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mmap[:_HEADER_SIZE]
+        if header[:4] != _MAGIC:
+            raise ValueError(f"Not a state index file: {path}")
+        self.num_disks, self.goal_peg = header[5], header[6]
+
+        num_states = 3 ** self.num_disks
+        view = memoryview(self._mmap)
+        self._distances = view[_HEADER_SIZE:_HEADER_SIZE + 2 * num_states].cast("H")
+        self._moves = view[_HEADER_SIZE + 2 * num_states:_HEADER_SIZE + 3 * num_states]
+        self._powers = tuple(3 ** (disk - 1) if disk else 0 for disk in range(self.num_disks + 1))
+
+    def encode(self, pegs):
+        """Base-3 state index of simulator peg lists"""
+        return sum(peg_index * self._powers[disk] for peg_index, peg in enumerate(pegs) for disk in peg)
+
+    def move_delta(self, disk_id, from_peg, to_peg):
+        """Change of the state index when disk_id moves from_peg -> to_peg (O(1) incremental update)"""
+        return (to_peg - from_peg) * self._powers[disk_id]
+
+    def distance(self, state_index):
+        """Optimal number of moves from the indexed state to the goal"""
+        return self._distances[state_index]
+
+    def next_move(self, state_index):
+        """Optimal next (disk_id, from_peg, to_peg), or None when solved"""
+        packed = self._moves[state_index]
+        return (packed >> 4, packed >> 2 & 3, packed & 3) if packed else None
+
+# Opened indexes, shared by everything in this process
+_open_indexes = {}
+
+def get_state_index(num_disks, goal_peg=2):
+    """Per-process shared index for num_disks, or None if no index file was built (yet)"""
+    key = (num_disks, goal_peg)
+    if key not in _open_indexes:
+        path = index_path(num_disks, goal_peg)
+        if not os.path.exists(path):
+            return None
+        _open_indexes[key] = StateSpaceIndex(path)
+    return _open_indexes[key]
+
+def distance_trace(pegs, moves, index):
+    """
+    Distance to goal before the first move and after each applied move.
+    moves are (disk_id, from_peg, to_peg) deltas (None entries are skipped).
+    """
+    state_index = index.encode(pegs)
+    trace = [index.distance(state_index)]
+    for move in moves:
+        if move is not None:
+            state_index += index.move_delta(*move)
+            trace.append(index.distance(state_index))
+    return trace
+
+def index_for_problem(num_disks, goal_pegs):
+    """Index matching a 3-peg problem whose goal is one full stack, or None"""
+    occupied = [peg_index for peg_index, peg in enumerate(goal_pegs) if peg]
+    if len(goal_pegs) != 3 or len(occupied) != 1 or num_disks > MAX_INDEXED_DISKS:
+        return None
+    return get_state_index(num_disks, occupied[0])
@@ -1,3 +1,33 @@
+from langgraph.config import get_stream_writer
+from langgraph.types import Overwrite
+from .llm_cache import cache_stats_since
+from .llm_scheduler import scheduler_stats_since
+from .prompts import add_token_usage
+from .result_store import store_artifacts, load_artifacts
+from .results_table import (
+    ResultsTable,
+    SOLVER_TYPES,
+    performance_from_aggregates,
+    ai_accuracy_from_aggregates,
+    row_aggregates,
+    merge_aggregates
+)
+
+def describe_goal(goal_pegs):
+    """Goal line for solver prompts ("Move all disks to peg 2" for the paper's problem)"""
+    occupied = [peg_index for peg_index, peg in enumerate(goal_pegs) if peg]
+    if len(occupied) == 1:
+        return f"Move all disks to peg {occupied[0]}"
+    return f"Reach peg configuration {goal_pegs} (each peg listed bottom to top)"
+
+def emit_running_aggregates(aggregates):
+    """Put a run's counters on the custom stream (no-op when called outside a graph run)"""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"running_aggregates": aggregates})
+
 def record_result_node(state):
     """Record result for current complexity level and run"""
     
@@ -9,6 +39,8 @@ def record_result_node(state):
         "complexity": state["current_complexity"],
         "run": state.get("current_run", 1),
         "solver_type": state["solver_type"],
+        "num_pegs": state.get("num_pegs", 3),
+        "optimal_moves": state.get("optimal_moves"),
         "solved": state.get("solved", False),
         "failed": state.get("failed", False),
         
@@ -21,11 +53,25 @@ def record_result_node(state):
         "ai_validation_passed": state.get("overall_valid", None),
         "ai_constraint_violations": state.get("constraint_violations", []),
         
+        # Progress vs. the optimal solution (from the goal checker's oracle metrics)
+        "progress_toward_goal": analysis.get("progress_toward_goal"),
+        "excess_moves_over_optimal": analysis.get("excess_moves_over_optimal"),
+        
         # Detailed analysis from unified goal checker
         "solution_analysis": analysis,
-        "failure_details": failure_details
+        "failure_details": failure_details,
+        
+        # Cached vs uncached input tokens per LLM node
+        "token_usage": state.get("token_usage", {})
     }
     
+    # Deterministic pre-validation counters (hybrid/multi)
+    if state["solver_type"] in ["hybrid", "multi"]:
+        result["prevalidation_stats"] = state.get("prevalidation_stats", {})
+        # Move history policy of the solver prompts and their per-call input tokens / latency
+        result["history_policy"] = state.get("history_policy", "full")
+        result["solver_prompt_tokens"] = state.get("solver_prompt_tokens", [])
+    
     # Add multi-agent specific validation breakdown
     if state["solver_type"] == "multi":
         result["multi_agent_breakdown"] = state.get("validation_summary", {})
@@ -34,138 +80,168 @@ def record_result_node(state):
     if state["solver_type"] == "single":
         result["complete_solution"] = state.get("complete_solution", False)
         result["paper_style_response"] = state.get("paper_style_response", "")
+        result["extraction_error"] = state.get("extraction_error")
+        if state.get("streaming_stats"):
+            result["streaming_stats"] = state["streaming_stats"]
     
-    current_results = state.get("results", [])
-    updated_results = current_results + [result]
+    # Live partial reports: this run's counters go out on the custom stream right away
+    aggregates = row_aggregates(result)
+    emit_running_aggregates(aggregates)
     
-    return {"results": updated_results}
+    # Only the new row (heavy artifacts go to the result store, if one is set); the results reducer
+    # appends it, the running_aggregates reducer adds its counters
+    return {"results": [store_artifacts(result)], "running_aggregates": aggregates}
 
-def next_iteration_node(state):
-    """Move to next run or next complexity level"""
-    
-    current_complexity = state["current_complexity"]
-    current_run = state.get("current_run", 1)
-    runs_per_complexity = state.get("runs_per_complexity", 1)
-    complexity_end = state["complexity_end"]
-    
-    # Check if we need more runs for current complexity
-    if current_run < runs_per_complexity:
-        return {
-            "current_run": current_run + 1,
-            "experiment_complete": False
-        }
+def collect_results_node(state):
+    """Reduce step: lane results in deterministic (complexity, run) order"""
+    results = sorted(state.get("cell_results", []), key=lambda r: (r["complexity"], r["run"]))
+    # Replace rather than append: the sweep's results are exactly its cells
+    return {"results": Overwrite(results), "experiment_complete": True}
+
+def partial_report(aggregates):
+    """
+    Cheap report from running aggregates alone (no result rows): per-solver
+    performance and AI accuracy, available at any point of a sweep
+    """
+    aggregates = aggregates or {}
+    runs = {solver_type: sum(counters["runs"] for counters in aggregates.get(solver_type, {}).values())
+            for solver_type in SOLVER_TYPES}
+    return {
+        "completed_tests": sum(runs.values()),
+        "completed_by_solver": runs,
+        **{f"{solver_type}_agent_performance": performance_from_aggregates(aggregates.get(solver_type))
+           for solver_type in SOLVER_TYPES},
+        "hybrid_accuracy": ai_accuracy_from_aggregates(aggregates.get("hybrid")),
+        "multi_accuracy": ai_accuracy_from_aggregates(aggregates.get("multi"))
+    }
+
+def follow_partial_reports(chunks):
+    """
+    Partial reports from a workflow.stream(..., stream_mode="custom") (or
+    astream: use afollow_partial_reports): one after every recorded run,
+    whatever the number of lanes
+    """
+    aggregates = {}
+    for chunk in chunks:
+        if "running_aggregates" in chunk:
+            aggregates = merge_aggregates(aggregates, chunk["running_aggregates"])
+            yield partial_report(aggregates)
+
+async def afollow_partial_reports(chunks):
+    """Async follow_partial_reports"""
+    aggregates = {}
+    async for chunk in chunks:
+        if "running_aggregates" in chunk:
+            aggregates = merge_aggregates(aggregates, chunk["running_aggregates"])
+            yield partial_report(aggregates)
+
+def summarize_prevalidation(results_list):
+    """Sum per-run prevalidation counters and derive the AI-vs-simulator agreement rate"""
+    totals = {}
+    for result in results_list:
+        for key, value in (result.get("prevalidation_stats") or {}).items():
+            totals[key] = totals.get(key, 0) + value
     
-    # All runs for current complexity done, move to next complexity
-    if current_complexity < complexity_end:
-        return {
-            "current_complexity": current_complexity + 1,
-            "current_run": 1,
-            "experiment_complete": False
-        }
+    compared = totals.get("ai_compared", 0)
+    totals["agreement_rate"] = totals.get("ai_agreements", 0) / compared if compared else None
+    return totals
+
+def summarize_token_usage(results_list):
+    """Sum per-node token counters over runs, with the share of input tokens read from cache"""
+    totals = add_token_usage({}, {})
+    for result in results_list:
+        totals = add_token_usage(totals, result.get("token_usage"))
+    for counters in totals.values():
+        counters["cached_input_share"] = (counters["cached_input_tokens"] / counters["input_tokens"]
+                                          if counters["input_tokens"] else None)
+    return totals
+
+def summarize_solver_prompts(results_list):
+    """
+    Hybrid/multi solver calls by complexity: input tokens per call (mean and
+    max) and seconds per call, to compare history policies
+    """
+    calls_by_complexity = {}
+    for result in results_list:
+        calls_by_complexity.setdefault(result["complexity"], []).extend(result.get("solver_prompt_tokens") or [])
     
-    # All complexities and runs complete
-    return {"experiment_complete": True}
+    summary = {}
+    for complexity in sorted(calls_by_complexity):
+        calls = calls_by_complexity[complexity]
+        if calls:
+            summary[complexity] = {
+                "calls": len(calls),
+                "avg_input_tokens": sum(call["input_tokens"] for call in calls) / len(calls),
+                "max_input_tokens": max(call["input_tokens"] for call in calls),
+                "avg_seconds": sum(call["seconds"] for call in calls) / len(calls)
+            }
+    return summary
 
 def generate_report_node(state):
     """Generate final comparison report with success rates"""
     
     results = state.get("results", [])
     
-    # Group results by solver type
-    single_results = [r for r in results if r["solver_type"] == "single"]
-    hybrid_results = [r for r in results if r["solver_type"] == "hybrid"] 
-    multi_results = [r for r in results if r["solver_type"] == "multi"]
+    # Every performance metric comes from the running aggregates; one grouped pass over the
+    # columnar table rebuilds them if they do not cover exactly these rows (e.g. older checkpoints)
+    aggregates = state.get("running_aggregates") or {}
+    if sum(counters["runs"] for groups in aggregates.values() for counters in groups.values()) != len(results):
+        aggregates = ResultsTable.from_results(results).aggregate()
+    summary = partial_report(aggregates)
+    detailed_results = load_artifacts(results)
     
-    def calculate_metrics_with_success_rates(results_list):
-        if not results_list:
-            return {
-                "total_runs": 0,
-                "solved_count": 0, 
-                "overall_success_rate": 0,
-                "avg_moves": 0,
-                "avg_iterations": 0,
-                "success_by_complexity": {}
-            }
-        
-        total_runs = len(results_list)
-        solved_count = sum(1 for r in results_list if r["solved"])
-        overall_success_rate = solved_count / total_runs
-        
-        # Calculate success rates by complexity
-        complexity_groups = {}
-        for result in results_list:
-            complexity = result["complexity"]
-            if complexity not in complexity_groups:
-                complexity_groups[complexity] = {"total": 0, "solved": 0, "runs": []}
-            
-            complexity_groups[complexity]["total"] += 1
-            complexity_groups[complexity]["runs"].append(result)
-            if result["solved"]:
-                complexity_groups[complexity]["solved"] += 1
-        
-        success_by_complexity = {}
-        for complexity, data in complexity_groups.items():
-            success_rate = data["solved"] / data["total"]
-            solved_runs = [r for r in data["runs"] if r["solved"]]
-            
-            success_by_complexity[complexity] = {
-                "total_runs": data["total"],
-                "solved_runs": data["solved"],
-                "success_rate": success_rate,
-                "avg_moves_when_solved": sum(r["moves_count"] for r in solved_runs) / len(solved_runs) if solved_runs else 0,
-                "avg_iterations_when_solved": sum(r["iterations"] for r in solved_runs) / len(solved_runs) if solved_runs else 0
-            }
-        
-        # Overall averages for solved cases
-        solved_results = [r for r in results_list if r["solved"]]
-        avg_moves = sum(r["moves_count"] for r in solved_results) / len(solved_results) if solved_results else 0
-        avg_iterations = sum(r["iterations"] for r in results_list) / len(results_list)
-        
-        return {
-            "total_runs": total_runs,
-            "solved_count": solved_count,
-            "overall_success_rate": overall_success_rate,
-            "avg_moves": avg_moves,
-            "avg_iterations": avg_iterations,
-            "success_by_complexity": success_by_complexity
-        }
+    # Rows by solver type (per-run sections: prevalidation counters, AI comparisons)
+    rows_by_solver = {solver_type: [] for solver_type in SOLVER_TYPES}
+    for result in results:
+        rows_by_solver[result["solver_type"]].append(result)
+    hybrid_results = rows_by_solver["hybrid"]
+    multi_results = rows_by_solver["multi"]
     
     report = {
         "experiment_summary": {
             "complexity_range": f"{state['complexity_start']}-{state['complexity_end']}",
             "runs_per_complexity": state.get("runs_per_complexity", 1),
-            "total_tests": len(results),
-            "single_agent_tests": len(single_results),
-            "hybrid_agent_tests": len(hybrid_results),
-            "multi_agent_tests": len(multi_results)
+            "total_tests": summary["completed_tests"],
+            "single_agent_tests": summary["completed_by_solver"]["single"],
+            "hybrid_agent_tests": summary["completed_by_solver"]["hybrid"],
+            "multi_agent_tests": summary["completed_by_solver"]["multi"]
         },
-        "single_agent_performance": calculate_metrics_with_success_rates(single_results),
-        "hybrid_agent_performance": calculate_metrics_with_success_rates(hybrid_results),
-        "multi_agent_performance": calculate_metrics_with_success_rates(multi_results),
-        "detailed_results": results,
+        "single_agent_performance": summary["single_agent_performance"],
+        "hybrid_agent_performance": summary["hybrid_agent_performance"],
+        "multi_agent_performance": summary["multi_agent_performance"],
+        # Stored artifacts (solution_analysis, moves_sequence, ...) fetched back for the report
+        "detailed_results": detailed_results,
         
         # AI validation analysis
         "ai_validation_analysis": {
-            "hybrid_accuracy": None,
-            "multi_accuracy": None,
+            "hybrid_accuracy": summary["hybrid_accuracy"],
+            "multi_accuracy": summary["multi_accuracy"],
+            "simulator_agreement": {
+                "hybrid": summarize_prevalidation(hybrid_results),
+                "multi": summarize_prevalidation(multi_results)
+            },
             "detailed_comparisons": []
-        }
+        },
+        
+        # LLM response cache hits/misses during this experiment
+        "llm_cache": cache_stats_since(state.get("llm_cache_baseline")),
+        
+        # Rate limiting: queue waits, retries and the adaptive concurrency limit
+        "llm_scheduler": scheduler_stats_since(state.get("llm_scheduler_baseline")),
+        
+        # Prompt-prefix caching: cached vs uncached input tokens per node
+        "token_usage": summarize_token_usage(results),
+        
+        # Hybrid/multi solver prompt size and latency under the experiment's history policy
+        "solver_prompts": {
+            "history_policy": state.get("history_policy", "full"),
+            "by_complexity": summarize_solver_prompts(detailed_results)
+        },
+        
+        # Batch job of a batch_mode single-agent sweep (None otherwise)
+        "batch_submission": state.get("batch_stats")
     }
     
-    # Calculate AI validation accuracy for hybrid approach
-    hybrid_ai_results = [r for r in hybrid_results if r.get("ai_validation_passed") is not None]
-    if hybrid_ai_results:
-        correct_validations = sum(1 for r in hybrid_ai_results 
-                                if r["ai_validation_passed"] == r["solved"])
-        report["ai_validation_analysis"]["hybrid_accuracy"] = correct_validations / len(hybrid_ai_results)
-    
-    # Calculate AI validation accuracy for multi-agent approach
-    multi_ai_results = [r for r in multi_results if r.get("ai_validation_passed") is not None]
-    if multi_ai_results:
-        correct_validations = sum(1 for r in multi_ai_results 
-                                if r["ai_validation_passed"] == r["solved"])
-        report["ai_validation_analysis"]["multi_accuracy"] = correct_validations / len(multi_ai_results)
-    
     # Detailed AI vs deterministic comparisons
     for result in hybrid_results + multi_results:
         if result.get("ai_validation_passed") is not None:
@@ -185,6 +261,3 @@ def generate_report_node(state):
             report["ai_validation_analysis"]["detailed_comparisons"].append(comparison)
     
     return {"final_report": report}
-
-# Keep old function name for backward compatibility
-next_complexity_node = next_iteration_node
\ No newline at end of file
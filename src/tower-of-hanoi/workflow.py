@@ -1,11 +1,15 @@
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END, START
 from .state import ExperimentState
 from .setup_nodes import setup_experiment_node, setup_problem_node
-from .single_agent import single_agent_solver_node
+from .single_agent import single_agent_solver_node, asingle_agent_solver_node, single_agent_batch_node
 from .hybrid_agent import (
     hybrid_agent_solver_node, 
     hybrid_agent_validator_node, 
-    hybrid_agent_apply_move_node
+    hybrid_agent_apply_move_node,
+    ahybrid_agent_solver_node,
+    ahybrid_agent_validator_node
 )
 from .multi_agent import (
     multi_agent_solver_node,
@@ -13,39 +17,63 @@ from .multi_agent import (
     multi_agent_position_validator_node,
     multi_agent_size_order_validator_node,
     multi_agent_validation_resolver_node,
-    multi_agent_apply_move_node
+    multi_agent_apply_move_node,
+    amulti_agent_solver_node,
+    amulti_agent_disk_count_validator_node,
+    amulti_agent_position_validator_node,
+    amulti_agent_size_order_validator_node
 )
+from .prevalidation import prevalidate_move_node
 from .goal_checker import goal_checker_node
-from .utils import record_result_node, next_iteration_node, generate_report_node
+from .results_table import merge_aggregates
+from .experiment_log import get_experiment_log, config_fingerprint
+from .utils import record_result_node, collect_results_node, generate_report_node
 from .routing import (
     solver_routing,
-    experiment_routing
+    apply_move_routing,
+    hybrid_agent_prevalidation_routing,
+    multi_agent_prevalidation_routing,
+    cell_fanout_routing,
+    batch_submission_routing
 )
  
-def create_comparison_workflow():
+def llm_node(sync_node, async_node):
     """
-    Main workflow: Three-way comparison of solver approaches
+    Node with both implementations: graph.ainvoke/astream await async_node
+    (so the parallel validators overlap their LLM round trips on one event
+    loop), graph.invoke/stream fall back to sync_node.
+    """
+    return RunnableLambda(sync_node, afunc=async_node)
+
+def create_cell_workflow(checkpointer=False):
+    """
+    One (complexity, run) cell: set up the problem, solve it with the
+    selected approach, check it and record the result.
+    Async-first: LLM nodes run natively under ainvoke; invoke still works.
+    Compiled without a checkpointer unless one is passed (benchmarks), so
+    in-cell progress is not checkpointed (see create_comparison_workflow).
     """
     
     workflow = StateGraph(ExperimentState)
     
-    # Experiment setup
-    workflow.add_node("setup_experiment", setup_experiment_node)
+    # Problem setup
     workflow.add_node("setup_problem", setup_problem_node)
     
     # APPROACH A: Single Agent
-    workflow.add_node("single_agent_solver", single_agent_solver_node)
+    workflow.add_node("single_agent_solver", llm_node(single_agent_solver_node, asingle_agent_solver_node))
     
     # APPROACH B: Hybrid (Single Solver + Single Validator)
-    workflow.add_node("hybrid_agent_solver", hybrid_agent_solver_node)
-    workflow.add_node("hybrid_agent_validator", hybrid_agent_validator_node)
+    workflow.add_node("hybrid_agent_solver", llm_node(hybrid_agent_solver_node, ahybrid_agent_solver_node))
+    workflow.add_node("hybrid_agent_prevalidate", prevalidate_move_node)
+    workflow.add_node("hybrid_agent_validator", llm_node(hybrid_agent_validator_node, ahybrid_agent_validator_node))
     workflow.add_node("hybrid_agent_apply_move", hybrid_agent_apply_move_node)
     
     # APPROACH C: Multi-Agent
-    workflow.add_node("multi_agent_solver", multi_agent_solver_node)
-    workflow.add_node("multi_agent_disk_count_validator", multi_agent_disk_count_validator_node)
-    workflow.add_node("multi_agent_position_validator", multi_agent_position_validator_node)
-    workflow.add_node("multi_agent_size_order_validator", multi_agent_size_order_validator_node)
+    workflow.add_node("multi_agent_solver", llm_node(multi_agent_solver_node, amulti_agent_solver_node))
+    workflow.add_node("multi_agent_prevalidate", prevalidate_move_node)
+    workflow.add_node("multi_agent_disk_count_validator", llm_node(multi_agent_disk_count_validator_node, amulti_agent_disk_count_validator_node))
+    workflow.add_node("multi_agent_position_validator", llm_node(multi_agent_position_validator_node, amulti_agent_position_validator_node))
+    workflow.add_node("multi_agent_size_order_validator", llm_node(multi_agent_size_order_validator_node, amulti_agent_size_order_validator_node))
     workflow.add_node("multi_agent_validation_resolver", multi_agent_validation_resolver_node)
     workflow.add_node("multi_agent_apply_move", multi_agent_apply_move_node)
     
@@ -54,12 +82,8 @@ def create_comparison_workflow():
     
     # Result processing
     workflow.add_node("record_result", record_result_node)
-    workflow.add_node("next_iteration", next_iteration_node)
-    workflow.add_node("generate_report", generate_report_node)
     
-    # Main experiment flow
-    workflow.set_entry_point("setup_experiment")
-    workflow.add_edge("setup_experiment", "setup_problem")
+    workflow.set_entry_point("setup_problem")
     
     # Route to appropriate solver
     workflow.add_conditional_edges(
@@ -76,15 +100,38 @@ def create_comparison_workflow():
     workflow.add_edge("single_agent_solver", "goal_checker")
     
     # APPROACH B: Hybrid solving loop
-    workflow.add_edge("hybrid_agent_solver", "hybrid_agent_validator")
+    # Optional deterministic simulator check before the AI validator (prevalidation_mode)
+    workflow.add_edge("hybrid_agent_solver", "hybrid_agent_prevalidate")
+    workflow.add_conditional_edges(
+        "hybrid_agent_prevalidate",
+        hybrid_agent_prevalidation_routing,
+        ["hybrid_agent_validator", "hybrid_agent_apply_move"]
+    )
     workflow.add_edge("hybrid_agent_validator", "hybrid_agent_apply_move")
-    workflow.add_edge("hybrid_agent_apply_move", "goal_checker")
+    workflow.add_conditional_edges(
+        "hybrid_agent_apply_move",
+        apply_move_routing,
+        {
+            "goal_checker": "goal_checker",
+            "regenerate_solver": "hybrid_agent_solver",
+            "continue_solving": "hybrid_agent_solver"
+        }
+    )
     
     # APPROACH C: Multi-agent solving loop with parallel validation
-    # Parallel edges from solver to all validators
-    workflow.add_edge("multi_agent_solver", "multi_agent_disk_count_validator")
-    workflow.add_edge("multi_agent_solver", "multi_agent_position_validator") 
-    workflow.add_edge("multi_agent_solver", "multi_agent_size_order_validator")
+    # Parallel fan-out from the prevalidation gate to all validators
+    # (or straight to the resolver when the simulator gate rejected the move)
+    workflow.add_edge("multi_agent_solver", "multi_agent_prevalidate")
+    workflow.add_conditional_edges(
+        "multi_agent_prevalidate",
+        multi_agent_prevalidation_routing,
+        [
+            "multi_agent_disk_count_validator",
+            "multi_agent_position_validator",
+            "multi_agent_size_order_validator",
+            "multi_agent_validation_resolver"
+        ]
+    )
     
     # All validators feed into resolver
     workflow.add_edge("multi_agent_disk_count_validator", "multi_agent_validation_resolver")
@@ -94,23 +141,134 @@ def create_comparison_workflow():
     # Remove conditional edge, make direct edge to apply_move
     workflow.add_edge("multi_agent_validation_resolver", "multi_agent_apply_move")
 
-    workflow.add_edge("multi_agent_apply_move", "goal_checker")
+    workflow.add_conditional_edges(
+        "multi_agent_apply_move",
+        apply_move_routing,
+        {
+            "goal_checker": "goal_checker",
+            "regenerate_solver": "multi_agent_solver",
+            "continue_solving": "multi_agent_solver"
+        }
+    )
     
     # Unified goal checker - direct edge to record_result
     workflow.add_edge("goal_checker", "record_result")
     
-    # Experiment progression - now handles multiple runs per complexity
-    workflow.add_edge("record_result", "next_iteration")
+    workflow.add_edge("record_result", END)
     
-    workflow.add_conditional_edges(
-        "next_iteration",
-        experiment_routing,
-        {
-            "continue": "setup_problem",
-            "complete": "generate_report"
-        }
-    )
+    # Never checkpointed: a lane invokes it once per cell
+    return workflow.compile(checkpointer=checkpointer)
+
+# Upper bound on supersteps per cell: max_moves (<= 100) iterations of at most
+# five steps (solver, prevalidate, validators, resolver, apply_move) plus setup
+CELL_RECURSION_LIMIT = 1000
+
+_cell_workflow = None
+
+def _get_cell_workflow():
+    global _cell_workflow
+    if _cell_workflow is None:
+        _cell_workflow = create_cell_workflow()
+    return _cell_workflow
+
+def _lane_inputs(state, config):
+    """(cell input, cell config) for every cell of the lane, in lane order"""
+    experiment = {key: value for key, value in state.items() if key != "lane_cells"}
+    cell_config = {"recursion_limit": max(config.get("recursion_limit", 0), CELL_RECURSION_LIMIT)}
+    return [
+        ({**experiment, "current_complexity": complexity, "current_run": run, "results": [],
+          "running_aggregates": {}}, cell_config)
+        for complexity, run in state["lane_cells"]
+    ]
+
+class _Lane:
+    """
+    A lane's finished cells: their result rows and running aggregates. The
+    cells are streamed so that the custom events of their record_result
+    nodes (each run's aggregates, see utils.follow_partial_reports) reach
+    the parent's custom stream as they happen; with an experiment_id each
+    finished cell's rows are logged for resuming (see experiment_log.py)
+    """
+
+    STREAM_MODES = ["custom", "values"]
+
+    def __init__(self, state):
+        self.experiment_id = state.get("experiment_id")
+        self.config = config_fingerprint(state)
+        self.results = []
+        self.aggregates = {}
+        self.write = get_stream_writer()
+
+    def forward(self, mode, chunk, cell_state):
+        """Pass custom events on to the parent stream; returns the latest cell state"""
+        if mode == "custom":
+            self.write(chunk)
+            return cell_state
+        return chunk
+
+    def add(self, cell_state):
+        if self.experiment_id:
+            get_experiment_log().put(self.experiment_id, self.config, cell_state["results"])
+        self.results.extend(cell_state["results"])
+        self.aggregates = merge_aggregates(self.aggregates, cell_state.get("running_aggregates", {}))
+
+    def update(self):
+        return {"cell_results": self.results, "running_aggregates": self.aggregates}
+
+def run_lane_node(state, config):
+    """Run this lane's cells one after another through the cell workflow"""
+    lane = _Lane(state)
+    for cell_input, cell_config in _lane_inputs(state, config):
+        cell_state = None
+        for mode, chunk in _get_cell_workflow().stream(cell_input, cell_config, stream_mode=_Lane.STREAM_MODES):
+            cell_state = lane.forward(mode, chunk, cell_state)
+        lane.add(cell_state)
+    return lane.update()
+
+async def arun_lane_node(state, config):
+    """Async run_lane_node"""
+    lane = _Lane(state)
+    for cell_input, cell_config in _lane_inputs(state, config):
+        cell_state = None
+        cell_stream = _get_cell_workflow().astream(cell_input, cell_config, stream_mode=_Lane.STREAM_MODES)
+        async for mode, chunk in cell_stream:
+            cell_state = lane.forward(mode, chunk, cell_state)
+        lane.add(cell_state)
+    return lane.update()
+
+def create_comparison_workflow(checkpointer=None):
+    """
+    Main workflow: Three-way comparison of solver approaches
+    
+    Map-reduce over (complexity, run) cells: the cells are split round-robin
+    into max_concurrency lanes (default 1, i.e. sequential), each lane is
+    Sent to run_lane in parallel, and collect_results restores
+    (complexity, run) order before the report. In batch_mode, single-agent
+    prompts are first submitted as one batch job (single_agent_batch).
+    The LangGraph Platform supplies its own checkpointer; pass one to run
+    locally with persistence.
+    
+    Durability: the parent checkpointer records super-steps of this graph
+    only. A lane runs its cells through the cell workflow by hand, without a
+    checkpointer, so a lane's progress is saved only when the whole lane
+    finishes: a crash (or an interrupt) mid-lane loses its in-flight and
+    already-finished cells. Pass an experiment_id to log every finished cell
+    durably and skip it on restart (see experiment_log.py).
+    """
     
+    workflow = StateGraph(ExperimentState)
+    
+    workflow.add_node("setup_experiment", setup_experiment_node)
+    workflow.add_node("single_agent_batch", single_agent_batch_node)
+    workflow.add_node("run_lane", llm_node(run_lane_node, arun_lane_node))
+    workflow.add_node("collect_results", collect_results_node)
+    workflow.add_node("generate_report", generate_report_node)
+    
+    workflow.set_entry_point("setup_experiment")
+    workflow.add_conditional_edges("setup_experiment", batch_submission_routing, ["single_agent_batch", "run_lane"])
+    workflow.add_conditional_edges("single_agent_batch", cell_fanout_routing, ["run_lane"])
+    workflow.add_edge("run_lane", "collect_results")
+    workflow.add_edge("collect_results", "generate_report")
     workflow.add_edge("generate_report", END)
     
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Loads src/tower-of-hanoi (not an importable name) as the tower_of_hanoi
+package, offline: mock LLM provider, inline results, no response cache.
+"""
+
+import importlib.util
+import os
+import sys
+
+os.environ.setdefault("HANOI_LLM_PROVIDER", "mock")
+os.environ.setdefault("HANOI_RESULT_STORE", "inline")
+os.environ.setdefault("HANOI_LLM_CACHE", "off")
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "src", "tower-of-hanoi")
+
+if "tower_of_hanoi" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "tower_of_hanoi", os.path.join(PACKAGE_DIR, "__init__.py"), submodule_search_locations=[PACKAGE_DIR]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["tower_of_hanoi"] = package
+    spec.loader.exec_module(package)
+
+
+def bfs_distances(num_disks, goal_peg=2):
+    """{positions: optimal distance to all disks on goal_peg} by BFS, positions[d - 1] = peg of disk d"""
+    import collections
+    import itertools
+
+    goal = (goal_peg,) * num_disks
+    distances = {goal: 0}
+    queue = collections.deque([goal])
+    while queue:
+        positions = queue.popleft()
+        for from_peg, to_peg in itertools.permutations(range(3), 2):
+            on_from = [disk for disk, peg in enumerate(positions) if peg == from_peg]
+            on_to = [disk for disk, peg in enumerate(positions) if peg == to_peg]
+            if on_from and (not on_to or on_from[0] < on_to[0]):
+                moved = positions[:on_from[0]] + (to_peg,) + positions[on_from[0] + 1:]
+                if moved not in distances:
+                    distances[moved] = distances[positions] + 1
+                    queue.append(moved)
+    return distances
+
+
+def positions_to_pegs(positions):
+    """Simulator peg lists (bottom to top) for bfs_distances positions"""
+    pegs = [[], [], []]
+    for disk in range(len(positions), 0, -1):
+        pegs[positions[disk - 1]].append(disk)
+    return pegs
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from tower_of_hanoi import agents, config
+
+_IMPORT_SCRIPT = """
+import importlib, json, sys
+sys.path.insert(0, sys.argv[1])
+import conftest  # Loads the tower_of_hanoi package
+agents = importlib.import_module("tower_of_hanoi.agents")
+loaded = {name: name in sys.modules for name in ("tower_of_hanoi.workflow", "tower_of_hanoi.config", "langchain_anthropic")}
+try:
+    agents.warm_up()
+    error = None
+except ValueError as e:
+    error = str(e)
+print(json.dumps({"loaded": loaded, "error": error}))
+"""
+
+
+def test_importing_agents_builds_nothing_and_needs_no_credentials():
+    env = {key: value for key, value in os.environ.items() if key != "ANTHROPIC_API_KEY"}
+    env["HANOI_LLM_PROVIDER"] = "anthropic"
+    output = subprocess.run([sys.executable, "-c", _IMPORT_SCRIPT, os.path.dirname(__file__)], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    report = json.loads(output)
+    assert not any(report["loaded"].values())
+    # The missing key only surfaces once a client is actually built
+    assert "ANTHROPIC_API_KEY" in report["error"]
+
+
+def test_workflow_is_compiled_once_per_process(monkeypatch):
+    monkeypatch.setattr(agents, "_workflow", None)
+    workflow = agents.get_workflow()
+    assert agents.get_workflow() is workflow
+    assert agents.workflow is workflow
+
+    parent = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent + 1)
+    assert agents.get_workflow() is not workflow
+
+
+def test_lazy_llm_builds_its_client_once_per_process(monkeypatch):
+    built = []
+    monkeypatch.setattr(config, "create_llm", lambda **settings: built.append(settings) or object())
+    llm = config.LazyLLM(temperature=0, max_tokens=10)
+    assert not built
+    assert llm.get() is llm.get()
+    assert built == [{"temperature": 0, "max_tokens": 10}]
+
+    parent = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent + 1)
+    llm.get()
+    assert len(built) == 2
+
+    monkeypatch.setattr(config, "create_llm", lambda **settings: 1 / 0)
+    with pytest.raises(ValueError, match="Failed to initialize LLMs"):
+        config.LazyLLM(temperature=0, max_tokens=10).get()
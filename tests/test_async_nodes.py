@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from tower_of_hanoi.benchmarks import benchmark_async_validators, patched_llms
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+def test_multi_validators_overlap_under_ainvoke():
+    timings = benchmark_async_validators(num_disks=3, latency=0.1)
+    assert timings["async"]["solved"] and timings["sync"]["solved"]
+    assert timings["async"]["llm_calls"] == timings["sync"]["llm_calls"] == 4 * timings["async"]["iterations"]
+    # Solver then the slowest validator (2 round trips) instead of all four in a row
+    assert timings["sequential_seconds_per_iteration"] == pytest.approx(4 * 0.1)
+    for mode in ("async", "sync"):
+        assert 2 * 0.1 <= timings[mode]["seconds_per_iteration"] < 3 * 0.1
+
+
+@pytest.mark.parametrize("solver_type", ["single", "hybrid", "multi"])
+def test_ainvoke_gives_the_same_rows_as_invoke(solver_type):
+    inputs = {"complexity_start": 2, "complexity_end": 3, "runs_per_complexity": 2, "solver_type": solver_type}
+
+    def rows(result):
+        return [(row["complexity"], row["run"], row["solved"], row["moves_sequence"]) for row in result["results"]]
+
+    with patched_llms(MockChatModel()):
+        expected = rows(create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000}))
+    with patched_llms(MockChatModel()):
+        result = asyncio.run(create_comparison_workflow().ainvoke(inputs, {"recursion_limit": 10000}))
+    assert rows(result) == expected
+    assert all(row[2] for row in expected)
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+import pytest
+from tower_of_hanoi import single_agent
+from tower_of_hanoi.batch_backend import BatchError, LocalFileBatchBackend
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+def test_failed_local_batch_raises_instead_of_polling_forever(tmp_path):
+    backend = LocalFileBatchBackend(MockChatModel(), directory=str(tmp_path))
+    # A request without a custom_id makes the worker itself fail
+    with pytest.raises(BatchError, match="failed"):
+        backend.run([{"content": "hello"}], timeout=10)
+
+
+def test_run_times_out(tmp_path, monkeypatch):
+    backend = LocalFileBatchBackend(MockChatModel(), directory=str(tmp_path))
+    monkeypatch.setattr(backend, "poll", lambda batch_id: False)
+    with pytest.raises(BatchError, match="not done"):
+        backend.run([], timeout=0.2)
+
+
+def test_batch_sweep_keeps_responses_out_of_state(tmp_path, monkeypatch):
+    monkeypatch.setattr("tower_of_hanoi.batch_backend.BATCH_DIR", str(tmp_path))
+    inputs = {"complexity_start": 3, "complexity_end": 4, "runs_per_complexity": 2, "solver_type": "single",
+              "batch_mode": True, "batch_backend": "local", "max_concurrency": 2}
+    result = create_comparison_workflow().invoke(inputs)
+    stats = result["final_report"]["batch_submission"]
+    assert stats["requests"] == stats["succeeded"] == 4
+    assert "batch_responses" not in result
+    assert all(row["solved"] for row in result["results"])
+    # Every cell took its response: nothing stays behind for the process lifetime
+    assert (stats["backend"], stats["batch_id"]) not in single_agent._batch_results
+
+
+def test_batch_results_keep_only_recent_batches(monkeypatch):
+    monkeypatch.setattr(single_agent, "_batch_results", OrderedDict())
+    fetched = []
+
+    class Backend:
+        def results(self, batch_id):
+            fetched.append(batch_id)
+            return {"cell-3-1": f"answer {batch_id}"}
+
+    monkeypatch.setattr(single_agent, "get_batch_backend", lambda name: Backend())
+    for batch_id in range(single_agent.BATCH_RESULTS_KEPT + 2):
+        with single_agent._batch_results_lock:
+            single_agent._remember_batch_results(("local", batch_id), {"cell-3-1": "kept", "cell-3-2": "kept"})
+    assert len(single_agent._batch_results) == single_agent.BATCH_RESULTS_KEPT
+
+    stats = {"backend": "local", "batch_id": 0}
+    # An evicted batch is fetched again
+    assert single_agent._take_batch_result(stats, "cell-3-1") == "answer 0"
+    assert fetched == [0]
+    assert single_agent._take_batch_result({**stats, "batch_id": 5}, "cell-3-1") == "kept"
+    assert single_agent._batch_results[("local", 5)] == {"cell-3-2": "kept"}
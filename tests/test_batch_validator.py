@@ -0,0 +1,31 @@
+import pytest
+from tower_of_hanoi.batch_validator import (
+    ERROR_PARSE, ERROR_PEG_BOUNDS, moves_to_array, validate_batch
+)
+from tower_of_hanoi.simulator import TowerOfHanoiSimulator
+
+SOLUTIONS = [
+    ["[-1,-1,-1]", "[1, 0, 2]"],
+    ["garbage", "[1, 0, 2]"],
+    ["[1, 0, 2]", "[2, 0, 1]", "[1, 2, 1]", "[3, 0, 2]"],
+    ["[1, 0, 2]", "[2, 0, 2]"]
+]
+
+
+@pytest.mark.parametrize("index", range(len(SOLUTIONS)))
+def test_batch_matches_scalar_simulator(index):
+    moves, lengths = moves_to_array(SOLUTIONS)
+    batch = validate_batch(moves, 3, lengths)
+    scalar = TowerOfHanoiSimulator(3).validate_complete_solution(SOLUTIONS[index])
+    first_invalid = scalar["first_invalid_move"]
+    assert batch["first_invalid_move"][index] == (-1 if first_invalid is None else first_invalid)
+    assert batch["valid_moves"][index] == scalar["valid_moves"]
+    assert batch["invalid_moves"][index] == scalar["invalid_moves"]
+
+
+def test_literal_minus_one_move_is_a_peg_bounds_error_not_a_parse_error():
+    moves, lengths = moves_to_array(SOLUTIONS[:2])
+    batch = validate_batch(moves, 3, lengths)
+    assert batch["error_class"].tolist() == [ERROR_PEG_BOUNDS, ERROR_PARSE]
+    scalar = TowerOfHanoiSimulator(3).validate_complete_solution(SOLUTIONS[0])
+    assert scalar["move_details"][0]["status"] == "invalid"
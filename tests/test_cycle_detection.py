@@ -0,0 +1,61 @@
+import json
+import pytest
+from langchain_core.messages import AIMessage
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.cycle_detection import initial_cycle_state, record_state_visit, zobrist_hash
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+class _OscillatingModel:
+    """Solver that moves disk 1 back and forth between pegs 0 and 1; validators approve everything"""
+
+    def __init__(self):
+        self.solver_prompts = []
+
+    def invoke(self, prompt, *args, **kwargs):
+        if "proposed_move" not in prompt:
+            verdicts = ("valid", "single_disk_valid", "top_disk_valid", "size_order_valid")
+            return AIMessage(content=json.dumps({**dict.fromkeys(verdicts, True), "violations": []}))
+        move = [1, 0, 1] if len(self.solver_prompts) % 2 == 0 else [1, 1, 0]
+        self.solver_prompts.append(prompt)
+        return AIMessage(content=json.dumps({"proposed_move": json.dumps(move), "strategy": "again"}))
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        return self.invoke(prompt, *args, **kwargs)
+
+
+def test_incremental_hash_matches_a_full_rehash():
+    state = {"current_complexity": 3, "current_state": {"pegs": [[3, 2, 1], [], []]}}
+    state.update(initial_cycle_state(state["current_state"]["pegs"]))
+    for disk_id, from_peg, to_peg, pegs in [(1, 0, 2, [[3, 2], [], [1]]), (2, 0, 1, [[3], [2], [1]]),
+                                            (1, 2, 1, [[3], [2, 1], []])]:
+        update, abort = record_state_visit(state, disk_id, from_peg, to_peg)
+        assert update["state_hash"] == zobrist_hash(pegs) and not abort
+        state.update(update, current_state={"pegs": pegs})
+    assert state["cycle_stats"]["distinct_states"] == 4
+    assert zobrist_hash([[3, 2, 1], [], []]) != zobrist_hash([[], [3, 2, 1], []])
+
+
+@pytest.mark.parametrize("solver_type", ["hybrid", "multi"])
+@pytest.mark.parametrize("cycle_policy", ["off", "hint", "fail"])
+def test_cycle_policies(solver_type, cycle_policy):
+    model = _OscillatingModel()
+    inputs = {"complexity_start": 3, "complexity_end": 3, "solver_type": solver_type,
+              "cycle_policy": cycle_policy, "max_state_repeats": 2}
+    with patched_llms(model):
+        row = create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000})["results"][0]
+    stats = row["failure_details"]["cycle_stats"]
+    warned = ["You are cycling" in prompt for prompt in model.solver_prompts]
+
+    assert row["failed"] and stats["distinct_states"] == 2
+    if cycle_policy == "fail":
+        # Start state reached a third time after four moves
+        assert row["iterations"] == 4 and stats["cycle_abort"]
+        assert stats["max_state_visits"] == 3
+    else:
+        assert row["iterations"] == row["failure_details"]["max_iterations"] == 16
+        assert not stats["cycle_abort"]
+    # States repeat from the fifth move on
+    assert warned == ([False] * 4 + [True] * 12 if cycle_policy == "hint" else [False] * len(warned))
+    # The hint raised by the last move has no solver call left to go into
+    assert stats["hints_injected"] == sum(warned) + (cycle_policy == "hint")
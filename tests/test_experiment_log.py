@@ -0,0 +1,74 @@
+import pytest
+from tower_of_hanoi import experiment_log, workflow
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.experiment_log import ConfigMismatchError, ExperimentLog, config_fingerprint
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+class _CrashingCells:
+    """Cell workflow that raises once `cells` cells have been streamed"""
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.cell_workflow = workflow._get_cell_workflow()
+
+    def stream(self, *args, **kwargs):
+        if self.cells == 0:
+            raise RuntimeError("interrupted")
+        self.cells -= 1
+        return self.cell_workflow.stream(*args, **kwargs)
+
+
+def _sweep(inputs):
+    # A fresh mock per sweep: its answers depend on how often it has seen each prompt
+    with patched_llms(MockChatModel(error_rate=0.3, validator_accuracy=0.7, seed=1)):
+        return create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000})
+
+
+def _timeless(report):
+    """The report without wall-clock timings and process-wide LLM counters"""
+    report = {key: value for key, value in report.items() if key not in ("llm_cache", "llm_scheduler")}
+    for prompts in report["solver_prompts"]["by_complexity"].values():
+        prompts.pop("avg_seconds")
+    for result in report["detailed_results"]:
+        for call in result.get("solver_prompt_tokens", []):
+            call.pop("seconds")
+    return report
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    log = ExperimentLog(str(tmp_path / "experiments.sqlite"))
+    monkeypatch.setattr(experiment_log, "_experiment_log", log)
+    return log
+
+
+@pytest.mark.parametrize("solver_type", ["single", "hybrid"])
+def test_resumed_sweep_reports_like_an_uninterrupted_one(log, monkeypatch, solver_type):
+    inputs = {"complexity_start": 2, "complexity_end": 4, "runs_per_complexity": 2, "solver_type": solver_type}
+    uninterrupted = _sweep(inputs)["final_report"]
+
+    resumable = {**inputs, "experiment_id": "sweep"}
+    with monkeypatch.context() as patch:
+        # Interrupted once complexity 2 is done, so the mock's prompt counts line up on resume
+        crashing = _CrashingCells(2)
+        patch.setattr(workflow, "_get_cell_workflow", lambda: crashing)
+        with pytest.raises(RuntimeError, match="interrupted"):
+            _sweep(resumable)
+    logged = log.completed("sweep", solver_type, config_fingerprint(resumable))
+    assert [(row["complexity"], row["run"]) for row in logged] == [(2, 1), (2, 2)]
+
+    resumed = _sweep(resumable)
+    assert resumed["completed_cells"] == [[2, 1], [2, 2]]
+    assert _timeless(resumed["final_report"]) == _timeless(uninterrupted)
+
+
+def test_restart_with_another_configuration_is_refused(log):
+    inputs = {"complexity_start": 2, "complexity_end": 2, "runs_per_complexity": 1, "solver_type": "hybrid",
+              "experiment_id": "sweep"}
+    _sweep(inputs)
+    with pytest.raises(ConfigMismatchError):
+        _sweep({**inputs, "num_pegs": 4})
+    # Spelling out a default is the same configuration
+    assert _sweep({**inputs, "num_pegs": 3})["completed_cells"] == [[2, 1]]
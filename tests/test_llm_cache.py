@@ -0,0 +1,59 @@
+import os
+import threading
+from langchain_core.messages import AIMessage
+from tower_of_hanoi import llm_cache, llm_scheduler
+from tower_of_hanoi.llm_cache import CachedChatModel, ResponseCache
+
+
+class _EchoModel:
+    temperature = 0
+
+    def invoke(self, prompt, *args, **kwargs):
+        return AIMessage(content=prompt)
+
+
+def test_eviction_keeps_the_table_in_budget_without_summing_it_on_every_put(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_bytes=1000, memory_entries=4)
+    statements = []
+    cache._connection().set_trace_callback(statements.append)
+    for i in range(100):
+        cache.put(f"key-{i}", "x" * 100)
+
+    # The table size is read once, then tracked
+    assert sum("SUM(size)" in statement for statement in statements) == 1
+    table = cache._connection().execute("SELECT COUNT(*), SUM(size) FROM responses").fetchone()
+    assert table == (10, 1000)
+    assert cache.stats["evictions"] == 90
+    assert cache._total_bytes == 1000
+
+    statements.clear()
+    cache.put("key-99", "x" * 50)  # Replacing a row shrinks the table: no re-read, no eviction
+    assert cache._total_bytes == 950
+    assert not any("SUM(size)" in statement for statement in statements)
+
+
+def test_bypassed_calls_are_all_counted(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    model = CachedChatModel(_EchoModel(), enabled=False, cache=cache)
+
+    def call():
+        for _ in range(500):
+            model.invoke("prompt")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.snapshot()["bypassed"] == 4000
+
+
+def test_forked_workers_get_their_own_cache_and_scheduler(monkeypatch):
+    cache, scheduler = llm_cache.get_response_cache(), llm_scheduler.get_llm_scheduler()
+    assert llm_cache.get_response_cache() is cache
+    assert llm_scheduler.get_llm_scheduler() is scheduler
+
+    parent = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent + 1)
+    assert llm_cache.get_response_cache() is not cache
+    assert llm_scheduler.get_llm_scheduler() is not scheduler
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import pytest
+from langchain_core.messages import AIMessage
+from tower_of_hanoi.llm_scheduler import LLMScheduler
+from tower_of_hanoi.prompts import estimate_tokens
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_cancelled_acall_releases_its_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def hang(prompt):
+        await asyncio.sleep(3600)
+
+    async def answer(prompt):
+        return "ok"
+
+    async def main():
+        task = asyncio.create_task(scheduler.acall(hang, "prompt"))
+        await asyncio.sleep(0.05)
+        assert scheduler.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.in_flight == 0
+        # With the only slot leaked this would wait forever
+        return await asyncio.wait_for(scheduler.acall(answer, "prompt"), timeout=5)
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_call_retries_rate_limits_and_releases_slots():
+    scheduler = LLMScheduler(max_concurrency=2, base_delay=0.0, max_delay=0.0)
+    attempts = []
+
+    def flaky(prompt):
+        attempts.append(prompt)
+        if len(attempts) == 1:
+            raise RateLimited()
+        return "ok"
+
+    assert scheduler.call(flaky, "prompt") == "ok"
+    assert len(attempts) == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.stats["retries"] == 1
+    assert scheduler.stats["min_concurrency_limit"] == 1
+
+
+def test_async_waiters_park_until_a_thread_releases_the_slot():
+    scheduler = LLMScheduler(requests_per_minute=60000, max_concurrency=1)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold(prompt):
+        holding.set()
+        release.wait()
+        return "held"
+
+    async def answer(prompt):
+        return "ok"
+
+    async def main():
+        thread = threading.Thread(target=scheduler.call, args=(hold, "prompt"))
+        thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, holding.wait)
+        waiting = [asyncio.create_task(scheduler.acall(answer, "prompt")) for _ in range(2)]
+        cancelled = asyncio.create_task(scheduler.acall(answer, "prompt"))
+        await asyncio.sleep(0.05)
+        # Parked on futures, not polling
+        assert len(scheduler._async_waiters) == 3
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert len(scheduler._async_waiters) == 2
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(*waiting), timeout=5)
+        thread.join()
+        return results
+
+    assert asyncio.run(main()) == ["ok", "ok"]
+    assert scheduler.in_flight == 0
+
+
+def test_calls_reserve_max_tokens_and_settle_on_reported_usage():
+    scheduler = LLMScheduler(requests_per_minute=60000, tokens_per_minute=60000)  # 1000-token bucket
+    levels = []
+
+    def answer(prompt):
+        levels.append(scheduler.tokens.level)
+        return AIMessage(content="ok", usage_metadata={"input_tokens": 10, "output_tokens": 20, "total_tokens": 30})
+
+    scheduler.call(answer, "x" * 40, max_tokens=500)
+    assert levels[0] == pytest.approx(1000 - (estimate_tokens("x" * 40) + 500), abs=25)
+    assert scheduler.tokens.level == pytest.approx(1000 - 30, abs=25)
+
+    with pytest.raises(ValueError):
+        scheduler.call(lambda prompt: int("not a number"), "x" * 40, max_tokens=500)
+    # A failed call generated nothing: only its input stays charged
+    assert scheduler.tokens.level == pytest.approx(1000 - 30 - estimate_tokens("x" * 40), abs=25)
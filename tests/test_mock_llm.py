@@ -0,0 +1,124 @@
+import gc
+import json
+import random
+import sys
+import threading
+import pytest
+from tower_of_hanoi.mock_llm import LatencyDistribution, MockChatModel
+from tower_of_hanoi.single_agent import _paper_prompt
+
+
+class _Cycle:
+    """Cyclic garbage whose finalizer runs Python code, so collections can switch threads"""
+
+    def __init__(self):
+        self.self = self
+
+    def __del__(self):
+        for _ in range(20):
+            pass
+
+
+def test_parallel_validator_replies_do_not_race_in_ast():
+    # Parsing the prompt state with ast races across threads on CPython 3.11
+    # ("AST constructor recursion depth mismatch") when a thread switch lands mid-parse
+    switch_interval, thresholds = sys.getswitchinterval(), gc.get_threshold()
+    model = MockChatModel()
+    pegs = [list(range(30, 0, -1)), [], []]
+    prompt = f"Current state: {{'pegs': {pegs}}}\nPROPOSED MOVE: [1, 0, 2]\n"
+    errors = []
+
+    def validate(depth):
+        if depth:
+            return validate(depth - 1)
+        try:
+            for _ in range(1500):
+                for _ in range(5):
+                    _Cycle()
+                model.reply(prompt)
+        except Exception as error:
+            errors.append(error)
+
+    sys.setswitchinterval(1e-6)
+    gc.set_threshold(10)
+    try:
+        threads = [threading.Thread(target=validate, args=(5 * i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+        gc.set_threshold(*thresholds)
+    assert errors == []
+
+
+def _paper(num_disks):
+    return _paper_prompt({"current_complexity": num_disks})
+
+
+@pytest.mark.parametrize("spec, kind, params", [
+    ("0.2", "fixed", [0.2]),
+    ("uniform:0.1:0.3", "uniform", [0.1, 0.3]),
+    ("normal:1:0.5", "normal", [1.0, 0.5]),
+    ("lognormal:0.2:0.4", "lognormal", [0.2, 0.4]),
+    ("exponential:0.5", "exponential", [0.5])
+])
+def test_latency_specs_parse(spec, kind, params):
+    latency = LatencyDistribution(spec)
+    assert (latency.kind, latency.params) == (kind, params)
+    samples = [latency.sample(random.Random(i)) for i in range(200)]
+    assert all(sample >= 0 for sample in samples)
+    if kind == "uniform":
+        assert all(0.1 <= sample <= 0.3 for sample in samples)
+
+
+@pytest.mark.parametrize("spec", ["uniform:0.1", "fixed:1:2", "exponential"])
+def test_latency_specs_with_the_wrong_parameter_count_are_rejected(spec):
+    with pytest.raises(ValueError):
+        LatencyDistribution(spec)
+
+
+def test_error_rate_corrupts_solver_moves():
+    optimal = json.loads(MockChatModel(error_rate=0.0).reply(_paper(4))[0].split("moves = ")[1])
+    assert len(optimal) == 15
+    model = MockChatModel(error_rate=0.3, seed=0)
+    moves = json.loads(model.reply(_paper(4))[0].split("moves = ")[1])
+    wrong = sum(move != expected for move, expected in zip(moves, optimal))
+    assert wrong == model.stats["injected_errors"] > 0
+    assert MockChatModel(error_rate=1.0).reply(_paper(4))[0] != MockChatModel(error_rate=0.0).reply(_paper(4))[0]
+
+
+def test_validator_accuracy_flips_verdicts():
+    prompt = "Current state: {'pegs': [[2, 1], [], []]}\nPROPOSED MOVE: [1, 0, 2]\n"
+    assert json.loads(MockChatModel(validator_accuracy=1.0).reply(prompt)[0])["valid"] is True
+    model = MockChatModel(validator_accuracy=0.0)
+    assert json.loads(model.reply(prompt)[0])["valid"] is False
+    assert model.stats["flipped_verdicts"] == model.stats["validator_calls"] == 1
+    # An illegal move (disk 2 is under disk 1) is rejected by an accurate validator
+    illegal = "Current state: {'pegs': [[2, 1], [], []]}\nPROPOSED MOVE: [2, 0, 2]\n"
+    verdict = json.loads(MockChatModel().reply(illegal)[0])
+    assert verdict["valid"] is False and verdict["violations"]
+
+
+def test_replies_are_seeded_per_prompt_occurrence():
+    def replies(seed):
+        model = MockChatModel(error_rate=0.5, seed=seed)
+        return [model.reply(_paper(5))[0] for _ in range(3)]
+
+    first = replies(0)
+    assert replies(0) == first
+    assert replies(1) != first
+    # The n-th time a prompt is seen draws its own answer
+    assert len(set(first)) > 1
+
+
+def test_streamed_chunks_add_up_to_the_reply():
+    model = MockChatModel(chunk_chars=16, explanation_sentences=5)
+    chunks = list(model.stream(_paper(3)))
+    message = chunks[0]
+    for chunk in chunks[1:]:
+        message += chunk
+    assert len(chunks) > 1 and all(len(chunk.content) <= 16 for chunk in chunks)
+    assert message.content == MockChatModel(explanation_sentences=5).invoke(_paper(3)).content
+    assert message.usage_metadata["output_tokens"] > 0
@@ -0,0 +1,58 @@
+import pytest
+from conftest import bfs_distances, positions_to_pegs
+from tower_of_hanoi import oracle
+from tower_of_hanoi.goal_checker import goal_checker_node
+from tower_of_hanoi.oracle import distance_to_goal, frame_stewart_moves, optimal_next_move, progress_metrics
+from tower_of_hanoi.setup_nodes import setup_problem_node
+
+
+@pytest.mark.parametrize("num_disks, goal_peg", [(1, 2), (4, 2), (6, 0), (6, 1)])
+def test_closed_form_matches_bfs_on_every_state(num_disks, goal_peg):
+    distances = bfs_distances(num_disks, goal_peg)
+    assert len(distances) == 3 ** num_disks
+    for positions, distance in distances.items():
+        pegs = positions_to_pegs(positions)
+        assert distance_to_goal(pegs, goal_peg) == distance
+        move = optimal_next_move(pegs, goal_peg)
+        if distance == 0:
+            assert move is None
+            continue
+        disk, from_peg, to_peg = move
+        assert pegs[from_peg][-1] == disk and (not pegs[to_peg] or pegs[to_peg][-1] > disk)
+        moved = positions[:disk - 1] + (to_peg,) + positions[disk:]
+        assert distances[moved] == distance - 1
+
+
+def test_progress_metrics_of_a_partial_solution():
+    initial, goal = [[3, 2, 1], [], []], [[], [], [3, 2, 1]]
+    # Two optimal moves, then one wasted move
+    metrics = progress_metrics([[3], [2], [1]], 2, initial, goal)
+    assert metrics == {"optimal_moves": 7, "distance_to_goal": 5, "optimal_next_move": [1, 2, 1],
+                       "progress_toward_goal": pytest.approx(2 / 7), "excess_moves_over_optimal": 0}
+    metrics = progress_metrics([[3, 1], [2], []], 3, initial, goal)
+    assert (metrics["distance_to_goal"], metrics["excess_moves_over_optimal"]) == (5, 1)
+
+
+def test_goal_checker_reports_progress_per_run():
+    state = {"current_complexity": 3, "current_run": 1, "solver_type": "single"}
+    state.update(setup_problem_node(state))
+    analysis = goal_checker_node({**state, "moves_made": [[1, 0, 2], [2, 0, 1], [1, 2, 0]]})["solution_analysis"]
+    assert analysis["distance_to_goal"] == 5
+    assert analysis["progress_toward_goal"] == pytest.approx(2 / 7)
+    assert analysis["excess_moves_over_optimal"] == 1
+
+
+
+def test_frame_stewart_counts_are_memoized_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(oracle, "OPTIMAL_TABLE_PATH", str(tmp_path / "frame_stewart.json"))
+    monkeypatch.setattr(oracle, "_frame_stewart_table", None)
+    # Known optimal 4-peg counts (Frame-Stewart, proven optimal for 4 pegs)
+    assert [frame_stewart_moves(n, 4) for n in range(11)] == [0, 1, 3, 5, 9, 13, 17, 25, 33, 41, 49]
+    assert [frame_stewart_moves(n, 5) for n in range(6)] == [0, 1, 3, 5, 7, 11]
+    assert frame_stewart_moves(10, 3) == 1023
+
+    monkeypatch.setattr(oracle, "_frame_stewart_table", None)
+    monkeypatch.setattr(oracle, "_save_frame_stewart_table", lambda table: pytest.fail("table recomputed"))
+    assert frame_stewart_moves(10, 4) == 49
+    with pytest.raises(ValueError):
+        frame_stewart_moves(3, 2)
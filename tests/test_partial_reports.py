@@ -0,0 +1,71 @@
+from langgraph.graph import END, START, StateGraph
+from tower_of_hanoi.state import ExperimentState
+from tower_of_hanoi.utils import follow_partial_reports, record_result_node
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+INPUTS = {"complexity_start": 2, "complexity_end": 3, "runs_per_complexity": 2, "solver_type": "hybrid"}
+
+
+def test_partial_reports_stream_mid_sweep_with_one_lane():
+    events = list(create_comparison_workflow().stream({**INPUTS, "max_concurrency": 1},
+                                                      stream_mode=["custom", "updates"]))
+    lane_done = next(i for i, (mode, chunk) in enumerate(events) if mode == "updates" and "run_lane" in chunk)
+    reports = list(follow_partial_reports(chunk for mode, chunk in events[:lane_done] if mode == "custom"))
+    # Every run is reported before its (only) lane finishes
+    assert [report["completed_tests"] for report in reports] == [1, 2, 3, 4]
+    assert reports[-1]["completed_by_solver"]["hybrid"] == 4
+
+
+def test_last_partial_report_matches_final_report():
+    workflow = create_comparison_workflow()
+    reports = list(follow_partial_reports(workflow.stream({**INPUTS, "max_concurrency": 2}, stream_mode="custom")))
+    final = workflow.invoke({**INPUTS, "max_concurrency": 2})["final_report"]
+    assert reports[-1]["hybrid_agent_performance"] == final["hybrid_agent_performance"]
+    assert reports[-1]["hybrid_accuracy"] == final["ai_validation_analysis"]["hybrid_accuracy"]
+
+
+def test_record_result_can_be_called_directly():
+    update = record_result_node({"current_complexity": 3, "solver_type": "single", "solved": True,
+                                 "moves_made": [[1, 0, 2]], "iteration_count": 1})
+    assert update["results"][0]["moves_count"] == 1
+    assert update["running_aggregates"]["single"][3]["solved"] == 1
+
+
+def test_record_result_streams_its_aggregates():
+    graph = StateGraph(ExperimentState)
+    graph.add_node("record_result", record_result_node)
+    graph.add_edge(START, "record_result")
+    graph.add_edge("record_result", END)
+    chunks = list(graph.compile().stream({"current_complexity": 4, "solver_type": "hybrid", "solved": False,
+                                          "overall_valid": False}, stream_mode="custom"))
+    assert chunks == [{"running_aggregates": {"hybrid": {4: {
+        "runs": 1, "solved": 0, "moves_when_solved": 0, "iterations": 0, "iterations_when_solved": 0,
+        "ai_compared": 1, "ai_agreements": 1
+    }}}}]
+
+
+class _UntouchableResults(list):
+    def __iter__(self):
+        raise AssertionError("record_result read the accumulated results")
+
+    __len__ = __add__ = __getitem__ = __iter__
+
+
+def test_record_result_returns_only_the_new_row():
+    state = {"current_complexity": 3, "current_run": 2, "solver_type": "single", "solved": True,
+             "moves_made": [[1, 0, 2]], "results": _UntouchableResults()}
+    update = record_result_node(state)
+    assert [row["run"] for row in update["results"]] == [2]
+
+
+def test_results_reducer_appends_rows_in_run_order():
+    def record(state):
+        return {**record_result_node(state), "current_run": state["current_run"] + 1}
+
+    graph = StateGraph(ExperimentState)
+    graph.add_node("record_result", record)
+    graph.add_edge(START, "record_result")
+    graph.add_conditional_edges("record_result", lambda state: END if state["current_run"] > 300 else "record_result")
+    result = graph.compile().invoke({"current_complexity": 3, "current_run": 1, "solver_type": "single", "results": [],
+                                     "moves_made": [[1, 0, 2]], "solved": True}, {"recursion_limit": 400})
+    assert [row["run"] for row in result["results"]] == list(range(1, 301))
@@ -0,0 +1,29 @@
+import pytest
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.prevalidation import prevalidate_move_node
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+def test_illegal_current_state_is_rejected_not_raised():
+    state = {
+        "prevalidation_mode": "shadow",
+        "current_complexity": 3,
+        "current_state": {"pegs": [[2, 1, 3], [], []]},
+        "proposed_move": "[3, 0, 1]"
+    }
+    update = prevalidate_move_node(state)
+    assert update["simulator_valid"] is False
+    assert "illegal" in update["simulator_message"]
+
+
+@pytest.mark.parametrize("solver_type", ["hybrid", "multi"])
+def test_shadow_mode_survives_llm_approved_illegal_moves(solver_type):
+    # Wrong moves the unreliable validators approve are applied, leaving illegal states
+    model = MockChatModel(error_rate=0.3, validator_accuracy=0.6, seed=0)
+    inputs = {"complexity_start": 3, "complexity_end": 4, "runs_per_complexity": 3,
+              "solver_type": solver_type, "prevalidation_mode": "shadow", "max_concurrency": 2}
+    with patched_llms(model):
+        result = create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000})
+    assert len(result["results"]) == 6
+    assert model.stats["flipped_verdicts"] > 0
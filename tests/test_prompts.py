@@ -0,0 +1,76 @@
+import pytest
+from tower_of_hanoi import hybrid_agent, multi_agent
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.hybrid_agent import _validator_prompt
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.multi_agent import _position_prompt
+from tower_of_hanoi.prompts import CACHE_MIN_TOKENS, cached_prompt, move_history, prompt_text
+from tower_of_hanoi.single_agent import _paper_prompt
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+def test_prefixes_below_the_cacheable_minimum_are_sent_as_plain_text():
+    prompt = cached_prompt("Static rules.\n", "Current state.")
+    assert prompt[0].content == "Static rules.\nCurrent state."
+    assert isinstance(_paper_prompt({"current_complexity": 5})[0].content, str)
+
+
+def test_long_prefixes_are_cache_marked():
+    prefix = "rule " * CACHE_MIN_TOKENS
+    blocks = cached_prompt(prefix, "Current state.")[0].content
+    assert blocks[0] == {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+    assert prompt_text(blocks) == prefix + "Current state."
+
+
+def test_validator_prompts_state_the_move_before_the_rules():
+    state = {"proposed_move": "[1, 0, 2]", "current_state": {"pegs": [[2, 1], [], []]}}
+    for prompt in (_validator_prompt(state), _position_prompt(state)):
+        text = prompt_text(prompt)
+        assert isinstance(prompt, str)
+        assert text.index("PROPOSED MOVE") < text.index("CURRENT STATE") < text.index("Return JSON")
+
+
+MOVES = [f"[1, {i}, {i + 1}]" for i in range(25)]  # Distinct, so each one is easy to find
+
+
+@pytest.mark.parametrize("policy, window, shown", [
+    ("full", None, MOVES),
+    ("last_k", 10, MOVES[-10:]),
+    ("last_k", 30, MOVES),
+    ("state_only", None, MOVES[-1:]),
+])
+def test_solver_prompts_show_the_moves_the_history_policy_keeps(policy, window, shown):
+    state = {"current_complexity": 3, "current_state": {"pegs": [[3, 2, 1], [], []]},
+             "goal_state": {"pegs": [[], [], [3, 2, 1]]}, "moves_made": MOVES, "history_policy": policy,
+             **({"history_window": window} if window else {})}
+    history = move_history(state)
+    for prompt in (hybrid_agent._solver_prompt(state), multi_agent._solver_prompt(state)):
+        assert f"MOVES SO FAR: {history}" in prompt
+    # Regeneration prompts after a rejected move follow the same policy
+    rejected = {**state, "proposed_move": "[3, 0, 1]", "overall_valid": False, "single_disk_valid": True,
+                "top_disk_valid": False, "size_order_valid": True}
+    for apply_move in (hybrid_agent.hybrid_agent_apply_move_node, multi_agent.multi_agent_apply_move_node):
+        assert f"Moves so far: {history}\n" in apply_move(rejected)["regeneration_prompt"]
+    assert [move for move in MOVES if move in history] == shown
+    if len(shown) < len(MOVES):
+        assert history.startswith("25 moves")
+    with pytest.raises(ValueError, match="history_policy"):
+        move_history({**state, "history_policy": "everything"})
+
+
+@pytest.mark.parametrize("solver_type", ["hybrid", "multi"])
+def test_bounded_history_keeps_solver_prompts_flat(solver_type):
+    tokens = {}
+    for policy in ("full", "state_only"):
+        inputs = {"complexity_start": 5, "complexity_end": 5, "solver_type": solver_type, "history_policy": policy}
+        with patched_llms(MockChatModel()):
+            row = create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000})["results"][0]
+        assert row["solved"] and row["history_policy"] == policy
+        tokens[policy] = [record["input_tokens"] for record in row["solver_prompt_tokens"]]
+        assert [record["iteration"] for record in row["solver_prompt_tokens"]] == list(range(31))
+
+    # Every move made adds a few tokens to the full history
+    assert tokens["full"] == sorted(tokens["full"]) and tokens["full"][-1] - tokens["full"][0] > 60
+    # Flat once there is a last move to summarize
+    assert max(tokens["state_only"][1:]) - min(tokens["state_only"][1:]) < 5
+    assert sum(tokens["state_only"]) < sum(tokens["full"])
@@ -0,0 +1,11 @@
+from tower_of_hanoi import result_store
+from tower_of_hanoi.benchmarks import benchmark_result_store
+
+
+def test_stores_round_trip_detailed_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "RESULT_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(result_store, "RESULT_STORE_PATH", None)
+    monkeypatch.setattr(result_store, "_result_stores", {})
+    report = benchmark_result_store(complexity=(3, 4), runs=2)
+    assert report["details_match"]
+    assert report["sqlite"]["checkpoint_bytes"] < report["inline"]["checkpoint_bytes"]
@@ -0,0 +1,32 @@
+from tower_of_hanoi.results_table import ResultsTable, row_aggregates, merge_aggregates
+
+
+def _row(run, solver_type, solved, ai_validation_passed):
+    return {"complexity": 3, "run": run, "solver_type": solver_type, "solved": solved,
+            "moves_count": 7, "iterations": 9, "ai_validation_passed": ai_validation_passed}
+
+
+def test_ai_verdicts_read_back_as_ints_aggregate_like_bools():
+    as_bools = [_row(1, "hybrid", True, True), _row(2, "hybrid", False, True), _row(3, "single", True, None)]
+    as_ints = [{**row, "ai_validation_passed": None if row["ai_validation_passed"] is None
+                else int(row["ai_validation_passed"])} for row in as_bools]
+    expected = ResultsTable.from_results(as_bools).aggregate()
+    assert ResultsTable.from_results(as_ints).aggregate() == expected
+    assert expected["hybrid"][3]["ai_compared"] == 2
+    assert expected["hybrid"][3]["ai_agreements"] == 1
+    assert "single" in expected
+
+
+def test_unexpected_ai_verdict_values_do_not_break_the_table():
+    rows = [_row(1, "multi", True, "valid"), _row(2, "multi", True, 2), _row(3, "multi", False, "")]
+    counters = ResultsTable.from_results(rows).aggregate()["multi"][3]
+    assert counters["ai_compared"] == 3
+    assert counters["ai_agreements"] == 3
+
+
+def test_running_aggregates_match_table():
+    rows = [_row(1, "hybrid", True, 1), _row(2, "hybrid", False, 0), _row(3, "multi", False, True)]
+    running = {}
+    for row in rows:
+        running = merge_aggregates(running, row_aggregates(row))
+    assert running == ResultsTable.from_results(rows).aggregate()
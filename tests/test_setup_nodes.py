@@ -0,0 +1,49 @@
+import pytest
+from tower_of_hanoi.goal_checker import goal_checker_node
+from tower_of_hanoi.setup_nodes import setup_problem_node
+from tower_of_hanoi.simulator import TowerOfHanoiSimulator
+
+
+def _problem(**options):
+    state = {"current_complexity": 5, "current_run": 1, "solver_type": "single", **options}
+    return {**state, **setup_problem_node(state)}
+
+
+def test_default_problem_is_the_papers():
+    state = _problem()
+    assert state["initial_state"]["pegs"] == [[5, 4, 3, 2, 1], [], []]
+    assert state["goal_state"]["pegs"] == [[], [], [5, 4, 3, 2, 1]]
+    assert state["optimal_moves"] == 31
+
+
+def test_k_peg_problem_goes_to_the_last_peg_with_a_frame_stewart_budget():
+    state = _problem(num_pegs=4)
+    assert state["initial_state"]["pegs"] == [[5, 4, 3, 2, 1], [], [], []]
+    assert state["goal_state"]["pegs"] == [[], [], [], [5, 4, 3, 2, 1]]
+    assert state["optimal_moves"] == 13
+    assert state["max_moves"] == 28
+    # Peg 3 exists now, peg 4 does not
+    simulator = TowerOfHanoiSimulator(5, num_pegs=4)
+    assert simulator.validate_move(1, 0, 3)[0]
+    assert simulator.validate_move(1, 0, 4) == (False, "Invalid peg indices: from_peg=0, to_peg=4")
+
+
+def test_random_configurations_are_legal_and_reproducible():
+    first = _problem(num_pegs=5, random_start=True, random_goal=True, seed=7)
+    again = _problem(num_pegs=5, random_start=True, random_goal=True, seed=7)
+    other = _problem(num_pegs=5, random_start=True, random_goal=True, seed=7, current_run=2)
+    assert first["initial_state"] == again["initial_state"] and first["goal_state"] == again["goal_state"]
+    assert (first["initial_state"], first["goal_state"]) != (other["initial_state"], other["goal_state"])
+    for pegs in (first["initial_state"]["pegs"], first["goal_state"]["pegs"]):
+        assert len(pegs) == 5
+        assert sorted(disk for peg in pegs for disk in peg) == [1, 2, 3, 4, 5]
+        assert all(peg == sorted(peg, reverse=True) for peg in pegs)
+
+
+def test_explicit_start_and_goal_are_checked_by_the_goal_checker():
+    state = _problem(current_complexity=2, initial_pegs=[[2], [1], []], goal_pegs=[[], [], [2, 1]])
+    assert state["optimal_moves"] == 2
+    checked = goal_checker_node({**state, "moves_made": [[2, 0, 2], [1, 1, 2]]})
+    assert checked["solved"]
+    with pytest.raises(ValueError, match="Larger disk"):
+        _problem(current_complexity=2, initial_pegs=[[1, 2], [], []])
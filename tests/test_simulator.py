@@ -0,0 +1,111 @@
+import asyncio
+import random
+import re
+import pytest
+from tower_of_hanoi.setup_nodes import random_configuration
+from tower_of_hanoi.simulator import (CompactTowerOfHanoiSimulator, MoveParseError, TowerOfHanoiSimulator,
+                                      parse_move_list, state_at)
+
+
+def _optimal_moves(num_disks, source=0, target=2, spare=1):
+    if num_disks == 0:
+        return []
+    return (_optimal_moves(num_disks - 1, source, spare, target) + [[num_disks, source, target]]
+            + _optimal_moves(num_disks - 1, spare, target, source))
+
+
+@pytest.mark.parametrize("move_index", [-1, 0, 100, 255, 256, 600, 1022])
+def test_state_at_matches_fresh_replay(move_index):
+    moves = _optimal_moves(10)
+    analysis = TowerOfHanoiSimulator(10).validate_complete_solution([str(move) for move in moves])
+    assert len(analysis["state_snapshots"]) > 1
+
+    replay = TowerOfHanoiSimulator(10)
+    for disk_id, from_peg, to_peg in moves[:move_index + 1]:
+        assert replay.execute_move(disk_id, from_peg, to_peg)[0]
+    assert state_at(analysis, move_index) == replay.pegs
+
+
+def test_parse_move_list_reads_triples_and_stops_after_the_list():
+    text = "moves = [[1, 0, 2],[2,0,1] , [1, 2, 1]] then prose"
+    moves, end = parse_move_list(text, len("moves = "))
+    assert moves == [(1, 0, 2), (2, 0, 1), (1, 2, 1)]
+    assert text[end:] == " then prose"
+    assert parse_move_list("  []") == ([], 4)
+
+
+@pytest.mark.parametrize("text, position, message", [
+    ("moves", 0, "Expected '['"),
+    ("[[1, 0, 2], [2, 0]]", 12, "Expected move"),
+    ("[[1, 0, 2] [2, 0, 1]]", 11, "Expected ',' or ']'"),
+    ("[[1, 0, 2], [2, 0, 1]", 21, "Expected ',' or ']'"),
+])
+def test_parse_move_list_reports_where_it_failed(text, position, message):
+    with pytest.raises(MoveParseError, match=re.escape(message)) as error:
+        parse_move_list(text)
+    assert error.value.position == position
+
+
+@pytest.mark.parametrize("num_pegs", [3, 4, 5])
+def test_compact_simulator_agrees_with_the_list_simulator(num_pegs):
+    rng = random.Random(num_pegs)
+    initial, goal = random_configuration(6, num_pegs, rng), random_configuration(6, num_pegs, rng)
+    reference = TowerOfHanoiSimulator(6, num_pegs, initial, goal)
+    compact = CompactTowerOfHanoiSimulator(6, num_pegs, initial, goal)
+    storage = len(compact._stacks), len(compact._positions)
+
+    for _ in range(5000):
+        move = rng.randint(0, 7), rng.randint(-1, num_pegs), rng.randint(-1, num_pegs)
+        assert compact.execute_move(*move) == reference.execute_move(*move)
+        assert compact.pegs == reference.pegs
+        assert compact.is_solved() == reference.is_solved()
+    assert compact.move_count == reference.move_count > 0
+    # Fixed-size state, whatever the history length
+    assert (len(compact._stacks), len(compact._positions)) == storage
+
+    # Whole solutions get the same analysis from both engines
+    solution = _optimal_moves(7)
+    broken = solution[:50] + [[7, 0, 2]] + solution[50:]
+    for moves in (solution, broken):
+        expected = TowerOfHanoiSimulator(7).validate_complete_solution(moves)
+        assert CompactTowerOfHanoiSimulator(7).validate_complete_solution(moves) == expected
+    assert expected["first_invalid_move"] == 50 and not expected["goal_achieved"]
+    assert TowerOfHanoiSimulator(7).validate_complete_solution(solution)["goal_achieved"]
+
+
+def test_move_stream_stops_at_the_goal_without_draining_the_producer():
+    produced = []
+
+    def moves():
+        for move in _optimal_moves(4) + [[1, 2, 0]] * 100:
+            produced.append(move)
+            yield move
+
+    verdicts = list(CompactTowerOfHanoiSimulator(4).validate_move_stream(moves()))
+    assert len(verdicts) == len(produced) == 15
+    assert all(verdict["status"] == "valid" for verdict in verdicts)
+    assert [verdict["goal_achieved"] for verdict in verdicts] == [False] * 14 + [True]
+
+
+def test_move_stream_stops_at_the_first_invalid_move():
+    moves = ["[1, 0, 2]", "2 0 1", "garbage", "[1, 2, 1]"]
+    verdicts = list(TowerOfHanoiSimulator(3).validate_move_stream(iter(moves)))
+    assert [verdict["status"] for verdict in verdicts] == ["valid", "valid", "parsing_error"]
+
+    verdicts = list(TowerOfHanoiSimulator(3).validate_move_stream([[1, 0, 2], [2, 0, 2], [1, 2, 1]]))
+    assert [verdict["status"] for verdict in verdicts] == ["valid", "invalid"]
+    assert verdicts[-1]["message"] == "Cannot place larger disk 2 on smaller disk 1"
+    assert verdicts[-1]["parsed_move"] == [2, 0, 2]
+
+
+def test_async_move_stream_matches_the_sync_one():
+    async def moves():
+        for move in _optimal_moves(3) + [[1, 2, 0]]:
+            yield move
+
+    async def collect():
+        return [verdict async for verdict in TowerOfHanoiSimulator(3).avalidate_move_stream(moves())]
+
+    expected = list(TowerOfHanoiSimulator(3).validate_move_stream(_optimal_moves(3) + [[1, 2, 0]]))
+    assert asyncio.run(collect()) == expected
+    assert len(expected) == 7 and expected[-1]["goal_achieved"]
@@ -0,0 +1,25 @@
+from tower_of_hanoi.goal_checker import goal_checker_node
+from tower_of_hanoi.setup_nodes import setup_problem_node
+from tower_of_hanoi.single_agent import extract_moves
+
+
+def test_extract_moves_takes_the_last_parseable_block():
+    text = "Draft: moves = [[1, 0, 1]]\nFinal answer:\nmoves = [[1, 0, 2], [2, 0, 1]]"
+    assert extract_moves(text) == ([[1, 0, 2], [2, 0, 1]], None)
+    # A malformed final block falls back to the earlier one
+    assert extract_moves(text + "\nmoves = [[1, 0]]") == ([[1, 0, 2], [2, 0, 1]], None)
+
+
+def test_failed_extraction_yields_no_moves_and_fails_the_goal_check():
+    moves, error = extract_moves("No list here")
+    assert (moves, error) == ([], "No 'moves = [...]' block found")
+    moves, error = extract_moves("moves = [[1, 0, 2], oops]")
+    assert moves == [] and "at position 20" in error
+
+    state = {"current_complexity": 2, "current_run": 1, "solver_type": "single"}
+    state.update(setup_problem_node(state))
+    checked = goal_checker_node({**state, "moves_made": moves, "extraction_error": error})
+    assert not checked["solved"] and checked["failed"]
+    assert checked["solution_analysis"]["extraction_failed"]
+    assert checked["failure_details"]["error_summary"] == [f"Move extraction failed: {error}"]
+    assert checked["failure_details"]["moves_attempted"] == 0
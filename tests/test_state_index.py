@@ -0,0 +1,44 @@
+import pytest
+from conftest import bfs_distances, positions_to_pegs
+from tower_of_hanoi import state_index
+from tower_of_hanoi.goal_checker import goal_checker_node
+from tower_of_hanoi.setup_nodes import setup_problem_node
+from tower_of_hanoi.state_index import StateSpaceIndex, build_state_index, distance_trace
+
+
+@pytest.mark.parametrize("num_disks, goal_peg", [(1, 2), (5, 2), (6, 0)])
+def test_index_matches_bfs_on_every_state(tmp_path, num_disks, goal_peg):
+    index = StateSpaceIndex(build_state_index(num_disks, goal_peg, directory=str(tmp_path)))
+    assert (index.num_disks, index.goal_peg) == (num_disks, goal_peg)
+    distances = bfs_distances(num_disks, goal_peg)
+    for positions, distance in distances.items():
+        encoded = index.encode(positions_to_pegs(positions))
+        assert encoded == sum(peg * 3 ** disk for disk, peg in enumerate(positions))
+        assert index.distance(encoded) == distance
+        move = index.next_move(encoded)
+        if distance == 0:
+            assert move is None
+            continue
+        disk, from_peg, to_peg = move
+        assert positions[disk - 1] == from_peg
+        assert distances[positions[:disk - 1] + (to_peg,) + positions[disk:]] == distance - 1
+
+
+def test_distance_trace_follows_moves_incrementally(tmp_path):
+    index = StateSpaceIndex(build_state_index(3, directory=str(tmp_path)))
+    moves = [(1, 0, 2), None, (2, 0, 1), (1, 2, 0), (1, 0, 1)]
+    assert distance_trace([[3, 2, 1], [], []], moves, index) == [7, 6, 5, 5, 4]
+
+
+def test_goal_checker_reports_whether_each_move_got_closer(tmp_path, monkeypatch):
+    build_state_index(3, directory=str(tmp_path))
+    monkeypatch.setattr(state_index, "STATE_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(state_index, "_open_indexes", {})
+    state = {"current_complexity": 3, "current_run": 1, "solver_type": "single"}
+    state.update(setup_problem_node(state))
+    analysis = goal_checker_node({**state, "moves_made": [[1, 0, 2], [2, 0, 1], [1, 2, 0], [1, 0, 1], [1, 1, 2]]})["solution_analysis"]
+    assert analysis["distance_trace"] == [7, 6, 5, 5, 4, 5]
+    assert (analysis["moves_closer"], analysis["moves_farther"], analysis["moves_same_distance"]) == (3, 1, 1)
+    # One shared mapping per process
+    assert state_index.get_state_index(3) is state_index.get_state_index(3)
+    assert state_index.get_state_index(4) is None
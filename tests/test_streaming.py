@@ -0,0 +1,64 @@
+from langchain_core.messages import AIMessageChunk
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.setup_nodes import setup_problem_node
+from tower_of_hanoi.single_agent import single_agent_solver_node
+
+SOLUTION = "moves = [[1, 0, 1], [2, 0, 2], [1, 1, 2]]"
+EXPLANATION = "\nThe smallest disk clears the way for the largest one, then returns on top of it." * 20
+
+
+class _ChunkedModel:
+    """Streams a fixed response a few characters per chunk, counting the chunks sent"""
+
+    max_tokens = 1000
+
+    def __init__(self, text, size=4):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.sent = 0
+
+    def stream(self, prompt, *args, **kwargs):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield AIMessageChunk(content=chunk)
+
+
+def _solve(text, **options):
+    state = {"current_complexity": 2, "current_run": 1, "stream_moves": True, **options}
+    state.update(setup_problem_node(state))
+    model = _ChunkedModel(text)
+    with patched_llms(model):
+        update = single_agent_solver_node(state)
+    return update, model
+
+
+def test_stream_stops_when_the_goal_list_closes():
+    update, model = _solve(SOLUTION + EXPLANATION)
+    stats = update["streaming_stats"]
+    assert stats["stop_reason"] == "goal_reached"
+    assert model.sent == -(-len(SOLUTION) // 4) < len(model.chunks)
+    assert update["moves_made"] == [[1, 0, 1], [2, 0, 2], [1, 1, 2]]
+    assert 0 < stats["unused_output_budget"] < _ChunkedModel.max_tokens
+
+
+def test_stream_stops_at_an_invalid_move_in_the_first_list():
+    text = "moves = [[1, 0, 1], [1, 0, 2], [2, 0, 2]]" + EXPLANATION
+    update, model = _solve(text, stop_at_invalid_move=True)
+    assert update["streaming_stats"]["stop_reason"] == "invalid_move"
+    assert update["moves_made"] == [[1, 0, 1], [1, 0, 2]]
+    assert model.sent < len(model.chunks)
+
+
+def test_invalid_moves_in_later_lists_do_not_stop_the_stream():
+    # A draft that falls short of the goal, then an exploratory list with an illegal move, then the answer
+    text = "moves = [[1, 0, 1]]\nmoves = [[2, 0, 2]]\n" + SOLUTION + EXPLANATION
+    update, model = _solve(text, stop_at_invalid_move=True)
+    assert update["streaming_stats"]["stop_reason"] == "goal_reached"
+    assert update["moves_made"] == [[1, 0, 1], [2, 0, 2], [1, 1, 2]]
+    assert model.sent < len(model.chunks)
+
+
+def test_stream_without_a_goal_list_runs_to_the_end():
+    update, model = _solve("moves = [[1, 0, 1]]" + EXPLANATION)
+    assert update["streaming_stats"]["stop_reason"] == "end_of_stream"
+    assert update["streaming_stats"]["unused_output_budget"] == 0
+    assert model.sent == len(model.chunks)
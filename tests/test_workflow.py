@@ -0,0 +1,25 @@
+import pytest
+from tower_of_hanoi.benchmarks import patched_llms
+from tower_of_hanoi.mock_llm import MockChatModel
+from tower_of_hanoi.workflow import create_comparison_workflow
+
+
+def _sweep(solver_type, max_concurrency):
+    inputs = {"complexity_start": 2, "complexity_end": 4, "runs_per_complexity": 3, "solver_type": solver_type,
+              "max_concurrency": max_concurrency, "random_start": True}
+    # Error-free answers: with parallel lanes, the mock may hand a repeated prompt's answers out in another order
+    with patched_llms(MockChatModel()):
+        return create_comparison_workflow().invoke(inputs, {"recursion_limit": 10000})
+
+
+@pytest.mark.parametrize("solver_type", ["single", "hybrid", "multi"])
+def test_parallel_lanes_report_in_sequential_order(solver_type):
+    sequential, parallel = _sweep(solver_type, 1), _sweep(solver_type, 4)
+
+    def rows(result):
+        return [(row["complexity"], row["run"], row["solved"], row["moves_sequence"]) for row in result["results"]]
+
+    assert [row[:2] for row in rows(parallel)] == [(c, r) for c in (2, 3, 4) for r in (1, 2, 3)]
+    assert rows(parallel) == rows(sequential)
+    for section in ("experiment_summary", f"{solver_type}_agent_performance", "ai_validation_analysis"):
+        assert parallel["final_report"][section] == sequential["final_report"][section]